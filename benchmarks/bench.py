@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Per-stage micro-benchmarks of naruhodo.
+
+Runs without a real CaboCha installation: a `cabocha` wrapper around the fake backend of the tests(test/fakebackend.py) is put in front of PATH
+(use --real to benchmark an installed CaboCha, or --replay to replay lattices recorded from `cabocha -f1`).
+
+Each stage is timed separately and the results are written as JSON, so runs can be compared across versions:
+
+    python benchmarks/bench.py -n 500 -o before.json
+    python benchmarks/bench.py -n 500 -o after.json --compare before.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from test.fakebackend import makeSents, setupFakeBackend
+
+def summarize(samples):
+    """Summarize a list of timings(seconds)."""
+    samples = sorted(samples)
+    n = len(samples)
+    return dict(
+        n = n,
+        total = sum(samples),
+        mean = sum(samples) / n,
+        median = statistics.median(samples),
+        p95 = samples[min(n - 1, int(n * 0.95))],
+        min = samples[0],
+        max = samples[-1]
+    )
+
+def timeEach(func, items):
+    """Call func for each item and return the list of wall times."""
+    ret = list()
+    for item in items:
+        start = time.perf_counter()
+        func(item)
+        ret.append(time.perf_counter() - start)
+    return ret
+
+def timeOnce(func, repeat=1):
+    """Call func repeat times and return the list of wall times."""
+    return timeEach(lambda x: func(), range(repeat))
+
+def run(args):
+    """Run all stages and return the results."""
+    import networkx as nx
+    import naruhodo
+    from naruhodo import parser
+    from naruhodo.utils.communication import Subprocess
+    from naruhodo.backends.cabocha import CabochaClient
+    from naruhodo.core.DependencyCoreJa import DependencyCoreJa
+    from naruhodo.core.KnowledgeCoreJa import KnowledgeCoreJa
+    from naruhodo.utils.misc import _mergeGraph, decorate
+
+    sents = makeSents(args.n, args.seed)
+    stages = dict()
+
+    # Backend round trip.
+    proc = Subprocess('cabocha -f1')
+    lattices = list()
+    def query(sent):
+        lattices.append(proc.query(sent))
+    stages['Subprocess.query'] = timeEach(query, sents)
+
+    # Chunk processing of recorded lattices.
+    stages['CabochaClient.add'] = timeEach(lambda lattice: CabochaClient().add(lattice), lattices)
+
+    # Graph building by cores(including backend round trip), keeping partial graphs for merging.
+    partials = dict(d=list(), k=list())
+    for gtype, core in [("d", DependencyCoreJa()), ("k", KnowledgeCoreJa())]:
+        pos = [0]
+        def build(sent):
+            core.add(sent, pos[0])
+            pos[0] += 1
+            partials[gtype].append(core.G.copy())
+            core.G.clear()
+        stages['{0}.add'.format(core.__class__.__name__)] = timeEach(build, sents)
+
+    # Merging partial graphs.
+    for gtype in ["d", "k"]:
+        G = nx.DiGraph()
+        stages['_mergeGraph({0})'.format(gtype)] = timeEach(lambda B: _mergeGraph(G, B), partials[gtype])
+
+    # Resolution and output on a full KSG.
+    p = parser()
+    p.addAll(sents)
+    stages['parser.resolveSynonym'] = timeOnce(p.resolveSynonym, args.repeat)
+    flatEntityList = p.resolveSynonym()
+    proList = list(p.proList)
+    def resolveCoref():
+        p.proList = list(proList)
+        p.resolveCoref(flatEntityList)
+    stages['parser.resolveCoref'] = timeOnce(resolveCoref, args.repeat)
+    tmp = tempfile.mkdtemp(prefix="naruhodo-bench-out-")
+    try:
+        fname = os.path.join(tmp, "graph.json")
+        stages['parser.exportJSON'] = timeOnce(lambda: p.exportJSON(fname), args.repeat)
+    finally:
+        shutil.rmtree(tmp)
+    stages['decorate'] = timeOnce(lambda: decorate(p.G, False, 'TB'), args.repeat)
+
+    return dict(
+        meta = dict(
+            naruhodo = naruhodo.__file__,
+            python = platform.python_version(),
+            networkx = nx.__version__,
+            platform = platform.platform(),
+            time = time.strftime("%Y-%m-%dT%H:%M:%S"),
+            sents = args.n,
+            seed = args.seed,
+            backend = "real" if args.real else ("replay" if args.replay else "fake"),
+            nodes = p.G.number_of_nodes(),
+            edges = p.G.number_of_edges()
+        ),
+        stages = dict([(key, summarize(val)) for key, val in stages.items()])
+    )
+
+def printResults(results, baseline=None, out=sys.stdout):
+    """Print a table of results(and ratios against baseline if given)."""
+    out.write("{0:<28}{1:>8}{2:>14}{3:>14}{4:>14}{5}\n".format("stage", "n", "mean(ms)", "median(ms)", "p95(ms)", "   vs base" if baseline else ""))
+    for key, val in results['stages'].items():
+        ratio = ""
+        if baseline and key in baseline['stages']:
+            ratio = "{0:>10.2f}x".format(val['median'] / baseline['stages'][key]['median'] if baseline['stages'][key]['median'] else float('nan'))
+        out.write("{0:<28}{1:>8}{2:>14.3f}{3:>14.3f}{4:>14.3f}{5}\n".format(key, val['n'], val['mean'] * 1000, val['median'] * 1000, val['p95'] * 1000, ratio))
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Per-stage micro-benchmarks of naruhodo.")
+    ap.add_argument("-n", type=int, default=200, help="Number of sentences.")
+    ap.add_argument("--seed", type=int, default=0, help="Random seed for sentence generation.")
+    ap.add_argument("--repeat", type=int, default=5, help="Repetitions of whole-graph stages.")
+    ap.add_argument("--real", action="store_true", help="Use the installed CaboCha instead of the fake backend.")
+    ap.add_argument("--replay", default="", help="Replay lattices recorded from `cabocha -f1` with the fake backend.")
+    ap.add_argument("-o", "--output", default="", help="Write results as JSON to this file.")
+    ap.add_argument("--compare", default="", help="Compare with results from a previous run(JSON).")
+    args = ap.parse_args(argv)
+    tmp = None
+    if not args.real:
+        tmp = setupFakeBackend(args.replay)
+    try:
+        results = run(args)
+    finally:
+        if tmp:
+            shutil.rmtree(tmp)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+    printResults(results, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
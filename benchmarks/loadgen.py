@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Load generator for the local HTTP service(naruhodo.server).
+
+Concurrent clients send one sentence per POST /add over keep-alive connections, and request latency and throughput are reported.
+Without --url, a service is started in process on the fake CaboCha backend(see bench.py), so the micro-batching settings can be compared:
+
+    python benchmarks/loadgen.py -c 16 -n 2000 --max-delay 0
+    python benchmarks/loadgen.py -c 16 -n 2000 --max-delay 0.01 --max-batch 128
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench import makeSents, setupFakeBackend, summarize
+
+
+def client(host, port, sents, latencies, errors):
+    """Send sentences one by one over a keep-alive connection, recording latencies."""
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    try:
+        for sent in sents:
+            body = json.dumps(dict(sents=[sent]), ensure_ascii=False).encode('utf-8')
+            start = time.perf_counter()
+            conn.request("POST", "/add", body, {"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            resp.read()
+            latencies.append(time.perf_counter() - start)
+            if resp.status != 200:
+                errors.append(resp.status)
+    finally:
+        conn.close()
+
+def getJSON(host, port, path):
+    """Return the JSON response of GET path."""
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    try:
+        conn.request("GET", path)
+        return json.loads(conn.getresponse().read().decode('utf-8'))
+    finally:
+        conn.close()
+
+def run(host, port, args):
+    """Run the load and return the results."""
+    sents = makeSents(args.n, args.seed)
+    latencies = list()
+    errors = list()
+    threads = [threading.Thread(target=client, args=(host, port, sents[i::args.concurrency], latencies, errors)) for i in range(args.concurrency)]
+    start = time.perf_counter()
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    elapsed = time.perf_counter() - start
+    return dict(
+        requests = len(latencies),
+        errors = len(errors),
+        concurrency = args.concurrency,
+        elapsed = elapsed,
+        throughput = len(latencies) / elapsed if elapsed > 0 else 0.,
+        latency = summarize(latencies) if latencies else None,
+        service = getJSON(host, port, "/stats")
+    )
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Load generator for naruhodo-serve.")
+    ap.add_argument("-n", type=int, default=1000, help="Number of requests(one sentence each).")
+    ap.add_argument("-c", "--concurrency", type=int, default=8, help="Number of concurrent clients.")
+    ap.add_argument("--seed", type=int, default=0, help="Random seed for sentence generation.")
+    ap.add_argument("--url", default="", help="Base url of a running service. Starts a local one if omitted.")
+    ap.add_argument("--max-batch", type=int, default=64, help="Maximum micro-batch size of the local service.")
+    ap.add_argument("--max-delay", type=float, default=0.005, help="Maximum micro-batch delay(seconds) of the local service.")
+    ap.add_argument("-t", "--threads", type=int, default=1, help="Parsing threads of the local service.")
+    ap.add_argument("--real", action="store_true", help="Use the installed CaboCha instead of the fake backend for the local service.")
+    ap.add_argument("-o", "--output", default="", help="Write results as JSON to this file.")
+    args = ap.parse_args(argv)
+    tmp = None
+    service = None
+    try:
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port or 80
+        else:
+            if not args.real:
+                tmp = setupFakeBackend()
+            from naruhodo.server import Service
+            service = Service(maxBatch=args.max_batch, maxDelay=args.max_delay, nthreads=args.threads)
+            host, port = service.start()
+        results = run(host, port, args)
+    finally:
+        if service is not None:
+            service.stop()
+        if tmp:
+            shutil.rmtree(tmp)
+    lat = results['latency'] or dict(median=0., p95=0.)
+    sys.stdout.write("{0} requests({1} errors) in {2:.2f} s | {3:.1f} req/s | latency median {4:.2f} ms, p95 {5:.2f} ms | mean batch {6:.1f}\n".format(
+        results['requests'], results['errors'], results['elapsed'], results['throughput'], lat['median'] * 1000, lat['p95'] * 1000, results['service']['meanBatch']))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
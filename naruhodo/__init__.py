@@ -5,6 +5,34 @@ A python library for automatic semantic graph generation from human-readable tex
 
 ## Change-Log
 
+### 0.3.0(dev)
+  * Added change feed to parser(parser.subscribe/unsubscribe). Typed change events are delivered in batches per add/addAll call.
+  * Added sliding-window eviction to parser("window"/"horizon" options and parser.evict). Edges now record the sentence positions they came from in "pos".
+  * Added level-of-detail views for large graphs(parser.view, utils.misc.lodView). parser.show/plotToFile accept the same filtering options and only decorate the visible part.
+  * Added parser.pathGraphs and parser.egoGraphs for extracting many path/neighbourhood subgraphs at once as views sharing data with parser.G. toText/show/plotToFile accept these views directly.
+  * Added utils.triples.TripleIndex, a subject-predicate-object index over graph edges with wildcard pattern queries. It can be attached to a parser to be updated incrementally.
+  * Added checkpoints(parser.saveCheckpoint/loadCheckpoint, utils.checkpoint) and sharded ingestion(utils.shard). Shards written to a shared directory are merged by a reducer with remapped sentence positions.
+  * parser.reset now also clears coreference type sets.
+  * Added "naruhodo" command line entry point for batch ingestion with live throughput report.
+  * Fixed parser.addAll failing to reduce results in multiprocessing mode.
+  * Added per-stage micro-benchmarks(benchmarks/bench.py) running on a fake CaboCha backend(test/fakebackend.py).
+  * Added opt-in instrumentation("stats" option, parser.stats, parser.setMetricsHook): per-stage timers, latency histograms, counters and memory gauges. Warnings in synonym/coreference resolution loops are now rate-limited log messages instead of prints.
+  * nxpd, numpy, the scraper and multiprocessing are now imported on first use, so importing naruhodo only loads networkx and naruhodo itself.
+  * parser.addUrls fetches urls concurrently with keep-alive connections, per-host limits and timeouts(configurable through a NScraper passed as "scraper"). Extracted sentences are collected in linear time.
+  * NScraper extracts <p> text with a streaming HTML parser instead of BeautifulSoup/lxml(no longer dependencies). Paragraphs are delivered as they are parsed, charsets are taken from headers or meta tags, and failures raise utils.scraper.ScraperError instead of returning an error message as text. parser.addUrls skips urls that fail. API change: NScraper.getUrlContent now returns one item per paragraph of the page, instead of a list holding all paragraphs concatenated in one string("".join(paragraphs) gives the old item).
+  * Added utils.scraper.PageCache, an optional on-disk cache of extracted paragraphs for NScraper("cache" option). Cached pages are revalidated with ETag/Last-Modified and the cache is kept under a size limit by evicting least recently used pages.
+  * utils.misc.preprocessText translates characters in one pass, only runs the parenthesis patterns present in the text and memoizes results(same output as before). Added utils.misc.preprocessTexts for lists of strings.
+  * Implemented utils.polarity.polarity on a compact memory-mapped lexicon file(sorted lemmas and float32 scores searched by bisection), shared by worker processes without copying. Added batch lookup(polarity.scores), text lexicon import(polarity.loadText) and graph annotation(polarity.scoreGraph, parser.scorePolarity) taking negated nodes into account. Fixed polarity.load/save opening files in text mode.
+  * Added parser.freeze, returning an immutable CSR snapshot of the graph(utils.frozen.FrozenGraph) with numpy implementations of degree by edge type, PageRank and BFS reachability, and conversion back to networkx.
+  * Added optional duplicate suppression before parsing("dedup" option, utils.dedup.Deduplicator): exact hashing plus MinHash/LSH near-duplicate detection over a bounded number of recent sentences. Duplicates are skipped("skip") or counted as another occurrence of the original sentence without parsing("count").
+  * Added multi-view mode("multiview" option, parser.graph): each sentence is parsed by CaboCha once and fed to both DSG and KSG analyzers, keeping both graphs with shared sentence positions. Analyzers got addParsed for adding already parsed sentences, and can share a backend process("proc" option).
+  * Added entity-only mode(gtype "e", core.EntityCoreJa): only entityList and proList are filled from backend chunks without building a graph. Supports addAll, multiprocessing(analyzers are reused within worker processes), windows and dedup.
+  * Added thread-safe ingestion(parser.addConcurrent/addAllConcurrent). Sentences are parsed in parallel threads by pooled analyzers with their own backend processes, positions are allocated atomically and only merging is serialized. Methods changing the parser state now hold a lock of the parser.
+  * Added workspace(core.workspace), hosting many document parsers that share analyzers, a multiprocessing pool and a string table(parser "pool", "cores", "strings" and "lock" options). Least recently used documents are pickled and zlib-compressed in memory, spilled to disk over a size limit, and restored on access, keeping one parser object per document. The string table only keeps strings of hot documents(see workspace.pruneStrings).
+  * Sentences can be tagged with a document ID(add/addAll/addAllConcurrent "doc" option, parser.docs). parser.retract removes the contribution of a document(node counts, edge weights, orphaned nodes and edges, entity/pronoun lists, coreference/synonym sets) visiting only the nodes and edges indexed at its positions. Document IDs are kept in checkpoints.
+  * Added utils.diff(GraphDiff, iterDiff) and parser.diff for comparing parsers, graphs or checkpoint files: added/removed nodes and edges, count/weight deltas and changed attribute names. Elements are compared by sorted key streams of per-element hashes, and checkpoints are streamed(only differing records are read again, see checkpoint.readRecords).
+  * Added columnar export(parser.exportColumns, utils.columnar, cli "--columns"): nodes, edges and their per-occurrence data are written as typed .npy columns with string dictionaries(offsets + utf-8 blob) and a manifest. utils.columnar.ColumnStore memory-maps only the columns it is asked for and can build pandas DataFrames with categorical string columns.
+  * Added a local HTTP service(naruhodo.server, "naruhodo-serve" command) built on asyncio, with add, query(triple index), export and stats endpoints over a shared parser. Sentences of concurrent add requests are coalesced into micro-batches("--max-batch"/"--max-delay" trade latency for throughput). Added benchmarks/loadgen.py, a load generator running against a local service on the fake backend.
 ### 0.2.9
   * Some bug fix in KSG.
   * Moved parser._preprocessText() to utils.misc.preprocessText().
@@ -43,4 +71,5 @@ A python library for automatic semantic graph generation from human-readable tex
 
 """
 
-from naruhodo.core.parser import parser
\ No newline at end of file
+from naruhodo.core.parser import parser
+from naruhodo.core.workspace import workspace
\ No newline at end of file
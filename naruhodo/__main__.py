@@ -0,0 +1,4 @@
+import sys
+from naruhodo.cli import main
+
+sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Command line entry point for batch ingestion with naruhodo.
+
+Sentences are read from given files(or stdin), added to a parser in batches with parser.addAll,
+and the generated graph/checkpoint is written to disk. Throughput is reported on stderr while running.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from naruhodo.core.parser import parser
+from naruhodo.utils.misc import parseToSents
+
+
+def _readSents(inputs):
+    """Read sentences from given files('-' for stdin) line by line."""
+    for name in inputs:
+        if name == "-":
+            f = sys.stdin
+        else:
+            f = open(name, 'r', encoding='utf-8')
+        try:
+            for line in f:
+                for sent in parseToSents(line.strip()):
+                    yield sent
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+def _batches(sents, size):
+    """Group sentences into lists of given size."""
+    batch = list()
+    for sent in sents:
+        batch.append(sent)
+        if len(batch) >= size:
+            yield batch
+            batch = list()
+    if batch:
+        yield batch
+
+def _report(p, start, out, end="\r"):
+    """Write a line of throughput statistics of parser p to out."""
+    elapsed = time.time() - start
+    stats = p.stats(memory=False)
+    n = stats['counters'].get('sents', 0)
+    timers = stats['timers']
+    # Backend latency is only measured in single process mode. In 'mp' mode, wall time of parsing whole batches is reported instead.
+    if 'backend' in timers or 'parse' not in timers:
+        label, backend = "backend", timers.get('backend')
+    else:
+        label, backend = "parse wall", timers['parse']
+    merge = timers.get('merge')
+    out.write("{0} sents | {1:.1f} sents/s | {2} {3:.2f} ms/sent | merge {4:.2f} ms/sent | {5} nodes, {6} edges{7}".format(
+        n,
+        n / elapsed if elapsed > 0 else 0.,
+        label,
+        1000. * backend['total'] / n if n and backend else 0.,
+        1000. * merge['total'] / n if n and merge else 0.,
+        stats['gauges']['nodes'],
+        stats['gauges']['edges'],
+        end
+    ))
+    out.flush()
+
+def getArgParser():
+    """Return the argument parser of the command line interface."""
+    ap = argparse.ArgumentParser(prog="naruhodo", description="Ingest sentences and generate semantic graphs with naruhodo.")
+    ap.add_argument("inputs", nargs="*", default=["-"], help="Input text files. Reads stdin if omitted or '-'.")
+    ap.add_argument("-l", "--lang", default="ja", help="Language of the input text.")
+    ap.add_argument("-g", "--gtype", default="k", choices=["d", "k", "e"], help="Graph type: 'd' for DSG, 'k' for KSG, 'e' for entities only.")
+    ap.add_argument("-m", "--mode", default="sp", choices=["sp", "mp"], help="Execution mode: 'sp' for single process, 'mp' for multiprocessing.")
+    ap.add_argument("-n", "--nproc", type=int, default=0, help="Number of processes in 'mp' mode(0 for number of CPUs).")
+    ap.add_argument("-b", "--batch", type=int, default=100, help="Number of sentences passed to parser.addAll at once.")
+    ap.add_argument("-c", "--cache", default="", help="Checkpoint file used as a cache: loaded before ingestion if it exists and updated afterwards.")
+    ap.add_argument("-o", "--output", default="", help="Write the generated graph to this JSON file.")
+    ap.add_argument("--columns", default="", help="Export the generated graph as columnar files(numpy) to this directory.")
+    ap.add_argument("--checkpoint", default="", help="Write a checkpoint of the parser state to this file.")
+    ap.add_argument("--stats", default="", help="Write instrumentation statistics of the run to this JSON file.")
+    ap.add_argument("--coref", action="store_true", help="Resolve coreferences.")
+    ap.add_argument("--synonym", action="store_true", help="Resolve synonyms.")
+    ap.add_argument("--autosub", action="store_true", help="Link potential subjects to predicates without subject.")
+    ap.add_argument("--interval", type=float, default=1.0, help="Seconds between progress reports.")
+    ap.add_argument("-q", "--quiet", action="store_true", help="Only print the summary.")
+    return ap
+
+def main(argv=None):
+    """Run batch ingestion with given command line arguments."""
+    args = getArgParser().parse_args(argv)
+    p = parser(lang=args.lang, gtype=args.gtype, mp=(args.mode == "mp"), nproc=args.nproc, coref=args.coref, synonym=args.synonym, autosub=args.autosub, stats=True)
+    if args.cache and os.path.exists(args.cache):
+        p.loadCheckpoint(args.cache)
+    start = time.time()
+    last = start
+    try:
+        for batch in _batches(_readSents(args.inputs), args.batch):
+            p.addAll(batch)
+            if not args.quiet and time.time() - last >= args.interval:
+                _report(p, start, sys.stderr)
+                last = time.time()
+    finally:
+        if args.mode == "mp":
+            p.pool.close()
+            p.pool.join()
+    if not args.quiet:
+        sys.stderr.write("\n")
+    _report(p, start, sys.stderr, end="\n")
+    if args.stats:
+        with open(args.stats, 'w') as f:
+            json.dump(p.stats(), f, indent=2)
+    if args.output:
+        p.exportJSON(args.output)
+    if args.columns:
+        p.exportColumns(args.columns)
+    if args.checkpoint:
+        p.saveCheckpoint(args.checkpoint)
+    if args.cache:
+        p.saveCheckpoint(args.cache)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
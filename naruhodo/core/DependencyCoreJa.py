@@ -1,3 +1,4 @@
+import time
 import networkx as nx
 from naruhodo.utils.dicts import NEList, MeaninglessDict
 from naruhodo.utils.communication import Subprocess
@@ -6,8 +7,8 @@ from naruhodo.utils.misc import _re2, _re4, preprocessText
 
 class DependencyCoreJa(object):
     """Analyze the input text and store the information into a dependency structure graph(DSG)."""
-    def __init__(self):
-        """Initialize an analyzer for DSG."""
+    def __init__(self, proc=None):
+        """Initialize an analyzer for DSG. A backend communicator can be given as proc to share it with another analyzer."""
         self.G = nx.DiGraph()
         """
         Graph object of this analyzer.
@@ -25,16 +26,37 @@ class DependencyCoreJa(object):
         """
         Current position of the analyzer.
         """
-        self.proc = Subprocess('cabocha -f1')
+        self.proc = Subprocess('cabocha -f1') if proc is None else proc
         """
         Communicator to backend for DependencyAnalyzer.
         """
+        self.stats = None
+        """
+        If set to a naruhodo.utils.stats.Stats object, time spent in the backend and chunk processing is recorded to it.
+        """
+
+    def _parse(self, inp):
+        """Query the backend with a string input and return the CabochaClient holding processed chunks."""
+        cabo = CabochaClient()
+        if self.stats is None:
+            cabo.add(self.proc.query(inp), self.pos)
+            return cabo
+        start = time.perf_counter()
+        lattice = self.proc.query(inp)
+        mid = time.perf_counter()
+        cabo.add(lattice, self.pos)
+        self.stats.record('backend', mid - start)
+        self.stats.record('chunk', time.perf_counter() - mid)
+        return cabo
         
     def add(self, inp, pos):
         """Take in a string input and add it to the DSG."""
-        cabo = CabochaClient()
         self.pos = pos
-        cabo.add(self.proc.query(inp), self.pos)
+        self.addParsed(self._parse(inp), pos)
+
+    def addParsed(self, cabo, pos):
+        """Add a sentence already processed by the backend(CabochaClient) to the DSG. The chunks are not modified."""
+        self.pos = pos
         root = "" # Initialize root id.
         for chunk in cabo.chunks:
             self._addNode(chunk)
@@ -55,12 +77,13 @@ class DependencyCoreJa(object):
         if self.G.has_edge(parent, child):
             if parent not in MeaninglessDict and child not in MeaninglessDict:
                 self.G.edges[parent, child]['weight'] +=1
+                self.G.edges[parent, child]['pos'].append(self.pos)
             else:
                 self.G.edges[parent, child]['weight'] == 1
         else:
             if label == "":
                 label = " " # Assign a space to empty label to avoid problem in certain javascript libraries.
-            self.G.add_edge(parent, child, weight=1, label=label, type=etype)
+            self.G.add_edge(parent, child, weight=1, label=label, type=etype, pos=[self.pos])
             
     def _addNode(self, node, sub=''):
         """Add node to node list"""
@@ -0,0 +1,25 @@
+from naruhodo.utils.misc import _re2, _re4
+from naruhodo.core.DependencyCoreJa import DependencyCoreJa
+
+class EntityCoreJa(DependencyCoreJa):
+    """Analyze the input text and only collect entities and pronouns. No graph is built(G stays empty)."""
+    def addParsed(self, cabo, pos):
+        """Add the entities and pronouns of a sentence already processed by the backend(CabochaClient)."""
+        self.pos = pos
+        for chunk in cabo.chunks:
+            # Add to proList.
+            if chunk.pro != -1:
+                rep = _re2.sub("", chunk.main)
+                rep = _re4.sub("", rep)
+                self.proList.append(dict(
+                    id = chunk.npro,
+                    name = chunk.main,
+                    rep = rep,
+                    type = chunk.pro,
+                    pos = self.pos
+                ))
+            # Add to entityList.
+            elif chunk.type == 0:
+                positions = self.entityList[chunk.NE].setdefault(chunk.main, [])
+                if self.pos not in positions:
+                    positions.append(self.pos)
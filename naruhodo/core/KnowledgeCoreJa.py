@@ -1,14 +1,14 @@
 import networkx as nx
 from naruhodo.utils.communication import Subprocess
 from naruhodo.utils.misc import preprocessText
-from naruhodo.backends.cabocha import CaboChunk, CabochaClient
+from naruhodo.backends.cabocha import CaboChunk
 from naruhodo.utils.dicts import MeaninglessDict, SubDict, ObjDict, ObjPostDict, ObjPassiveSubDict, SubPassiveObjDict, NEList, EntityTypeDict, ParallelDict
 from naruhodo.core.DependencyCoreJa import DependencyCoreJa
 
 class KnowledgeCoreJa(DependencyCoreJa):
     """Analyze the input text and store the information into a knowledge structure graph(KSG)."""
-    def __init__(self, autosub=False):
-        """Initialize an analyzer for KSG."""
+    def __init__(self, autosub=False, proc=None):
+        """Initialize an analyzer for KSG. A backend communicator can be given as proc to share it with another analyzer."""
         self.G = nx.DiGraph()
         self.autosub = autosub
         """
@@ -27,18 +27,28 @@ class KnowledgeCoreJa(DependencyCoreJa):
         """
         Current position of the analyzer.
         """
-        self.proc = Subprocess('cabocha -f1')
+        self.proc = Subprocess('cabocha -f1') if proc is None else proc
         """
         Communicator to backend for KnowledgeAnalyzer.
         """
+        self.stats = None
+        """
+        If set to a naruhodo.utils.stats.Stats object, time spent in the backend and chunk processing is recorded to it.
+        """
 
     def add(self, inp, pos):
         """Take in a string input and add it to the knowledge structure graph(KSG)."""
         self.pos = pos
-        self.para = list()
         # Call backend for dependency parsing.
-        cabo = CabochaClient()
-        cabo.add(self.proc.query(inp), self.pos)
+        self.addParsed(self._parse(inp), pos)
+
+    def addParsed(self, cabo, pos):
+        """
+        Add a sentence already processed by the backend(CabochaClient) to the KSG.
+        Names of predicate chunks are rewritten in place, so feed other analyzers with the chunks first.
+        """
+        self.pos = pos
+        self.para = list()
         pool = [cabo.root]
         plist = [cabo.root]
         self.vlist = dict()
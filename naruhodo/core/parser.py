@@ -1,19 +1,38 @@
 import re
+import time
+import functools
 import itertools
-from multiprocessing import Pool
+import threading
+from collections import deque
 import networkx as nx
-from nxpd import draw
-from naruhodo.utils.scraper import NScraper
 from naruhodo.utils.dicts import NEList
 from naruhodo.utils.misc import exportToJsonObj, exportToJsonFile
-from naruhodo.utils.misc import inclusive, harmonicSim, cosSimilarity, show, plotToFile, preprocessText, parseToSents
+from naruhodo.utils.misc import inclusive, harmonicSim, cosSimilarity, show, plotToFile, lodView, preprocessText, preprocessTexts, _preprocessText, parseToSents
 from naruhodo.utils.misc import _mergeGraph, _mergeEntityList, _mergeProList, _mergeAll
+from naruhodo.utils.misc import _internGraph, _internEntityList, _internProList, _indexGraph, _indexEntities, _removePositions, _replayPosition, _removeEntityPositions
+from naruhodo.utils.stats import Stats, logger, warnRateLimited, sizeOfGraph, sizeOfEntityList
+from naruhodo.utils.checkpoint import writeCheckpoint, readCheckpoint, offsetState
 from naruhodo.core.DependencyCoreJa import DependencyCoreJa
 from naruhodo.core.KnowledgeCoreJa import KnowledgeCoreJa
+from naruhodo.core.EntityCoreJa import EntityCoreJa
+
+
+_workerCores = dict()
+"""
+Analyzers reused by static add functions within a worker process(gtype -> analyzer).
+"""
+
+def _synchronized(method):
+    """Decorator running a parser method while holding the lock of the parser."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 class parser(object):
     """The general parser for naruhodo."""
-    def __init__(self, lang="ja", gtype="k", mp=False, nproc=0, wv="", coref=False, synonym=False, autosub=False):
+    def __init__(self, lang="ja", gtype="k", mp=False, nproc=0, wv="", coref=False, synonym=False, autosub=False, window=0, horizon=0, stats=False, dedup=None, multiview=False, pool=None, cores=None, strings=None, lock=None):
         """Constructor."""
         self.G = nx.DiGraph()
         """
@@ -50,6 +69,7 @@ class parser(object):
         ================================
         'd': dependency structure graph(DSG)
         'k': knowledge structure graph(KSG)
+        'e': entities only(no graph is built, only entityList and proList are filled)
         """
 
         self.mp = mp
@@ -89,8 +109,105 @@ class parser(object):
         A set that contains all roots(the shortest) of synonyms.
         """
 
+        self.subscribers = list()
+        """
+        List of callbacks subscribed to the change feed of the graph. See parser.subscribe.
+        """
+
+        self.posEntityList = [dict() for x in range(len(NEList))]
+        """
+        List of entities by sentence positions. Updated on coreference resolution.
+        """
+
+        self._events = None
+        self._batchDepth = 0
+        """
+        Pending change events(None when nobody subscribes) and nesting depth of the current add/addAll call.
+        """
+
+        self.window = window
+        """
+        If larger than 0, only the occurrences from the latest window sentences are kept in the graph.
+        """
+
+        self.horizon = horizon
+        """
+        If larger than 0, only the occurrences from sentences added within the latest horizon seconds are kept in the graph.
+        """
+
+        self.oldest = 0
+        """
+        Position of the oldest sentence kept in the graph. Sentences before it have been evicted.
+        """
+
+        self._nodeIndex = dict()
+        self._edgeIndex = dict()
+        self._posTime = deque()
+        """
+        Indexes from sentence positions to nodes/edges and the time each sentence was added. Used for eviction.
+        """
+
+        self.docs = dict()
+        """
+        Dict of document ID -> set of sentence positions kept in the graph, for sentences added with a document ID. See parser.retract.
+        """
+
+        self._posDoc = dict()
+        self._retracted = set()
+        """
+        Document ID of each tagged sentence position, and positions removed by retraction.
+        """
+
+        self._stats = Stats() if stats else None
+        """
+        Instrumentation of the parser(None if disabled). See parser.stats.
+        """
+
+        self.dedup = dedup
+        """
+        Filter of duplicate sentences(utils.dedup.Deduplicator) applied before parsing, or None.
+        A mode name("skip" or "count") can be given to use a deduplicator with default settings.
+        """
+        if isinstance(dedup, str):
+            from naruhodo.utils.dedup import Deduplicator
+            self.dedup = Deduplicator(mode=dedup) if dedup else None
+
+        self.multiview = multiview
+        """
+        If set to True, each sentence is parsed by the backend once and fed to both DSG and KSG analyzers.
+        The graph of the chosen gtype is kept in G, and the other one in views.
+        """
+
+        self.views = dict()
+        self._viewIndex = dict()
+        """
+        Graphs of the other graph types in multi-view mode(gtype -> graph), and their sentence position indexes.
+        They share sentence positions with G. Change events, coreference/synonym edges and checkpoints only concern G.
+        """
+
+        self.strings = strings
+        """
+        String table(dict) shared with other parsers, or None.
+        If set, node names and string attributes of newly parsed graphs are replaced by equal strings from the table before merging.
+        """
+
+        self._sharedCores = cores
+        """
+        Analyzers(main analyzer, analyzer of the other graph type or None) shared with other parsers, or None.
+        """
+
+        self._lock = threading.RLock() if lock is None else lock
+        self._inflight = set()
+        """
+        Lock guarding the state of the parser(possibly shared with other parsers using the same analyzers),
+        and positions allocated to sentences being parsed by concurrent ingestion.
+        """
+
         self._setCore()
-        if mp:
+        if mp and pool is not None:
+            self.pool = pool
+        elif mp:
+            from multiprocessing import Pool
             if nproc == 0:
                 self.pool = Pool()
             else:
@@ -112,36 +229,214 @@ class parser(object):
         """Change the language and type of the parser."""
         self.lang = lang
         self.gtype = gtype
+        self._sharedCores = None
         self._setCore()
 
-    def _setCore(self):
-        """Set the core of the parser to chosen languange ang gtype."""
+    def _makeCores(self):
+        """
+        Create an analyzer for chosen language and gtype, recording to the statistics of the parser.
+        Return the analyzer and the analyzer of the other graph type in multi-view mode(None otherwise), sharing one backend process.
+        """
         if self.lang == "ja":
             if self.gtype == "d":
-                self.core = DependencyCoreJa()
+                core = DependencyCoreJa()
             elif self.gtype == "k":
-                self.core = KnowledgeCoreJa(autosub=self.autosub)
+                core = KnowledgeCoreJa(autosub=self.autosub)
+            elif self.gtype == "e":
+                if self.coref or self.synonym or self.multiview:
+                    raise ValueError("Coreference/synonym resolution and multi-view mode need a graph, and are not available for graph type 'e'.")
+                core = EntityCoreJa()
             else:
                 raise ValueError("Unknown graph type: {0}".format(self.gtype))
         else:
             raise ValueError("Unsupported language: {0}".format(self.lang))
+        subcore = None
+        if self.multiview:
+            # The other analyzer shares the backend process of the main one.
+            if self.gtype == "d":
+                subcore = KnowledgeCoreJa(autosub=self.autosub, proc=core.proc)
+            else:
+                subcore = DependencyCoreJa(proc=core.proc)
+        core.stats = self._stats
+        return core, subcore
+
+    def _setCore(self):
+        """Set the core of the parser to chosen languange ang gtype."""
+        if self._sharedCores is not None:
+            self.core, self.subcore = self._sharedCores
+        else:
+            self.core, self.subcore = self._makeCores()
+        # Analyzers of concurrent ingestion are created again for the new settings.
+        self._corePool = list()
+        if self.multiview:
+            other = "k" if self.gtype == "d" else "d"
+            if other not in self.views:
+                self.views = {other: nx.DiGraph()}
+                self._viewIndex = {other: (dict(), dict())}
+
+    def graph(self, gtype=None):
+        """Return the graph of given type(G for the chosen gtype, or a graph of multi-view mode)."""
+        if gtype is None or gtype == self.gtype:
+            return self.G
+        try:
+            return self.views[gtype]
+        except KeyError:
+            raise ValueError("Graph type {0} is not generated by this parser. Use multiview=True to generate both DSG and KSG.".format(gtype))
+
+    def _coreAdd(self, inp, pos=None, core=None, subcore=None):
+        """Add a sentence at pos(self.pos if not given) to the analyzer(s) of the parser, or to given analyzers."""
+        if pos is None:
+            pos = self.pos
+        if core is None:
+            core, subcore = self.core, self.subcore
+        if subcore is None:
+            core.add(inp, pos)
+            return
+        core.pos = pos
+        cabo = core._parse(inp)
+        # KSG rewrites chunk names, so DSG is built first.
+        if self.gtype == "d":
+            core.addParsed(cabo, pos)
+            subcore.addParsed(cabo, pos)
+        else:
+            subcore.addParsed(cabo, pos)
+            core.addParsed(cabo, pos)
+
+    def _intern(self, G, entityList, proList):
+        """Return graph, entity list and pronoun list with strings taken from the string table(unchanged if no table is set)."""
+        if self.strings is None:
+            return G, entityList, proList
+        return _internGraph(G, self.strings), _internEntityList(entityList, self.strings), _internProList(proList, self.strings)
+
+    def _mergeView(self, G):
+        """Merge a partial graph of the other graph type into views in multi-view mode."""
+        for gtype in self.views:
+            _indexGraph(G, *self._viewIndex[gtype])
+            self.views[gtype] = _mergeGraph(self.views[gtype], G)
+
+    def stats(self, memory=True):
+        """
+        Return the instrumentation statistics of the parser as a dict, or None if instrumentation is disabled.
+        =====================================================================================================
+        timers: per-stage latency(count, total, mean, max, estimated p50/p95/p99 in seconds and log2 histogram in microseconds).
+            'backend': waiting for the backend to parse a sentence.
+            'chunk': processing backend output into chunks.
+            'parse': whole parsing of a sentence(or a batch in multiprocessing mode) into a partial graph, including 'backend' and 'chunk'.
+            'merge': merging partial graphs into the graph of the parser.
+            'synonym'/'coref': synonym/coreference resolution.
+            'evict': eviction of old sentences.
+        counters: number of parsed/empty/evicted sentences.
+        gauges: current size of the graph, entity list and pronoun list(with estimated memory in bytes if memory is True).
+        """
+        if self._stats is None:
+            return None
+        ret = self._stats.snapshot()
+        ret['gauges'] = dict(
+            nodes = self.G.number_of_nodes(),
+            edges = self.G.number_of_edges(),
+            entities = sum([len(item) for item in self.entityList]),
+            pronouns = len(self.proList),
+            sents = self.pos - self.oldest
+        )
+        if memory:
+            ret['gauges']['graphBytes'] = sizeOfGraph(self.G)
+            ret['gauges']['entityListBytes'] = sizeOfEntityList(self.entityList)
+        return ret
+
+    def setMetricsHook(self, callback):
+        """
+        Set a callback called as callback(kind, name, value) for every timer('timer', stage, seconds) and counter('counter', name, increment) record.
+        Instrumentation is enabled if it was disabled. Pass None to remove the hook.
+        """
+        if self._stats is None:
+            self._stats = Stats()
+            self.core.stats = self._stats
+        self._stats.hook = callback
+
+    def resetStats(self):
+        """Reset the instrumentation statistics of the parser."""
+        if self._stats is not None:
+            self._stats.reset()
+
+    def subscribe(self, callback):
+        """
+        Subscribe callback to the change feed of the graph.
+        The callback is called once per add/addAll(or direct resolveSynonym/resolveCoref) call with a list of events.
+        Each event is a dict whose 'type' is one of:
+        ============================================
+        'node_added': a new node was added(keys: node, pos, count).
+        'node_occurrence': occurrences were merged into an existing node(keys: node, pos, count).
+        'node_count': count of an existing node was changed by resolution or removal of a coreference edge(keys: node, count).
+        'edge_added': a new edge was added(keys: edge, etype, weight).
+        'edge_weight': weight of an existing edge was incremented(keys: edge, etype, weight).
+        'coref_edge': a coreference edge was added(keys: edge, etype, weight).
+        'synonym_edge': a synonym edge was added(keys: edge, etype, weight).
+        'node_trimmed': occurrences of a node were evicted(keys: node, pos, count).
+        'node_removed': a node with no occurrence left was removed(keys: node).
+        'edge_trimmed': weight of an edge was decremented by eviction(keys: edge, etype, weight).
+        'edge_removed': an edge was removed(keys: edge, etype).
+        'reset': the graph was cleared.
+        """
+        if callback not in self.subscribers:
+            self.subscribers.append(callback)
+        if self._events is None:
+            self._events = list()
+        return callback
 
-    def _grabTextFromUrls(self, urls):
-        """Parse given url(or a list of urls) and return the text content of the it."""
+    def unsubscribe(self, callback):
+        """Remove callback from the change feed of the graph."""
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+        if not self.subscribers:
+            self._events = None
+
+    def _emit(self, **event):
+        """Record a change event if anybody subscribes to the change feed."""
+        if self._events is not None:
+            self._events.append(event)
+
+    def _flushEvents(self):
+        """Deliver pending change events to subscribers unless inside an add/addAll call."""
+        if self._batchDepth > 0 or not self._events:
+            return
+        events = self._events
+        self._events = list()
+        for callback in list(self.subscribers):
+            callback(events)
+
+    def _grabTextFromUrls(self, urls, scraper=None):
+        """
+        Parse given url(or a list of urls) and return the text content of the it.
+        Urls are fetched concurrently by scraper(a new NScraper if not given). Urls that can not be retrieved are skipped.
+        """
         # Handle the single url case.
         if isinstance(urls, str):
             urls = [urls]
         # Initialize scraper.
-        scpr = NScraper()
+        if scraper is None:
+            from naruhodo.utils.scraper import NScraper
+            scpr = NScraper()
+        else:
+            scpr = scraper
+        urls = list(urls)
+        sents = [list() for url in urls]
+        # Paragraphs are split into sentences as soon as they are extracted.
+        def segment(i, block):
+            for line in block.splitlines():
+                sents[i].extend(parseToSents(line))
+        def skip(err):
+            logger.warning("Skipped %s", err)
+        try:
+            scpr.getUrlContents(urls, callback=segment, onError=skip)
+        finally:
+            if scraper is None:
+                scpr.close()
         ret = list()
-        # loop through urls to extract text.
-        for url in urls:
-            text = scpr.getUrlContent(url)
-            for block in text:
-                for line in block.splitlines():
-                    ret = list(itertools.chain(ret, parseToSents(line)))
+        for item in sents:
+            ret.extend(item)
         return ret
 
+    @_synchronized
     def reset(self):
         """Reset the content of generated graph to empty."""
         self.G.clear()
@@ -150,7 +445,240 @@ class parser(object):
         self.posEntityList = [dict() for x in range(len(NEList))]
         self.proList = list()
         self.corefDict = set()
+        self.coref_1stPerson = set()
+        self.coref_3rdPersonM = set()
+        self.coref_3rdPersonF = set()
         self.synonymDict = set()
+        self.oldest = 0
+        self._nodeIndex = dict()
+        self._edgeIndex = dict()
+        self._posTime = deque()
+        self.docs = dict()
+        self._posDoc = dict()
+        self._retracted = set()
+        for gtype in self.views:
+            self.views[gtype].clear()
+            self._viewIndex[gtype] = (dict(), dict())
+        if self.dedup is not None:
+            self.dedup.clear()
+        self._emit(type="reset")
+        self._flushEvents()
+
+    @_synchronized
+    def evict(self, before=None, horizon=None):
+        """
+        Evict the occurrences of old sentences from the graph.
+        If before is given, sentences with positions smaller than before are evicted.
+        If horizon is given, sentences added more than horizon seconds ago are evicted.
+        Node counts and edge weights are decremented, and nodes and edges with no occurrence left are removed.
+        Entity/pronoun lists and coreference/synonym indexes are updated accordingly.
+        Return the number of evicted sentences.
+        """
+        cutoff = self.oldest
+        if before is not None:
+            cutoff = max(cutoff, min(before, self.pos))
+        if horizon is not None:
+            deadline = time.time() - horizon
+            while self._posTime and self._posTime[0][1] < deadline:
+                cutoff = max(cutoff, self._posTime.popleft()[0] + 1)
+        while self._posTime and self._posTime[0][0] < cutoff:
+            self._posTime.popleft()
+        if cutoff <= self.oldest:
+            return 0
+        start = time.perf_counter()
+        positions = set(range(self.oldest, cutoff))
+        self.oldest = cutoff
+        self._removePositions(positions)
+        # Positions below oldest are dropped on merge anyway.
+        self._retracted.difference_update(positions)
+        if self._stats is not None:
+            self._stats.record('evict', time.perf_counter() - start)
+            self._stats.count('evicted', len(positions))
+        self._flushEvents()
+        return len(positions)
+
+    @_synchronized
+    def retract(self, doc):
+        """
+        Remove the contribution of all sentences added with document ID doc, without rebuilding the graph.
+        Node counts and edge weights are decremented, nodes and edges with no occurrence left(including coreference edges
+        of the pronouns in the document) are removed, and entity/pronoun lists and coreference/synonym sets are repaired.
+        Only the nodes and edges indexed at the positions of the document are visited.
+        Return the number of retracted sentences.
+        """
+        positions = self.docs.pop(doc, None)
+        if positions is None:
+            return 0
+        start = time.perf_counter()
+        for pos in positions:
+            self._posDoc.pop(pos, None)
+        # Sentences still being parsed by concurrent ingestion are dropped when merged.
+        self._retracted.update(positions)
+        self._removePositions(positions)
+        if self._stats is not None:
+            self._stats.record('retract', time.perf_counter() - start)
+            self._stats.count('retracted', len(positions))
+        self._flushEvents()
+        return len(positions)
+
+    def _tagDoc(self, doc, positions):
+        """Register sentence positions(still kept in the graph) as belonging to document ID doc."""
+        if doc is None:
+            return
+        positions = [pos for pos in positions if pos >= self.oldest]
+        if not positions:
+            return
+        self.docs.setdefault(doc, set()).update(positions)
+        for pos in positions:
+            self._posDoc[pos] = doc
+
+    def _removePositions(self, positions):
+        """Remove the occurrences at given sentence positions from the graph and related lists."""
+        for pos in positions:
+            doc = self._posDoc.pop(pos, None)
+            if doc is not None:
+                self.docs[doc].discard(pos)
+                if not self.docs[doc]:
+                    del self.docs[doc]
+        antecedents = set()
+        for pos in positions:
+            for key in self._edgeIndex.get(pos, ()):
+                if self.G.has_edge(*key) and self.G.edges[key]['type'] == "coref":
+                    antecedents.add(key[0])
+        nodes, dropped = _removePositions(self.G, positions, self._nodeIndex, self._edgeIndex, self._events)
+        for gtype, G in self.views.items():
+            _removePositions(G, positions, *self._viewIndex[gtype])
+        self.entityList = _removeEntityPositions(self.entityList, nodes, positions)
+        self.proList = [pro for pro in self.proList if pro['pos'] not in positions]
+        for i in range(len(self.posEntityList)):
+            for pos in positions:
+                self.posEntityList[i].pop(pos, None)
+        # Antecedents with no coreference edge left are no longer resolved ones.
+        stale = set([key for key in antecedents if key not in dropped and not any([self.G.edges[edge]['type'] == "coref" for edge in self.G.out_edges(key)])])
+        for refs in [self.corefDict, self.coref_1stPerson, self.coref_3rdPersonM, self.coref_3rdPersonF]:
+            refs.difference_update(dropped)
+            refs.difference_update(stale)
+        self.synonymDict.difference_update(dropped)
+
+    def _applyWindow(self):
+        """Evict old sentences following the window/horizon settings of the parser."""
+        if self.window > 0 and self.pos - self.window > self.oldest:
+            self.evict(before=self.pos - self.window)
+        if self.horizon > 0:
+            self.evict(horizon=self.horizon)
+
+    def _track(self, G, start, end, entityList=None):
+        """
+        Register sentences in [start, end) and the graph G built from them for eviction.
+        In entity-only mode, entities in entityList are registered instead.
+        """
+        _indexGraph(G, self._nodeIndex, self._edgeIndex)
+        if self.gtype == "e" and entityList is not None:
+            _indexEntities(entityList, self._nodeIndex)
+        if self.horizon > 0:
+            now = time.time()
+            for pos in range(start, end):
+                self._posTime.append((pos, now))
+
+    @_synchronized
+    def saveCheckpoint(self, filename, **meta):
+        """
+        Save the current state of the parser(graph, entity/pronoun lists and coreference/synonym sets) to a checkpoint file.
+        Additional meta information given as keyword arguments is stored in the header of the checkpoint.
+        """
+        writeCheckpoint(filename, self.G, self._state(), lang=self.lang, gtype=self.gtype, pos=self.pos, oldest=self.oldest, **meta)
+
+    def _state(self):
+        """Return the parser state saved in checkpoints besides the graph."""
+        return dict(
+            entityList = self.entityList,
+            proList = self.proList,
+            corefDict = self.corefDict,
+            coref_1stPerson = self.coref_1stPerson,
+            coref_3rdPersonM = self.coref_3rdPersonM,
+            coref_3rdPersonF = self.coref_3rdPersonF,
+            synonymDict = self.synonymDict,
+            docs = dict([(doc, sorted(positions)) for doc, positions in self.docs.items()])
+        )
+
+    def _freeze(self):
+        """
+        Return the graph and state of the parser and empty them, keeping settings, subscribers, statistics and the dedup index.
+        Used by workspace for cold documents(see _thaw). Must be called with the lock held.
+        """
+        ret = (self.G, self._state(), list(self._posTime), self._retracted)
+        self.G = nx.DiGraph()
+        self.entityList = [dict() for x in range(len(NEList))]
+        self.posEntityList = [dict() for x in range(len(NEList))]
+        self.proList = list()
+        self.corefDict = set()
+        self.coref_1stPerson = set()
+        self.coref_3rdPersonM = set()
+        self.coref_3rdPersonF = set()
+        self.synonymDict = set()
+        self._nodeIndex = dict()
+        self._edgeIndex = dict()
+        self._posTime = deque()
+        self.docs = dict()
+        self._posDoc = dict()
+        self._retracted = set()
+        return ret
+
+    def _thaw(self, frozen):
+        """Restore the graph and state returned by _freeze, without notifying subscribers. Must be called with the lock held."""
+        G, state, posTime, retracted = frozen
+        G, entityList, proList = self._intern(G, state['entityList'], state['proList'])
+        self.G = G
+        self.entityList = entityList
+        self.proList = proList
+        self._track(G, self.oldest, self.oldest, entityList)
+        self.corefDict = state['corefDict']
+        self.coref_1stPerson = state['coref_1stPerson']
+        self.coref_3rdPersonM = state['coref_3rdPersonM']
+        self.coref_3rdPersonF = state['coref_3rdPersonF']
+        self.synonymDict = state['synonymDict']
+        for doc, positions in state['docs'].items():
+            self._tagDoc(doc, positions)
+        self._posTime = deque(posTime)
+        self._retracted = retracted
+
+    @_synchronized
+    def loadCheckpoint(self, filename, merge=False):
+        """
+        Load parser state from a checkpoint file and return the header of the checkpoint.
+        If merge is True, the checkpoint is merged into the current state instead of replacing it.
+        Sentence positions of the merged checkpoint are shifted to follow the sentences already in the parser.
+        """
+        header, G, state = readCheckpoint(filename)
+        return self._restore(header, G, state, merge)
+
+    @_synchronized
+    def _restore(self, header, G, state, merge=False):
+        """Load parser state(header, graph and state as stored in checkpoints) and return the header."""
+        if header['lang'] != self.lang or header['gtype'] != self.gtype:
+            raise ValueError("Checkpoint of lang={0}, gtype={1} cannot be loaded to parser of lang={2}, gtype={3}.".format(header['lang'], header['gtype'], self.lang, self.gtype))
+        if merge:
+            offset = self.pos
+            G, state = offsetState(G, state, offset)
+        else:
+            offset = 0
+            self.reset()
+            self.oldest = header['oldest']
+        G, state['entityList'], state['proList'] = self._intern(G, state['entityList'], state['proList'])
+        self._track(G, offset + header['oldest'], offset + header['pos'], state['entityList'])
+        self.G = _mergeGraph(self.G, G, self._events)
+        self.entityList = _mergeEntityList(self.entityList, state['entityList'])
+        self.proList = _mergeProList(self.proList, state['proList'])
+        self.corefDict.update(state['corefDict'])
+        self.coref_1stPerson.update(state['coref_1stPerson'])
+        self.coref_3rdPersonM.update(state['coref_3rdPersonM'])
+        self.coref_3rdPersonF.update(state['coref_3rdPersonF'])
+        self.synonymDict.update(state['synonymDict'])
+        for doc, positions in state.get('docs', dict()).items():
+            self._tagDoc(doc, positions)
+        self.pos = offset + header['pos']
+        self._flushEvents()
+        return header
 
     def exportObj(self):
         """Export graph to a JSON-like object for external visualization."""
@@ -160,34 +688,85 @@ class parser(object):
         """Export current graph to a JSON file on disk."""
         exportToJsonFile(self.G, filename)
 
+    @_synchronized
+    def exportColumns(self, path):
+        """
+        Export current graph as typed columnar files(nodes, edges and their occurrences) to directory path and return the manifest.
+        Read them with utils.columnar.ColumnStore. Requires numpy.
+        """
+        from naruhodo.utils.columnar import exportColumns
+        return exportColumns(self.G, path)
+
     def _path2Graph(self, path):
         """
-        Generate a subgraph from the given path.
+        Generate a subgraph view from the given path.
+        The view shares node/edge data with the graph of the parser.
         """
-        G = nx.DiGraph()
+        nodes = set()
+        edges = set()
         for i in range(len(path)):
-            if self.G.has_node(path[i]):
-                G.add_node(path[i], **self.G.nodes[path[i]])
-                # Add given edges
-                try:
-                    G.add_node(path[i+1], **self.G.nodes[path[i]])
-                    G.add_edge(path[i], path[i+1], **self.G.edges[path[i], path[i+1]])
-                except:
-                    pass
-                # Add predecessors and successors(KSG only)
-                if self.gtype != "k":
-                    continue
-                for pred in self.G.predecessors(path[i]):
-                    if self.G.edges[pred, path[i]]['type'] in ['sub', 'aux', 'cause']:
-                        G.add_node(pred, **self.G.nodes[pred])
-                        G.add_edge(pred, path[i], **self.G.edges[pred, path[i]])
-                for succ in self.G.successors(path[i]):
-                    if self.G.edges[path[i], succ]['type'] in ['obj', 'stat', 'attr']:
-                        G.add_node(succ, **self.G.nodes[succ])
-                        G.add_edge(path[i], succ, **self.G.edges[path[i], succ])
-            else:
-                print("'{0}' is not in generated graph!".format(path[i]))
-        return G
+            if not self.G.has_node(path[i]):
+                logger.warning("'{0}' is not in generated graph!".format(path[i]))
+                continue
+            nodes.add(path[i])
+            # Add given edges
+            if i + 1 < len(path) and self.G.has_edge(path[i], path[i+1]):
+                nodes.add(path[i+1])
+                edges.add((path[i], path[i+1]))
+            # Add predecessors and successors(KSG only)
+            if self.gtype != "k":
+                continue
+            for pred, info in self.G.pred[path[i]].items():
+                if info['type'] in ['sub', 'aux', 'cause']:
+                    nodes.add(pred)
+                    edges.add((pred, path[i]))
+            for succ, info in self.G.succ[path[i]].items():
+                if info['type'] in ['obj', 'stat', 'attr']:
+                    nodes.add(succ)
+                    edges.add((path[i], succ))
+        return nx.subgraph_view(self.G, filter_node=nx.filters.show_nodes(nodes), filter_edge=nx.filters.show_diedges(edges))
+
+    def pathGraphs(self, paths):
+        """
+        Generate subgraph views for a list of paths at once.
+        Returned views share node/edge data with the graph of the parser and can be passed to toText/show/plotToFile directly.
+        """
+        return [self._path2Graph(path) for path in paths]
+
+    def egoGraphs(self, entities, radius=1):
+        """
+        Generate subgraph views of the neighbourhoods within radius hops(ignoring edge directions) of given entities.
+        Returned views share node/edge data with the graph of the parser and can be passed to toText/show/plotToFile directly.
+        """
+        if isinstance(entities, str):
+            entities = [entities]
+        ret = list()
+        for entity in entities:
+            if not self.G.has_node(entity):
+                logger.warning("'{0}' is not in generated graph!".format(entity))
+                ret.append(self.G.subgraph([]))
+                continue
+            nodes = set([entity])
+            frontier = [entity]
+            for i in range(radius):
+                nxt = list()
+                for node in frontier:
+                    for key in itertools.chain(self.G.succ[node], self.G.pred[node]):
+                        if key not in nodes:
+                            nodes.add(key)
+                            nxt.append(key)
+                frontier = nxt
+            ret.append(self.G.subgraph(nodes))
+        return ret
+
+    def _toGraph(self, path):
+        """
+        Return path as is if it is already a graph(view), otherwise the subgraph view generated from it.
+        Graphs are used even if empty, while an empty path stands for the entire graph in toText/show/plotToFile.
+        """
+        if isinstance(path, nx.Graph):
+            return path
+        return self._path2Graph(path)
 
     @staticmethod
     def _graph2Text(G):
@@ -222,66 +801,156 @@ class parser(object):
 
     def toText(self, path=None):
         """
-        If path is given, generate texts from the given path.
+        If path is given, generate texts from the given path(or subgraph view such as the ones from pathGraphs/egoGraphs).
         Otherwise, generate texts using the entire graph.
         """
-        if path:
-            return self._graph2Text(self._path2Graph(path))
+        if isinstance(path, nx.Graph) or path:
+            return self._graph2Text(self._toGraph(path))
         else:
             return self._graph2Text(self.G)
 
-    def show(self, path=None, depth=False, rankdir='TB'):
+    def freeze(self):
+        """
+        Return an immutable CSR snapshot(utils.frozen.FrozenGraph) of the graph for analytics.
+        The snapshot does not change with later additions. Requires numpy.
+        """
+        from naruhodo.utils.frozen import FrozenGraph
+        return FrozenGraph(self.G)
+
+    @_synchronized
+    def diff(self, other, ignore=()):
+        """
+        Return the differences(utils.diff.GraphDiff) from the graph of the parser to other(a parser, a networkx graph or a checkpoint filename).
+        Attributes in ignore are not compared.
+        """
+        from naruhodo.utils.diff import GraphDiff
+        return GraphDiff(self, other, ignore)
+
+    def scorePolarity(self, lexicon, attr='polarity'):
+        """
+        Annotate all nodes of the graph with polarity scores from lexicon(a utils.polarity.polarity object) in node attribute attr.
+        Return the number of nodes found in the lexicon.
+        """
+        return lexicon.scoreGraph(self.G, attr)
+
+    def view(self, minCount=0, minWeight=0, kcore=0, topN=0, etypes=None):
+        """
+        Return a filtered level-of-detail view of the graph without copying it.
+        See naruhodo.utils.misc.lodView for the meaning of the options.
+        """
+        return lodView(self.G, minCount=minCount, minWeight=minWeight, kcore=kcore, topN=topN, etypes=etypes)
+
+    def show(self, path=None, depth=False, rankdir='TB', **lod):
         """
-        If given a path, plot the subgraph generated from path.
+        If given a path(or subgraph view such as the ones from pathGraphs/egoGraphs), plot the subgraph generated from path.
         Otherwise, plot the entire graph.
+        Level-of-detail options of parser.view(minCount, minWeight, kcore, topN, etypes) can be given to plot only part of the graph.
         """
         # Sanity check for depth
         if depth and self.gtype != "d":
             print("Only dependency structure graph can be plotted with depth!")
             return
-        if path:
-            return show(self._path2Graph(path), depth=depth, rankdir=rankdir)
+        if isinstance(path, nx.Graph) or path:
+            return show(self._toGraph(path), depth=depth, rankdir=rankdir, **lod)
         else:
-            return show(self.G, depth=depth, rankdir=rankdir)
+            return show(self.G, depth=depth, rankdir=rankdir, **lod)
 
-    def plotToFile(self, path=None, filename=None, depth=False, rankdir='TB'):
+    def plotToFile(self, path=None, filename=None, depth=False, rankdir='TB', **lod):
         """
-        If given a path, plot the subgraph generated from path to (png) file with given filename.
+        If given a path(or subgraph view such as the ones from pathGraphs/egoGraphs), plot the subgraph generated from path to (png) file with given filename.
         Otherwise, plot the entire graph to (png) file with given filename.
+        Level-of-detail options of parser.view(minCount, minWeight, kcore, topN, etypes) can be given to plot only part of the graph.
         """
-        if path:
-            return plotToFile(self._path2Graph(path), filename, depth=depth, rankdir=rankdir)
+        if isinstance(path, nx.Graph) or path:
+            return plotToFile(self._toGraph(path), filename, depth=depth, rankdir=rankdir, **lod)
         else:
-            return plotToFile(self.G, filename, depth=depth, rankdir=rankdir)
+            return plotToFile(self.G, filename, depth=depth, rankdir=rankdir, **lod)
 
-    def addUrls(self, urls):
-        """Add the information from given urls to KSG."""
-        context = self._grabTextFromUrls(urls)
+    def addUrls(self, urls, scraper=None):
+        """
+        Add the information from given urls to KSG.
+        A configured NScraper can be given as scraper to control concurrency and timeouts.
+        """
+        context = self._grabTextFromUrls(urls, scraper)
         self.addAll(context)
-        return [preprocessText(item) for item in context]
+        return [_preprocessText(item) for item in context]
 
-    def add(self, inp):
-        """Add a sentence to graph."""
-        inp = preprocessText(inp)
+    @_synchronized
+    def add(self, inp, doc=None):
+        """
+        Add a sentence to graph.
+        If doc is given, the sentence is tagged with document ID doc and can be removed later with parser.retract.
+        """
+        self._batchDepth += 1
+        start = self.pos
+        try:
+            return self._add(inp)
+        finally:
+            self._tagDoc(doc, range(start, self.pos))
+            self._batchDepth -= 1
+            self._flushEvents()
+
+    def _add(self, inp):
+        """Implementation of add function."""
+        inp = _preprocessText(inp)
         if inp == "":
+            if self._stats is not None:
+                self._stats.count('empty')
             return [inp]
-        self.core.add(inp, self.pos)
+        if self.dedup is not None:
+            orig = self._duplicateOf(inp)
+            if orig is not None:
+                self._addDuplicate(orig)
+                self._applyWindow()
+                return [inp]
+            self.dedup.add(inp, self.pos)
+        start = time.perf_counter()
+        self._coreAdd(inp)
         self.pos += 1
-        self.G = _mergeGraph(self.G, self.core.G)
+        if self.strings is not None:
+            self.core.G, self.core.entityList, self.core.proList = self._intern(self.core.G, self.core.entityList, self.core.proList)
+        self._track(self.core.G, self.pos - 1, self.pos, self.core.entityList)
+        mid = time.perf_counter()
+        self.G = _mergeGraph(self.G, self.core.G, self._events)
         self.core.G.clear()
+        if self.subcore is not None:
+            self._mergeView(self.subcore.G)
+            self.subcore.G.clear()
+            self.subcore.entityList = [dict() for x in range(len(NEList))]
+            self.subcore.proList = list()
         self.entityList = _mergeEntityList(self.entityList, self.core.entityList)
         self.core.entityList = [dict() for x in range(len(NEList))]
         self.proList = _mergeProList(self.proList, self.core.proList)
         self.core.proList = list()
+        if self._stats is not None:
+            self._stats.record('parse', mid - start)
+            self._stats.record('merge', time.perf_counter() - mid)
+            self._stats.count('sents')
         flatEntityList = None
         if self.synonym:
             flatEntityList = self.resolveSynonym()
         if self.coref:
             self.resolveCoref(flatEntityList)
+        self._applyWindow()
         return [inp]
 
-    def addAll(self, inps):
-        """Add a list of sentences at once."""
+    @_synchronized
+    def addAll(self, inps, doc=None):
+        """
+        Add a list of sentences at once.
+        If doc is given, the sentences are tagged with document ID doc and can be removed later with parser.retract.
+        """
+        self._batchDepth += 1
+        start = self.pos
+        try:
+            self._addAll(inps)
+        finally:
+            self._tagDoc(doc, range(start, self.pos))
+            self._batchDepth -= 1
+            self._flushEvents()
+
+    def _addAll(self, inps):
+        """Implementation of addAll function."""
         if self.mp:
             self._addAllMP(inps)
         else:
@@ -291,6 +960,7 @@ class parser(object):
             flatEntityList = self.resolveSynonym()
         if self.coref:
             self.resolveCoref(flatEntityList)
+        self._applyWindow()
 
     def _addAllSP(self, inps):
         """Standard implementation of addAll function."""
@@ -310,22 +980,216 @@ class parser(object):
 
     def _addAllMP(self, inps):
         """Parallel implementation of addAll function."""
-        if self.lang == "ja":
-            if self.gtype == "d":
-                inps = [[self.pos + x, preprocessText(inps[x])] for x in range(len(inps))]
-                results = self.pool.starmap(self._addMP_ja_d, inps)
-            elif self.gtype == "k":
-                inps = [[self.pos + x, preprocessText(inps[x]), self.autosub] for x in range(len(inps))]
-                results = self.pool.starmap(self._addMP_ja_k, inps)
+        start = time.perf_counter()
+        texts = [_preprocessText(inp) for inp in inps]
+        duplicates = list()
+        if self.dedup is not None:
+            texts, duplicates = self._dedupBatch(texts)
+        if texts:
+            if self.lang == "ja":
+                if self.multiview:
+                    inps = [[self.pos + x, texts[x], self.autosub, self.gtype] for x in range(len(texts))]
+                    results = self.pool.starmap(self._addMP_ja_dk, inps)
+                elif self.gtype == "d":
+                    inps = [[self.pos + x, texts[x]] for x in range(len(texts))]
+                    results = self.pool.starmap(self._addMP_ja_d, inps)
+                elif self.gtype == "k":
+                    inps = [[self.pos + x, texts[x], self.autosub] for x in range(len(texts))]
+                    results = self.pool.starmap(self._addMP_ja_k, inps)
+                elif self.gtype == "e":
+                    inps = [[self.pos + x, texts[x]] for x in range(len(texts))]
+                    results = self.pool.starmap(self._addMP_ja_e, inps)
+                else:
+                    raise ValueError("Unknown graph type: {0}".format(self.gtype))
             else:
-                raise ValueError("Unknown graph type: {0}".format(self.gtype))
-        else:
-            raise ValueError("Unsupported language: {0}".format(self.lang))
-        self.pos += len(inps)
-        final = self._reduce(results)
-        self.G = _mergeGraph(self.G, final[0])
-        self.entityList = _mergeEntityList(self.entityList, final[1])
-        self.proList = _mergeProList(self.proList, final[2])
+                raise ValueError("Unsupported language: {0}".format(self.lang))
+            self.pos += len(inps)
+            mid = time.perf_counter()
+            if self.multiview:
+                self._mergeView(self._reduce([[item[3], [dict() for x in range(len(NEList))], list()] for item in results])[0])
+                results = [item[:3] for item in results]
+            final = self._reduce(results)
+            final = self._intern(*final)
+            self._track(final[0], self.pos - len(inps), self.pos, final[1])
+            self.G = _mergeGraph(self.G, final[0], self._events)
+            self.entityList = _mergeEntityList(self.entityList, final[1])
+            self.proList = _mergeProList(self.proList, final[2])
+            if self._stats is not None:
+                self._stats.record('parse', mid - start)
+                self._stats.record('merge', time.perf_counter() - mid)
+                self._stats.count('sents', len(inps))
+        for orig in duplicates:
+            self._addDuplicate(orig)
+
+    def addConcurrent(self, inp, doc=None):
+        """
+        Thread-safe version of add for use from many threads at once.
+        The sentence is parsed by an analyzer(with its own backend process) that no other thread uses at the same time,
+        and only merging into the graph of the parser is serialized. Return the list of sentence positions given to the sentence.
+        """
+        return self.addAllConcurrent([inp], nthreads=1, doc=doc)
+
+    def addAllConcurrent(self, inps, nthreads=4, doc=None):
+        """
+        Thread-safe version of addAll, parsing sentences with up to nthreads threads.
+        Sentence positions are allocated atomically in input order before parsing, and partial graphs are merged in short critical sections.
+        Return the list of sentence positions given to the parsed sentences(duplicates filtered by dedup are not included).
+        If doc is given, the sentences are tagged with document ID doc as in addAll.
+        """
+        texts = [_preprocessText(inp) for inp in inps]
+        empty = len(texts)
+        texts = [text for text in texts if text != ""]
+        empty -= len(texts)
+        jobs, duplicates = self._allocate(texts, doc)
+        try:
+            if nthreads <= 1 or len(jobs) <= 1:
+                partials = [self._parseJob(job) for job in jobs]
+            else:
+                from concurrent.futures import ThreadPoolExecutor
+                with ThreadPoolExecutor(max_workers=min(nthreads, len(jobs))) as executor:
+                    partials = list(executor.map(self._parseJob, jobs))
+        except BaseException:
+            with self._lock:
+                self._inflight.difference_update([job[0] for job in jobs])
+            raise
+        self._mergePartials(partials, duplicates, empty, doc)
+        return [job[0] for job in jobs]
+
+    def _allocate(self, texts, doc=None):
+        """
+        Allocate sentence positions to preprocessed sentences, filtering duplicates if dedup is set.
+        Return the list of (position, sentence) to parse and the list of positions of the originals of the duplicates.
+        """
+        with self._lock:
+            duplicates = list()
+            if self.dedup is not None:
+                texts, duplicates = self._dedupBatch(texts)
+            jobs = [(self.pos + i, texts[i]) for i in range(len(texts))]
+            self.pos += len(texts)
+            self._inflight.update([job[0] for job in jobs])
+            self._tagDoc(doc, [job[0] for job in jobs])
+        return jobs, duplicates
+
+    def _parseJob(self, job):
+        """
+        Parse a sentence at given position with an idle analyzer.
+        Return (position, [graph, entity list, pronoun list, graph of the other type(None unless multi-view)], parsing time).
+        """
+        pos, text = job
+        start = time.perf_counter()
+        with self._lock:
+            cores = self._corePool.pop() if self._corePool else None
+        if cores is None:
+            cores = self._makeCores()
+        core, subcore = cores
+        # Instrumentation may have been enabled(see setMetricsHook) after the analyzer was created.
+        core.stats = self._stats
+        self._coreAdd(text, pos, core, subcore)
+        ret = [core.G, core.entityList, core.proList, None]
+        core.G = nx.DiGraph()
+        core.entityList = [dict() for x in range(len(NEList))]
+        core.proList = list()
+        if subcore is not None:
+            ret[3] = subcore.G
+            subcore.G = nx.DiGraph()
+            subcore.entityList = [dict() for x in range(len(NEList))]
+            subcore.proList = list()
+        with self._lock:
+            self._corePool.append(cores)
+        return pos, ret, time.perf_counter() - start
+
+    @_synchronized
+    def _mergePartials(self, partials, duplicates, empty=0, doc=None):
+        """Merge partial results of concurrent ingestion into the parser, then handle duplicates and resolution as add does."""
+        self._batchDepth += 1
+        try:
+            start = time.perf_counter()
+            merged = 0
+            for pos, (G, entityList, proList, viewG), elapsed in partials:
+                self._inflight.discard(pos)
+                if pos < self.oldest or pos in self._retracted:
+                    # Evicted or retracted while being parsed.
+                    continue
+                G, entityList, proList = self._intern(G, entityList, proList)
+                self._track(G, pos, pos + 1, entityList)
+                self.G = _mergeGraph(self.G, G, self._events)
+                self.entityList = _mergeEntityList(self.entityList, entityList)
+                self.proList = _mergeProList(self.proList, proList)
+                if viewG is not None:
+                    self._mergeView(viewG)
+                merged += 1
+                if self._stats is not None:
+                    self._stats.record('parse', elapsed)
+            if self._stats is not None:
+                if partials:
+                    self._stats.record('merge', time.perf_counter() - start)
+                if merged:
+                    self._stats.count('sents', merged)
+                if empty:
+                    self._stats.count('empty', empty)
+            first = self.pos
+            for orig in duplicates:
+                self._addDuplicate(orig)
+            self._tagDoc(doc, range(first, self.pos))
+            if merged:
+                flatEntityList = None
+                if self.synonym:
+                    flatEntityList = self.resolveSynonym()
+                if self.coref:
+                    self.resolveCoref(flatEntityList)
+            self._applyWindow()
+        finally:
+            self._batchDepth -= 1
+            self._flushEvents()
+
+    def _duplicateOf(self, inp):
+        """Return the position of a kept sentence that inp duplicates, or None."""
+        orig = self.dedup.find(inp)
+        if orig is None or orig < self.oldest or orig in self._retracted:
+            # Duplicates of evicted or retracted sentences are parsed again.
+            return None
+        if orig in self._inflight and self.dedup.mode == "count":
+            # The original is still being parsed by another thread, so its occurrences can not be counted yet.
+            return None
+        return orig
+
+    def _dedupBatch(self, texts):
+        """
+        Filter duplicates out of a batch of preprocessed sentences about to be added at self.pos.
+        Return the list of sentences to parse and the list of positions of the originals of the duplicates.
+        """
+        kept = list()
+        duplicates = list()
+        for text in texts:
+            if text != "":
+                orig = self._duplicateOf(text)
+                if orig is not None:
+                    duplicates.append(orig)
+                    continue
+                self.dedup.add(text, self.pos + len(kept))
+            kept.append(text)
+        return kept, duplicates
+
+    def _addDuplicate(self, orig):
+        """
+        Handle a duplicate of the sentence at position orig without parsing it.
+        In "count" mode, the duplicate gets its own position and every occurrence from the original sentence is counted again.
+        """
+        if self._stats is not None:
+            self._stats.count('duplicates')
+        if self.dedup.mode != "count":
+            return
+        pos = self.pos
+        self.pos += 1
+        nodes = _replayPosition(self.G, orig, pos, self._nodeIndex, self._edgeIndex, self._events)
+        for gtype, G in self.views.items():
+            _replayPosition(G, orig, pos, *self._viewIndex[gtype])
+        for item in self.entityList:
+            for key in nodes:
+                if orig in item.get(key, ()):
+                    item[key].append(pos)
+        if self.horizon > 0:
+            self._posTime.append((pos, time.time()))
 
     def _reduce(self, results):
         """Reduce the results from multiprocessing to final result."""
@@ -346,8 +1210,10 @@ class parser(object):
             ret.append(results[-1])
             return self._reduce(ret)
 
+    @_synchronized
     def resolveSynonym(self):
         """Resolve synonyms in the given text."""
+        start = time.perf_counter()
         # initialize a graph of synonym
         GS = nx.Graph()
         # Get flatten entity list
@@ -356,15 +1222,17 @@ class parser(object):
         for i in [1, 3]:
             for key in self.entityList[i].keys():
                 flatEntityList.append(key)
+        if not self.wv and len(flatEntityList) > 1:
+            warnRateLimited("synonym-wv", "Word vector model is not set correctly. Skipping part of synonym resolution.")
         # Find syntatic synonyms
+        names = preprocessTexts(flatEntityList)
         for i in range(len(flatEntityList)):
+            A = names[i]
             for j in range(i + 1, len(flatEntityList)):
-                A = preprocessText(flatEntityList[i])
-                B = preprocessText(flatEntityList[j])
+                B = names[j]
                 inc = inclusive(A, B)
                 if not self.wv:
                     sim = 1.
-                    print("Word vector model is not set correctly. Skipping part of coreference resolution.")
                 else:
                     if A in self.wv and B in self.wv:
                         sim = cosSimilarity(self.wv[A], self.wv[B])
@@ -373,11 +1241,11 @@ class parser(object):
                 if inc == 1 and sim > 0.5:
                     # self.G.nodes[flatEntityList[i]]['count'] += 1
                     GS.add_edge(flatEntityList[i], flatEntityList[j])
-                    self.G.add_edge(flatEntityList[i], flatEntityList[j], weight=1, label="同義語候補", type="synonym")
+                    self._addSynonymEdge(flatEntityList[i], flatEntityList[j])
                 elif inc == -1 and sim > 0.5:
                     # self.G.nodes[flatEntityList[j]]['count'] += 1
                     GS.add_edge(flatEntityList[i], flatEntityList[j])
-                    self.G.add_edge(flatEntityList[j], flatEntityList[i], weight=1, label="同義語候補", type="synonym")
+                    self._addSynonymEdge(flatEntityList[j], flatEntityList[i])
         # Process GS
         for subG in nx.connected_components(GS):
             lshort = 10000
@@ -389,10 +1257,22 @@ class parser(object):
             self.synonymDict.add(nshort)
             for node in subG:
                 self.G.nodes[node]['synonym'] = nshort
+        if self._stats is not None:
+            self._stats.record('synonym', time.perf_counter() - start)
+        self._flushEvents()
         return flatEntityList
 
+    def _addSynonymEdge(self, A, B):
+        """Add a synonym edge from A to B. An existing edge(e.g. a parsed relation) is kept as is."""
+        if self.G.has_edge(A, B):
+            return
+        self.G.add_edge(A, B, weight=1, label="同義語候補", type="synonym")
+        self._emit(type="synonym_edge", edge=(A, B), etype="synonym", weight=1)
+
+    @_synchronized
     def resolveCoref(self, flatEntityList=None):
         """Resolve coreferences in the given text."""
+        start = time.perf_counter()
         # Get position-based entity list
         self.posEntityList = [dict() for x in range(len(NEList))]
         for i in range(len(NEList)):
@@ -453,7 +1333,7 @@ class parser(object):
                         self.coref_3rdPersonM.add(antecedent)
             elif pro['type'] == 7:
                 if not self.wv or not flatEntityList:
-                    print("Word vector model is not set correctly or entity list is empty. Skipping part of coreference resolution.")
+                    warnRateLimited("coref-wv", "Word vector model is not set correctly or entity list is empty. Skipping part of coreference resolution.")
                     continue
                 else:
                     antecedent = self._wvResolve(pro['name'], flatEntityList)
@@ -462,7 +1342,8 @@ class parser(object):
             # Process antecedent
             if antecedent != "":
                 self.G.nodes[antecedent]['count'] += 1
-                self.G.add_edge(antecedent, pro['name'], weight=1, label="共参照候補", type="coref")
+                self._emit(type="node_count", node=antecedent, count=1)
+                self._addCorefEdge(antecedent, pro['name'], pro['pos'])
             else:
                 # Add unknown coref
                 antecedent = "未知の主体"
@@ -478,11 +1359,35 @@ class parser(object):
                             surface = [antecedent],
                             sub = "",
                             meaning = "")
+                    try:
+                        self._nodeIndex[self.pos - 1].add(antecedent)
+                    except KeyError:
+                        self._nodeIndex[self.pos - 1] = set([antecedent])
+                    self._emit(type="node_added", node=antecedent, pos=[self.pos - 1], count=1)
                 else:
                     self.G.nodes[antecedent]['count'] += 1
-                self.G.add_edge(antecedent, pro['name'], weight=1, label="共参照候補", type="coref")
+                    self._emit(type="node_count", node=antecedent, count=1)
+                self._addCorefEdge(antecedent, pro['name'], pro['pos'])
             # Add antecedent to corefDict
             self.corefDict.add(antecedent)
+        if self._stats is not None:
+            self._stats.record('coref', time.perf_counter() - start)
+        self._flushEvents()
+
+    def _addCorefEdge(self, antecedent, proname, pos):
+        """Add a coreference edge from antecedent to pronoun at sentence position pos, or add pos to the existing one."""
+        if self.G.has_edge(antecedent, proname):
+            info = self.G.edges[antecedent, proname]
+            info.setdefault('pos', list()).append(pos)
+            info['weight'] += 1
+            self._emit(type="edge_weight", edge=(antecedent, proname), etype=info['type'], weight=1)
+        else:
+            self.G.add_edge(antecedent, proname, weight=1, label="共参照候補", type="coref", pos=[pos])
+            self._emit(type="coref_edge", edge=(antecedent, proname), etype="coref", weight=1)
+        try:
+            self._edgeIndex[pos].add((antecedent, proname))
+        except KeyError:
+            self._edgeIndex[pos] = set([(antecedent, proname)])
 
     def _rresolve(self, pos, NE, invalid_antecedents=None):
         """Recursively resolve to previous position."""
@@ -517,8 +1422,7 @@ class parser(object):
                     snames.append(name)
                     svecs.append(self.wv[name])
         if len(svecs) > 0:
-            for item in flatEntityList:
-                rawitem = preprocessText(item)
+            for item, rawitem in zip(flatEntityList, preprocessTexts(flatEntityList)):
                 if rawitem not in snames and rawitem in self.wv:
                     score = harmonicSim(svecs, self.wv[rawitem])
                     if sim < score:
@@ -531,16 +1435,40 @@ class parser(object):
         else:
             return ""
 
+    @staticmethod
+    def _addMP_ja_dk(pos, inp, autosub, gtype):
+        """Static version of add for multi-view parsing in Japanese. The graph of the other type is appended to the result."""
+        dsg = DependencyCoreJa()
+        ksg = KnowledgeCoreJa(autosub=autosub, proc=dsg.proc)
+        dsg.pos = pos
+        cabo = dsg._parse(inp)
+        dsg.addParsed(cabo, pos)
+        ksg.addParsed(cabo, pos)
+        if gtype == "d":
+            return [dsg.G, dsg.entityList, dsg.proList, ksg.G]
+        return [ksg.G, ksg.entityList, ksg.proList, dsg.G]
+
+    @staticmethod
+    def _addMP_ja_e(pos, inp):
+        """Static version of add for entity-only parsing in Japanese. The analyzer(and its backend process) is reused within a worker process."""
+        core = _workerCores.get("e")
+        if core is None:
+            core = _workerCores["e"] = EntityCoreJa()
+        core.entityList = [dict() for x in range(len(NEList))]
+        core.proList = list()
+        core.add(inp, pos)
+        return [core.G, core.entityList, core.proList]
+
     @staticmethod
     def _addMP_ja_d(pos, inp):
         """Static version of add for DSG parsing in Japanese."""
         core = DependencyCoreJa()
         core.add(inp, pos)
-        return core.G, core.entityList, core.proList
+        return [core.G, core.entityList, core.proList]
 
     @staticmethod
     def _addMP_ja_k(pos, inp, autosub=False):
         """Static version of add for KSG parsing in Japanese."""
         core = KnowledgeCoreJa(autosub=autosub)
         core.add(inp, pos)
-        return core.G, core.entityList, core.proList
\ No newline at end of file
+        return [core.G, core.entityList, core.proList]
\ No newline at end of file
@@ -0,0 +1,263 @@
+"""
+This module contains workspace, a host of many document graphs sharing resources.
+"""
+import os
+import zlib
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+from naruhodo.core.parser import parser
+from naruhodo.utils.misc import _collectStrings
+
+
+class _documentLock(object):
+    """
+    Lock of the parser of a document: the lock of its workspace, restoring the document first if it is cold.
+    """
+    def __init__(self, ws, name):
+        self.ws = ws
+        self.name = name
+
+    def __enter__(self):
+        self.ws._lock.acquire()
+        try:
+            self.ws._touch(self.name)
+        except BaseException:
+            self.ws._lock.release()
+            raise
+        return self
+
+    def __exit__(self, *args):
+        self.ws._lock.release()
+        return False
+
+
+class workspace(object):
+    """
+    Host of many document parsers sharing one backend analyzer, one multiprocessing pool(in 'mp' mode) and one string table.
+    All document parsers share the lock of the workspace, so the shared analyzer is used by one document at a time
+    (concurrent ingestion still parses with analyzers of its own, see parser.addAllConcurrent).
+    This lock serializes all documents: adding to, querying or restoring one document blocks every other document meanwhile.
+
+    Only the maxHot most recently used documents are hot. Other documents are cold:
+    their graphs and states are pickled and compressed in memory, and moved to files in the spill directory
+    when compressed documents exceed maxColdBytes. Each document keeps one parser object, with its settings, subscribers,
+    statistics and dedup index, and its graph is restored transparently when the parser is used again(through the workspace
+    or any handle returned by get). Attributes such as G are only valid while the parser is in use, so access them under
+    get or a method call, not from a handle kept across other documents being used.
+
+    The string table only holds strings of hot documents(cold documents are interned again when restored).
+    It is rebuilt from the hot documents when documents are removed or made cold, once it has doubled since the last rebuild.
+    """
+    def __init__(self, lang="ja", gtype="k", mp=False, nproc=0, maxHot=16, maxColdBytes=256 * 1024 * 1024, spill="", level=1, **options):
+        """
+        Initialize an empty workspace.
+        Other keyword options(coref, synonym, autosub, window...) are passed to the parser of each document.
+        Multi-view mode is not supported, as views are not kept for cold documents.
+        """
+        if options.get('multiview'):
+            raise ValueError("Multi-view mode is not supported in workspaces.")
+        self.lang = lang
+        self.gtype = gtype
+        self.mp = mp
+        self.options = options
+        """
+        Options of the parsers of documents.
+        """
+
+        self.maxHot = maxHot
+        """
+        Maximum number of documents kept as parsers.
+        """
+
+        self.maxColdBytes = maxColdBytes
+        """
+        Maximum size(bytes) of compressed documents kept in memory. Only used when spill is set.
+        """
+
+        self.spill = spill
+        """
+        Directory for documents spilled to disk(no spilling if empty).
+        """
+
+        self.level = level
+        """
+        zlib compression level of cold documents.
+        """
+
+        self.strings = dict()
+        """
+        String table shared by all documents.
+        """
+
+        self._prunedStrings = 0
+
+        self.pool = None
+        """
+        Multiprocessing pool shared by all documents in 'mp' mode.
+        """
+        if mp:
+            from multiprocessing import Pool
+            self.pool = Pool(processes=nproc) if nproc else Pool()
+        self._template = parser(lang=lang, gtype=gtype, **options)
+        self._cores = (self._template.core, self._template.subcore)
+        self._parsers = dict()
+        self._hot = OrderedDict()
+        self._cold = OrderedDict()
+        self._spilled = dict()
+        self._lock = threading.RLock()
+        if spill:
+            os.makedirs(spill, exist_ok=True)
+
+    def __len__(self):
+        return len(self._parsers)
+
+    def __contains__(self, name):
+        return name in self._parsers
+
+    def __getitem__(self, name):
+        return self.get(name)
+
+    def names(self):
+        """Return the list of document names."""
+        with self._lock:
+            return list(self._parsers)
+
+    def _newParser(self, name):
+        """Create the parser of document name using the shared resources."""
+        return parser(lang=self.lang, gtype=self.gtype, mp=self.mp, pool=self.pool, cores=self._cores, strings=self.strings, lock=_documentLock(self, name), **self.options)
+
+    def get(self, name, create=True):
+        """
+        Return the parser of document name, restoring it if it is cold.
+        The same parser object is returned for a document until it is removed.
+        A new document is created if it does not exist and create is True(KeyError otherwise).
+        """
+        with self._lock:
+            if name not in self._parsers:
+                if not create:
+                    raise KeyError(name)
+                self._parsers[name] = self._newParser(name)
+            self._touch(name)
+            return self._parsers[name]
+
+    def _touch(self, name):
+        """Mark document name as the most recently used one, restoring it if it is cold."""
+        if name in self._hot:
+            self._hot.move_to_end(name)
+            return
+        if name not in self._parsers:
+            # Handles of removed documents are detached from the workspace.
+            return
+        data = None
+        if name in self._cold:
+            data = self._cold.pop(name)
+        elif name in self._spilled:
+            path = self._spilled.pop(name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.remove(path)
+        self._hot[name] = True
+        if data is not None:
+            self._parsers[name]._thaw(pickle.loads(zlib.decompress(data)))
+        self._compressCold()
+
+    def add(self, name, inp, doc=None):
+        """Add a sentence to document name(optionally tagged with source document ID doc, see parser.retract)."""
+        with self._lock:
+            return self.get(name).add(inp, doc)
+
+    def addAll(self, name, inps, doc=None):
+        """Add a list of sentences to document name(optionally tagged with source document ID doc, see parser.retract)."""
+        with self._lock:
+            return self.get(name).addAll(inps, doc)
+
+    def remove(self, name):
+        """Remove document name."""
+        with self._lock:
+            self._parsers.pop(name, None)
+            self._hot.pop(name, None)
+            self._cold.pop(name, None)
+            path = self._spilled.pop(name, None)
+            if path is not None:
+                os.remove(path)
+            self._pruneStrings()
+
+    def compress(self, name):
+        """Make document name cold now(unless sentences of it are being parsed by concurrent ingestion)."""
+        with self._lock:
+            if name in self._hot and not self._parsers[name]._inflight:
+                del self._hot[name]
+                self._cold[name] = self._dump(self._parsers[name])
+                self._pruneStrings()
+                self._spillCold()
+
+    def _dump(self, p):
+        """Empty parser p and return its compressed graph and state."""
+        return zlib.compress(pickle.dumps(p._freeze(), protocol=pickle.HIGHEST_PROTOCOL), self.level)
+
+    def _compressCold(self):
+        """
+        Compress least recently used documents until at most maxHot documents are hot.
+        The most recently used document and documents being parsed by concurrent ingestion are kept hot.
+        """
+        while len(self._hot) > self.maxHot:
+            name = next((name for name in list(self._hot)[:-1] if not self._parsers[name]._inflight), None)
+            if name is None:
+                break
+            del self._hot[name]
+            self._cold[name] = self._dump(self._parsers[name])
+        self._pruneStrings()
+        self._spillCold()
+
+    def pruneStrings(self):
+        """Rebuild the string table from the hot documents now and return the number of strings dropped."""
+        with self._lock:
+            size = len(self.strings)
+            # The table is cleared in place, as it is shared with the parsers.
+            self.strings.clear()
+            for name in self._hot:
+                p = self._parsers[name]
+                _collectStrings(p.G, p.entityList, p.proList, self.strings)
+            self._prunedStrings = len(self.strings)
+            return size - len(self.strings)
+
+    def _pruneStrings(self):
+        """Rebuild the string table if it has doubled since the last rebuild."""
+        if len(self.strings) > 2 * self._prunedStrings:
+            self.pruneStrings()
+
+    def _spillCold(self):
+        """Move least recently compressed documents to disk until compressed documents fit in maxColdBytes."""
+        if not self.spill:
+            return
+        size = self.coldBytes()
+        while size > self.maxColdBytes and self._cold:
+            name, data = self._cold.popitem(last=False)
+            path = os.path.join(self.spill, "{0}.nrh".format(hashlib.sha1(repr(name).encode('utf-8')).hexdigest()))
+            with open(path, 'wb') as f:
+                f.write(data)
+            self._spilled[name] = path
+            size -= len(data)
+
+    def coldBytes(self):
+        """Return the size(bytes) of compressed documents kept in memory."""
+        return sum([len(data) for data in self._cold.values()])
+
+    def info(self):
+        """Return the numbers of hot, cold(in memory) and spilled documents, the size of cold documents and the size of the string table."""
+        with self._lock:
+            return dict(hot=len(self._hot), cold=len(self._cold), spilled=len(self._spilled), coldBytes=self.coldBytes(), strings=len(self.strings))
+
+    def close(self):
+        """Close the shared multiprocessing pool and remove spilled files."""
+        with self._lock:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool.join()
+                self.pool = None
+            for path in self._spilled.values():
+                if os.path.exists(path):
+                    os.remove(path)
+            self._spilled = dict()
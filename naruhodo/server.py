@@ -0,0 +1,365 @@
+"""
+Local HTTP service exposing a shared parser(stdlib asyncio only).
+
+Endpoints(JSON in and out):
+
+    POST /add      {"text": "..."} or {"sents": [...]}, optional "doc"(document ID, see parser.retract)
+    GET  /query    ?s=&p=&o=&limit=   triples of the graph(utils.triples.TripleIndex, empty parameters are wildcards)
+    GET  /export   graph as node-link JSON(parser.exportObj)
+    GET  /stats    sizes of the graph and micro-batching statistics
+
+Sentences of concurrent /add requests are coalesced into micro-batches passed to parser.addAll(or addAllConcurrent):
+a batch is sent to the backend when it holds maxBatch requests or maxDelay seconds after its first request.
+Larger maxDelay gives larger batches(throughput) at the cost of latency. Requests arriving while a batch is parsed form the next batch.
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from naruhodo.core.parser import parser
+from naruhodo.utils.misc import parseToSents
+from naruhodo.utils.triples import TripleIndex
+
+
+Reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+"""
+Reason phrases of HTTP status codes used by the service.
+"""
+
+class MicroBatcher(object):
+    """
+    Coalesce items submitted from coroutines into batches processed by func(list of items -> list of results) in an executor.
+    A result that is an exception is raised to the submitter of its item only. If func raises, all items of the batch fail.
+    """
+    def __init__(self, func, maxBatch=64, maxDelay=0.005, executor=None):
+        """Initialize a batcher. Call start from the event loop before submitting."""
+        self.func = func
+        self.maxBatch = maxBatch
+        """
+        Maximum number of items in a batch.
+        """
+
+        self.maxDelay = maxDelay
+        """
+        Maximum time(seconds) a batch waits for more items after its first one.
+        """
+
+        self.executor = executor
+        self.batches = 0
+        self.items = 0
+        """
+        Numbers of processed batches and items.
+        """
+
+        self._queue = None
+        self._task = None
+
+    def start(self):
+        """Start the batching task on the running event loop."""
+        self._queue = asyncio.Queue()
+        self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        """Cancel the batching task."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def submit(self, item):
+        """Submit an item and wait for its result."""
+        future = asyncio.get_event_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        """Wait for the next batch of (item, future)."""
+        loop = asyncio.get_event_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.maxDelay
+        while len(batch) < self.maxBatch:
+            timeout = deadline - loop.time()
+            try:
+                if timeout <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+        return batch
+
+    async def _run(self):
+        """Process batches until cancelled."""
+        loop = asyncio.get_event_loop()
+        while True:
+            batch = await self._collect()
+            try:
+                results = await loop.run_in_executor(self.executor, self.func, [item for item, future in batch])
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                for item, future in batch:
+                    if not future.done():
+                        future.set_exception(err)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (item, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+class Service(object):
+    """
+    HTTP service over a shared parser. See the module documentation for endpoints.
+    """
+    def __init__(self, p=None, maxBatch=64, maxDelay=0.005, nthreads=1, maxBody=16 * 1024 * 1024):
+        """
+        Initialize a service over parser p(a new KSG parser if None).
+        If nthreads is larger than 1, batches are parsed by parser.addAllConcurrent with nthreads threads.
+        """
+        self.parser = p if p is not None else parser()
+        """
+        The shared parser.
+        """
+
+        self.nthreads = nthreads
+        self.maxBody = maxBody
+        """
+        Maximum size(bytes) of request bodies.
+        """
+
+        self.index = TripleIndex().attach(self.parser)
+        """
+        Triple index following the graph of the parser.
+        """
+
+        self.batcher = MicroBatcher(self._addBatch, maxBatch, maxDelay, ThreadPoolExecutor(max_workers=1))
+        """
+        Micro-batcher of /add requests. Batches are parsed one at a time.
+        """
+
+        self.address = None
+        """
+        (host, port) the service listens on.
+        """
+
+        self.requests = 0
+        self._loop = None
+        self._thread = None
+
+    def _addBatch(self, items):
+        """
+        Add a batch of (sentences, document ID) items to the parser and return the result of each item.
+        Consecutive items of the same document are added at once, and the items of a group that fails get its exception as result.
+        """
+        p = self.parser
+        start = time.perf_counter()
+        errors = [None] * len(items)
+        i = 0
+        while i < len(items):
+            j = i
+            sents = list()
+            while j < len(items) and items[j][1] == items[i][1]:
+                sents.extend(items[j][0])
+                j += 1
+            try:
+                if self.nthreads > 1:
+                    p.addAllConcurrent(sents, nthreads=self.nthreads, doc=items[i][1])
+                else:
+                    p.addAll(sents, doc=items[i][1])
+            except Exception as err:
+                errors[i:j] = [err] * (j - i)
+            i = j
+        ret = dict(pos=p.pos, batch=len(items), elapsed=time.perf_counter() - start)
+        return [errors[i] if errors[i] is not None else dict(ret, sents=len(items[i][0])) for i in range(len(items))]
+
+    async def add(self, body):
+        """Handle /add."""
+        req = json.loads(body.decode('utf-8')) if body else dict()
+        if not isinstance(req, dict):
+            raise ValueError("Request body must be a JSON object.")
+        if isinstance(req.get('sents'), list):
+            sents = [str(sent) for sent in req['sents']]
+        elif isinstance(req.get('text'), str):
+            sents = parseToSents(req['text'])
+        else:
+            raise ValueError("Request needs \"text\" or \"sents\".")
+        doc = req.get('doc')
+        if doc is not None and (isinstance(doc, bool) or not isinstance(doc, (str, int))):
+            raise ValueError("\"doc\" must be a string or an integer.")
+        return await self.batcher.submit((sents, doc))
+
+    def query(self, params):
+        """Handle /query."""
+        args = dict([(key, params[key][0] or None) for key in ['s', 'p', 'o'] if key in params])
+        limit = int(params.get('limit', ['100'])[0])
+        with self.parser._lock:
+            triples = self.index.query(**args)
+        return dict(count=len(triples), triples=[list(item) for item in triples[:limit]])
+
+    def export(self, params):
+        """Handle /export."""
+        with self.parser._lock:
+            return self.parser.exportObj()
+
+    def stats(self, params):
+        """Handle /stats."""
+        with self.parser._lock:
+            ret = dict(
+                sents = self.parser.pos,
+                nodes = self.parser.G.number_of_nodes(),
+                edges = self.parser.G.number_of_edges(),
+                triples = len(self.index)
+            )
+        ret.update(
+            requests = self.requests,
+            batches = self.batcher.batches,
+            batched = self.batcher.items,
+            meanBatch = self.batcher.items / self.batcher.batches if self.batcher.batches else 0.,
+            maxBatch = self.batcher.maxBatch,
+            maxDelay = self.batcher.maxDelay
+        )
+        return ret
+
+    async def _dispatch(self, method, target, body):
+        """Return (status, JSON object) of a request."""
+        url = urlsplit(target)
+        params = parse_qs(url.query, keep_blank_values=True)
+        routes = dict(add="POST", query="GET", export="GET", stats="GET")
+        name = url.path.strip("/")
+        if name not in routes:
+            return 404, dict(error="Unknown endpoint: {0}".format(url.path))
+        if method != routes[name]:
+            return 405, dict(error="Use {0} for /{1}.".format(routes[name], name))
+        try:
+            if name == "add":
+                return 200, await self.add(body)
+            # Reads wait for the lock of the parser in a thread, so the event loop keeps accepting requests.
+            return 200, await asyncio.get_event_loop().run_in_executor(None, getattr(self, name), params)
+        except ValueError as err:
+            return 400, dict(error=str(err))
+        except Exception as err:
+            return 500, dict(error="{0}: {1}".format(err.__class__.__name__, err))
+
+    async def _respond(self, writer, status, obj, keep):
+        """Write a JSON response."""
+        data = json.dumps(obj, ensure_ascii=False).encode('utf-8')
+        head = "HTTP/1.1 {0} {1}\r\nContent-Type: application/json; charset=utf-8\r\nContent-Length: {2}\r\nConnection: {3}\r\n\r\n".format(
+            status, Reasons.get(status, ""), len(data), "keep-alive" if keep else "close")
+        writer.write(head.encode('latin-1') + data)
+        await writer.drain()
+
+    async def _handle(self, reader, writer):
+        """Serve requests of a connection(HTTP/1.1 keep-alive)."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, target, version = line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, dict(error="Bad request line."), False)
+                    break
+                headers = dict()
+                while True:
+                    line = await reader.readline()
+                    if line in [b"\r\n", b"\n", b""]:
+                        break
+                    name, sep, value = line.decode('latin-1').partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0) or 0)
+                if length > self.maxBody:
+                    await self._respond(writer, 413, dict(error="Request body too large."), False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                keep = version == "HTTP/1.1" and headers.get('connection', '').lower() != "close"
+                self.requests += 1
+                status, obj = await self._dispatch(method, target, body)
+                await self._respond(writer, status, obj, keep)
+                if not keep:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _serve(self, host, port, ready=None):
+        """Run the service on a new event loop until stop is called."""
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        server = loop.run_until_complete(asyncio.start_server(self._handle, host, port))
+        self.batcher.start()
+        self.address = server.sockets[0].getsockname()[:2]
+        if ready is not None:
+            ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            self.batcher.stop()
+            server.close()
+            loop.run_until_complete(server.wait_closed())
+            loop.close()
+            self._loop = None
+
+    def serveForever(self, host="127.0.0.1", port=8765):
+        """Run the service in the current thread until interrupted."""
+        try:
+            self._serve(host, port)
+        except KeyboardInterrupt:
+            pass
+
+    def start(self, host="127.0.0.1", port=0):
+        """Run the service in a background thread and return (host, port) it listens on(port 0 picks a free port)."""
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._serve, args=(host, port, ready), daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self.address
+
+    def stop(self):
+        """Stop the service started by start."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+def getArgParser():
+    """Return the argument parser of the service command."""
+    ap = argparse.ArgumentParser(prog="naruhodo-serve", description="Serve a shared naruhodo parser over local HTTP.")
+    ap.add_argument("--host", default="127.0.0.1", help="Address to listen on.")
+    ap.add_argument("--port", type=int, default=8765, help="Port to listen on.")
+    ap.add_argument("-l", "--lang", default="ja", help="Language of the input text.")
+    ap.add_argument("-g", "--gtype", default="k", choices=["d", "k"], help="Graph type: 'd' for DSG, 'k' for KSG.")
+    ap.add_argument("-m", "--mode", default="sp", choices=["sp", "mp"], help="Execution mode of batches: 'sp' for single process, 'mp' for multiprocessing.")
+    ap.add_argument("-n", "--nproc", type=int, default=0, help="Number of processes in 'mp' mode(0 for number of CPUs).")
+    ap.add_argument("-t", "--threads", type=int, default=1, help="Parse batches with this many threads(parser.addAllConcurrent) if larger than 1.")
+    ap.add_argument("--max-batch", type=int, default=64, help="Maximum number of requests in a micro-batch.")
+    ap.add_argument("--max-delay", type=float, default=0.005, help="Maximum seconds a micro-batch waits for more requests.")
+    ap.add_argument("--window", type=int, default=0, help="Only keep the latest sentences in the graph.")
+    ap.add_argument("--coref", action="store_true", help="Resolve coreferences.")
+    ap.add_argument("--synonym", action="store_true", help="Resolve synonyms.")
+    ap.add_argument("--autosub", action="store_true", help="Link potential subjects to predicates without subject.")
+    return ap
+
+def main(argv=None):
+    """Run the service with given command line arguments."""
+    args = getArgParser().parse_args(argv)
+    p = parser(lang=args.lang, gtype=args.gtype, mp=(args.mode == "mp"), nproc=args.nproc, coref=args.coref, synonym=args.synonym, autosub=args.autosub, window=args.window)
+    service = Service(p, maxBatch=args.max_batch, maxDelay=args.max_delay, nthreads=args.threads)
+    sys.stderr.write("Serving on http://{0}:{1}\n".format(args.host, args.port))
+    service.serveForever(args.host, args.port)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
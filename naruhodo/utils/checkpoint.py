@@ -0,0 +1,134 @@
+"""
+This module contains functions for saving and loading parser states as checkpoint files.
+
+A checkpoint file is a stream of pickled records:
+a header dict, one (key, attributes) record per node, one (key, attributes) record per edge
+and finally a dict holding the rest of the parser state(entity lists, pronoun list, coreference/synonym sets).
+Records are pickled one by one, so checkpoints can be read as a stream without loading the whole graph.
+"""
+import os
+import re
+import pickle
+import networkx as nx
+
+
+CheckpointVersion = 1
+"""
+Version of the checkpoint file format.
+"""
+
+_re_pro = re.compile(r'\[(\d+)@(\d+)\]')
+"""
+Precompiled regular expression for pronoun markers([pos@npro]) embedded in node names.
+"""
+
+def writeCheckpoint(filename, G, state, **meta):
+    """
+    Write graph G and parser state to a checkpoint file.
+    Additional meta information(lang, gtype, pos...) is stored in the header.
+    The file is written to a temporary file first and renamed, so readers never see partial checkpoints.
+    """
+    header = dict(format="naruhodo-checkpoint", version=CheckpointVersion, nodes=G.number_of_nodes(), edges=G.number_of_edges())
+    header.update(meta)
+    tmp = "{0}.tmp".format(filename)
+    with open(tmp, 'wb') as f:
+        pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+        for key, val in G.nodes.items():
+            pickle.dump((key, val), f, protocol=pickle.HIGHEST_PROTOCOL)
+        for key, val in G.edges.items():
+            pickle.dump((key, val), f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, filename)
+
+def readHeader(filename):
+    """Read only the header of a checkpoint file."""
+    with open(filename, 'rb') as f:
+        header = pickle.load(f)
+    if not isinstance(header, dict) or header.get('format') != "naruhodo-checkpoint":
+        raise ValueError("Not a naruhodo checkpoint file: {0}".format(filename))
+    return header
+
+def iterCheckpoint(filename, offsets=False):
+    """
+    Iterate through the records of a checkpoint file.
+    Yields ("header", header), ("node", key, attributes) for each node, ("edge", key, attributes) for each edge and ("state", state).
+    If offsets is True, node and edge records also have the offset of the record in the file(see readRecord) as last item.
+    """
+    with open(filename, 'rb') as f:
+        header = pickle.load(f)
+        if not isinstance(header, dict) or header.get('format') != "naruhodo-checkpoint":
+            raise ValueError("Not a naruhodo checkpoint file: {0}".format(filename))
+        yield ("header", header)
+        for kind in ["node", "edge"]:
+            for i in range(header[kind + 's']):
+                if offsets:
+                    offset = f.tell()
+                    key, val = pickle.load(f)
+                    yield (kind, key, val, offset)
+                else:
+                    key, val = pickle.load(f)
+                    yield (kind, key, val)
+        yield ("state", pickle.load(f))
+
+def readRecords(filename, offsets):
+    """Read the (key, attributes) node/edge records at given offsets(from iterCheckpoint) of a checkpoint file."""
+    ret = list()
+    with open(filename, 'rb') as f:
+        for offset in offsets:
+            f.seek(offset)
+            ret.append(pickle.load(f))
+    return ret
+
+def readCheckpoint(filename):
+    """Read a checkpoint file and return its header, graph and state."""
+    G = nx.DiGraph()
+    header = None
+    state = None
+    for record in iterCheckpoint(filename):
+        if record[0] == "node":
+            G.add_node(record[1], **record[2])
+        elif record[0] == "edge":
+            G.add_edge(*record[1], **record[2])
+        elif record[0] == "header":
+            header = record[1]
+        else:
+            state = record[1]
+    return header, G, state
+
+def remapKey(key, offset):
+    """Shift the sentence positions of pronoun markers embedded in key by offset."""
+    if not offset or '@' not in key:
+        return key
+    return _re_pro.sub(lambda m: "[{0}@{1}]".format(int(m.group(1)) + offset, m.group(2)), key)
+
+def offsetState(G, state, offset):
+    """
+    Return a copy of graph G and state with all sentence positions shifted by offset.
+    Pronoun markers in node names, 'sub' attributes, entity lists, pronoun list and coreference sets are remapped accordingly.
+    """
+    ret = nx.DiGraph()
+    for key, val in G.nodes.items():
+        info = dict(val)
+        info['pos'] = [pos + offset for pos in val['pos']]
+        for attr in ['sub', 'meaning', 'synonym']:
+            if isinstance(info.get(attr), str):
+                info[attr] = remapKey(info[attr], offset)
+        ret.add_node(remapKey(key, offset), **info)
+    for key, val in G.edges.items():
+        info = dict(val)
+        if 'pos' in info:
+            info['pos'] = [pos + offset for pos in val['pos']]
+        ret.add_edge(remapKey(key[0], offset), remapKey(key[1], offset), **info)
+    new = dict(state)
+    new['entityList'] = [dict([(remapKey(key, offset), [pos + offset for pos in val]) for key, val in item.items()]) for item in state['entityList']]
+    new['proList'] = list()
+    for pro in state['proList']:
+        pro = dict(pro)
+        pro['name'] = remapKey(pro['name'], offset)
+        pro['pos'] += offset
+        new['proList'].append(pro)
+    for attr in ['corefDict', 'coref_1stPerson', 'coref_3rdPersonM', 'coref_3rdPersonF', 'synonymDict']:
+        new[attr] = set([remapKey(key, offset) for key in state[attr]])
+    if 'docs' in state:
+        new['docs'] = dict([(doc, [pos + offset for pos in val]) for doc, val in state['docs'].items()])
+    return ret, new
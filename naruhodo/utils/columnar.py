@@ -0,0 +1,261 @@
+"""
+This module contains functions for exporting graphs as typed columnar files and a reader for them. Requires numpy.
+
+An export is a directory of .npy files plus manifest.json, with four tables:
+
+    nodes             : one row per node(key and scalar attributes such as count, type, label...)
+    edges             : one row per edge(src and dst node rows, weight, type, label...)
+    node_occurrences  : one row per node occurrence(node row, sentence position pos and list attributes such as func, surface...)
+    edge_occurrences  : one row per edge occurrence(edge row and sentence position pos)
+
+Column {table}.{column}.npy holds numbers, or int32 codes(-1 for missing values) into a string dictionary for string columns.
+A string dictionary is stored as the utf-8 blob of all strings({table}.{column}.blob.npy) and their offsets({table}.{column}.offsets.npy).
+Integer columns with missing values are stored as float64 with NaN, as pandas does.
+Files are loaded with numpy memory-mapping, so only the columns used are read.
+"""
+import os
+import json
+import numpy as np
+
+
+ColumnsFormat = "naruhodo-columns"
+"""
+Format name in the manifest of a columnar export.
+"""
+
+ColumnsVersion = 1
+"""
+Version of the columnar export format.
+"""
+
+_missing = object()
+"""
+Marker of missing values.
+"""
+
+def _intType(lo, hi):
+    """Return the smallest integer dtype holding values in [lo, hi]."""
+    for dtype in [np.int8, np.int16, np.int32]:
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return dtype
+    return np.int64
+
+def _column(values):
+    """
+    Return (array, list of strings or None) encoding values, or None if all values are missing.
+    Numbers are stored as integers or float64, other values as codes into the list of strings.
+    """
+    present = [val for val in values if val is not _missing and val is not None]
+    if not present:
+        return None
+    if all([isinstance(val, (bool, int, float, np.number)) for val in present]):
+        if len(present) < len(values) or any([isinstance(val, (float, np.floating)) for val in present]):
+            return np.array([np.nan if val is _missing or val is None else val for val in values], dtype=np.float64), None
+        return np.array(values, dtype=_intType(min(present), max(present))), None
+    table = dict()
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, val in enumerate(values):
+        if val is _missing or val is None:
+            codes[i] = -1
+            continue
+        if not isinstance(val, str):
+            val = str(val)
+        code = table.get(val)
+        if code is None:
+            code = len(table)
+            table[val] = code
+        codes[i] = code
+    return codes, list(table)
+
+def _occurrences(items, ref):
+    """
+    Return the columns(name -> list of values) of occurrences of items((attribute dict) list).
+    Occurrences are given by the 'pos' list of each item. List attributes of the same length are split by occurrence,
+    and scalar values of attributes that are lists elsewhere are repeated for each occurrence.
+    """
+    attrs = set()
+    for val in items:
+        for attr, item in val.items():
+            if isinstance(item, list) and attr != 'pos':
+                attrs.add(attr)
+    cols = dict([(attr, list()) for attr in [ref, 'pos'] + sorted(attrs)])
+    for i, val in enumerate(items):
+        pos = val.get('pos', [])
+        if not isinstance(pos, list):
+            continue
+        cols[ref].extend([i] * len(pos))
+        cols['pos'].extend(pos)
+        for attr in attrs:
+            item = val.get(attr, _missing)
+            if isinstance(item, list):
+                cols[attr].extend(item if len(item) == len(pos) else [_missing] * len(pos))
+            else:
+                cols[attr].extend([item] * len(pos))
+    return cols
+
+def _scalars(items, first):
+    """Return the columns(name -> list of values) of scalar attributes of items, after the columns in first."""
+    lists = set()
+    attrs = list()
+    for val in items:
+        for attr, item in val.items():
+            if isinstance(item, list):
+                lists.add(attr)
+            elif attr not in attrs:
+                attrs.append(attr)
+    cols = dict(first)
+    for attr in attrs:
+        if attr not in lists and attr not in cols:
+            cols[attr] = [val.get(attr, _missing) for val in items]
+    return cols
+
+def exportColumns(G, path):
+    """
+    Export graph G as columnar files to directory path(created if needed) and return the manifest.
+    The manifest of a previous export is removed first and the new one is written last, so readers never see a partial export.
+    """
+    os.makedirs(path, exist_ok=True)
+    if os.path.exists(os.path.join(path, "manifest.json")):
+        os.remove(os.path.join(path, "manifest.json"))
+    keys = list(G.nodes)
+    index = dict([(key, i) for i, key in enumerate(keys)])
+    nodes = [G.nodes[key] for key in keys]
+    edgeKeys = list(G.edges)
+    edges = [G.edges[key] for key in edgeKeys]
+    tables = [
+        ('nodes', _scalars(nodes, [('key', keys)])),
+        ('edges', _scalars(edges, [('src', [index[key[0]] for key in edgeKeys]), ('dst', [index[key[1]] for key in edgeKeys])])),
+        ('node_occurrences', _occurrences(nodes, 'node')),
+        ('edge_occurrences', _occurrences(edges, 'edge'))
+    ]
+    manifest = dict(format=ColumnsFormat, version=ColumnsVersion, tables=dict())
+    for table, cols in tables:
+        rows = len(next(iter(cols.values()))) if cols else 0
+        info = dict(rows=rows, columns=dict())
+        for name, values in cols.items():
+            col = _column(values) if rows else None
+            if col is None:
+                continue
+            arr, strings = col
+            np.save(os.path.join(path, "{0}.{1}.npy".format(table, name)), arr)
+            info['columns'][name] = dict(dtype=arr.dtype.name)
+            if strings is not None:
+                encoded = [val.encode('utf-8') for val in strings]
+                offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+                np.cumsum([len(val) for val in encoded], out=offsets[1:])
+                np.save(os.path.join(path, "{0}.{1}.offsets.npy".format(table, name)), offsets)
+                np.save(os.path.join(path, "{0}.{1}.blob.npy".format(table, name)), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+                info['columns'][name]['strings'] = len(strings)
+        manifest['tables'][table] = info
+    tmp = os.path.join(path, "manifest.json.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(path, "manifest.json"))
+    return manifest
+
+
+class StringDict(object):
+    """
+    Memory-mapped string dictionary of a string column. Strings are decoded on access.
+    """
+    def __init__(self, offsets, blob):
+        """Initialize with the arrays of offsets and utf-8 blob."""
+        self.offsets = offsets
+        self.blob = blob
+        self._codes = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, code):
+        """Return the string of code(None for -1)."""
+        if code < 0:
+            return None
+        return self.blob[self.offsets[code]:self.offsets[code + 1]].tobytes().decode('utf-8')
+
+    def decode(self, codes):
+        """Return the list of strings of codes."""
+        return [self[code] for code in codes.tolist()]
+
+    def code(self, val):
+        """Return the code of string val, or -1 if it is not in the dictionary."""
+        if self._codes is None:
+            self._codes = dict([(self[i], i) for i in range(len(self))])
+        return self._codes.get(val, -1)
+
+
+class ColumnStore(object):
+    """
+    Reader of a columnar export. Columns are memory-mapped on first access.
+    """
+    def __init__(self, path):
+        """Open the export in directory path."""
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        """
+        Manifest of the export(tables, numbers of rows and columns with their dtypes).
+        """
+        if self.manifest.get('format') != ColumnsFormat:
+            raise ValueError("Not a naruhodo columnar export: {0}".format(path))
+        self._cache = dict()
+
+    def tables(self):
+        """Return the list of table names."""
+        return list(self.manifest['tables'])
+
+    def columns(self, table):
+        """Return the list of column names of table."""
+        return list(self.manifest['tables'][table]['columns'])
+
+    def rows(self, table):
+        """Return the number of rows of table."""
+        return self.manifest['tables'][table]['rows']
+
+    def _load(self, name):
+        """Memory-map file name of the export."""
+        if name not in self._cache:
+            try:
+                self._cache[name] = np.load(os.path.join(self.path, name), mmap_mode='r')
+            except ValueError:
+                # Empty arrays can not be memory-mapped.
+                self._cache[name] = np.load(os.path.join(self.path, name))
+        return self._cache[name]
+
+    def column(self, table, name):
+        """Return the array(read-only memory-map) of a column. String columns are returned as codes(see strings)."""
+        if name not in self.manifest['tables'][table]['columns']:
+            raise KeyError("No column {0} in table {1}.".format(name, table))
+        return self._load("{0}.{1}.npy".format(table, name))
+
+    def strings(self, table, name):
+        """Return the string dictionary(StringDict) of a string column."""
+        if 'strings' not in self.manifest['tables'][table]['columns'][name]:
+            raise ValueError("Column {0} of table {1} is not a string column.".format(name, table))
+        return StringDict(self._load("{0}.{1}.offsets.npy".format(table, name)), self._load("{0}.{1}.blob.npy".format(table, name)))
+
+    def load(self, table, columns=None, decode=False):
+        """
+        Return dict of column name -> array for given columns of table(all columns if None).
+        If decode is True, string columns are decoded to lists of strings.
+        """
+        ret = dict()
+        for name in columns if columns is not None else self.columns(table):
+            arr = self.column(table, name)
+            if decode and 'strings' in self.manifest['tables'][table]['columns'][name]:
+                arr = self.strings(table, name).decode(arr)
+            ret[name] = arr
+        return ret
+
+    def toPandas(self, table, columns=None):
+        """Return a pandas DataFrame of given columns of table. String columns become categoricals sharing the codes. Requires pandas."""
+        import pandas as pd
+        data = dict()
+        for name in columns if columns is not None else self.columns(table):
+            arr = self.column(table, name)
+            if 'strings' in self.manifest['tables'][table]['columns'][name]:
+                strings = self.strings(table, name)
+                arr = pd.Categorical.from_codes(np.asarray(arr), categories=[strings[i] for i in range(len(strings))])
+            data[name] = arr
+        return pd.DataFrame(data)
@@ -0,0 +1,159 @@
+"""
+This module contains Deduplicator, a filter for exact and near-duplicate sentences.
+
+Exact duplicates are found by hashing the text. Near duplicates are found with MinHash signatures of character shingles
+and locality-sensitive hashing(LSH): signatures are split into bands, and sentences sharing any band are compared by
+the fraction of equal signature values, which estimates the Jaccard similarity of their shingle sets.
+Only the latest capacity sentences are remembered, so memory use is bounded.
+"""
+import zlib
+import random
+import hashlib
+from collections import OrderedDict
+
+
+_prime = (1 << 61) - 1
+"""
+Mersenne prime used as the modulus of MinHash permutations.
+"""
+
+DedupModes = ["skip", "count"]
+"""
+Modes of duplicate handling.
+==============================
+'skip': duplicates are dropped
+'count': duplicates are not parsed, but counted as another occurrence of the original sentence
+"""
+
+class Deduplicator(object):
+    """
+    Class for detecting exact and near-duplicate sentences within the latest capacity sentences.
+    """
+    def __init__(self, mode="skip", capacity=100000, threshold=0.8, shingle=3, numPerm=64, bands=16, seed=1):
+        """
+        Initialize a deduplicator.
+        Sentences whose estimated Jaccard similarity(of shingles of given length) with a remembered one is at least threshold are near duplicates.
+        numPerm must be divisible by bands. Set threshold to 1 or larger to only detect exact duplicates.
+        """
+        if mode not in DedupModes:
+            raise ValueError("Unknown dedup mode: {0}".format(mode))
+        if numPerm % bands != 0:
+            raise ValueError("numPerm must be divisible by bands.")
+        self.mode = mode
+        """
+        Mode of duplicate handling(see DedupModes).
+        """
+
+        self.capacity = capacity
+        """
+        Maximum number of remembered sentences.
+        """
+
+        self.threshold = threshold
+        """
+        Minimum estimated Jaccard similarity of near duplicates.
+        """
+
+        self.shingle = shingle
+        self.bands = bands
+        self.rows = numPerm // bands
+        rnd = random.Random(seed)
+        self._perms = [(rnd.randrange(1, _prime), rnd.randrange(0, _prime)) for i in range(numPerm)]
+        self._entries = OrderedDict()
+        """
+        Remembered sentences: exact hash -> (key, signature), oldest first.
+        """
+
+        self._buckets = [dict() for i in range(bands)]
+        """
+        LSH buckets: band signature -> set of exact hashes, for each band.
+        """
+
+        self._last = None
+        self.exact = 0
+        self.near = 0
+        """
+        Number of exact and near duplicates found.
+        """
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        """Forget all remembered sentences."""
+        self._entries = OrderedDict()
+        self._buckets = [dict() for i in range(self.bands)]
+        self._last = None
+
+    @staticmethod
+    def _hash(text):
+        """Return the exact hash of text."""
+        return hashlib.md5(text.encode('utf-8')).digest()
+
+    def signature(self, text):
+        """Return the MinHash signature of text(None if it is shorter than a shingle)."""
+        if len(text) < self.shingle or self.threshold >= 1:
+            return None
+        hashes = set([zlib.crc32(text[i:i + self.shingle].encode('utf-8')) for i in range(len(text) - self.shingle + 1)])
+        return tuple([min([(a * h + b) % _prime for h in hashes]) for a, b in self._perms])
+
+    def _bands(self, sig):
+        """Return the band signatures of sig."""
+        return [sig[i * self.rows:(i + 1) * self.rows] for i in range(self.bands)]
+
+    def _fingerprint(self, text):
+        """Return (exact hash, signature) of text, reusing the last one computed."""
+        if self._last is not None and self._last[0] == text:
+            return self._last[1]
+        ret = (self._hash(text), self.signature(text))
+        self._last = (text, ret)
+        return ret
+
+    def find(self, text):
+        """Return the key of a remembered duplicate of text, or None."""
+        h, sig = self._fingerprint(text)
+        if h in self._entries:
+            self.exact += 1
+            return self._entries[h][0]
+        if sig is None:
+            return None
+        candidates = set()
+        for i, band in enumerate(self._bands(sig)):
+            candidates.update(self._buckets[i].get(band, ()))
+        best = None
+        bestSim = self.threshold
+        for c in candidates:
+            key, other = self._entries[c]
+            sim = sum([1 for x, y in zip(sig, other) if x == y]) / float(len(sig))
+            if sim >= bestSim:
+                best = key
+                bestSim = sim
+        if best is not None:
+            self.near += 1
+        return best
+
+    def add(self, text, key):
+        """Remember text with key(e.g. its sentence position). The oldest sentence is forgotten when over capacity."""
+        h, sig = self._fingerprint(text)
+        if h in self._entries:
+            self._remove(h)
+        self._entries[h] = (key, sig)
+        if sig is not None:
+            for i, band in enumerate(self._bands(sig)):
+                try:
+                    self._buckets[i][band].add(h)
+                except KeyError:
+                    self._buckets[i][band] = set([h])
+        while len(self._entries) > self.capacity:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, h):
+        """Forget the sentence with exact hash h."""
+        key, sig = self._entries.pop(h)
+        if sig is not None:
+            for i, band in enumerate(self._bands(sig)):
+                bucket = self._buckets[i].get(band)
+                if bucket is not None:
+                    bucket.discard(h)
+                    if not bucket:
+                        del self._buckets[i][band]
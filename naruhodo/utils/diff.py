@@ -0,0 +1,145 @@
+"""
+This module contains functions for comparing two graph snapshots(parsers, networkx graphs or checkpoint files).
+
+Each node and edge is first reduced to a summary: its key, its count(nodes) or weight(edges) and a 32-bit hash(crc32) of its other attributes.
+Summaries are sorted by key and the two sorted streams are merged, so only keys and hashes are held in memory
+and checkpoint files are read as a stream without building networkx graphs.
+Attributes are then compared one by one only for the elements whose summaries differ(read again by their offsets in checkpoint files).
+"""
+import zlib
+from naruhodo.utils.checkpoint import iterCheckpoint, readRecords
+
+
+def _strip(val, scalar, ignore):
+    """Return a copy of attribute dict val without the count/weight attribute scalar and attributes in ignore."""
+    ret = dict(val)
+    ret.pop(scalar, None)
+    for attr in ignore:
+        ret.pop(attr, None)
+    return ret
+
+def _records(src):
+    """
+    Iterate through the nodes and edges of src(a parser, a networkx graph or the filename of a checkpoint).
+    Yields (kind, key, attributes, offset of the record in the checkpoint or None) where kind is 'node' or 'edge'.
+    """
+    if isinstance(src, str):
+        for record in iterCheckpoint(src, offsets=True):
+            if record[0] in ["node", "edge"]:
+                yield record
+    else:
+        G = getattr(src, 'G', src)
+        for key, val in G.nodes.items():
+            yield 'node', key, val, None
+        for key, val in G.edges.items():
+            yield 'edge', key, val, None
+
+_scalars = dict(node='count', edge='weight')
+"""
+Attribute compared as a number for each kind of element.
+"""
+
+def _summaries(src, ignore=()):
+    """Return dict of kind -> list of summaries (key, count or weight, hash of other attributes, offset) of src sorted by key."""
+    ret = dict(node=list(), edge=list())
+    for kind, key, val, offset in _records(src):
+        scalar = _scalars[kind]
+        ret[kind].append((tuple(key) if kind == 'edge' else key, val.get(scalar, 1), zlib.crc32(repr(_strip(val, scalar, ignore)).encode('utf-8')), offset))
+    for kind in ret:
+        ret[kind].sort(key=lambda item: item[0])
+    return ret
+
+def _join(A, B):
+    """Merge two lists of summaries sorted by key. Yields (summary in A or None, summary in B or None)."""
+    i = 0
+    j = 0
+    while i < len(A) or j < len(B):
+        if j >= len(B) or (i < len(A) and A[i][0] < B[j][0]):
+            yield A[i], None
+            i += 1
+        elif i >= len(A) or B[j][0] < A[i][0]:
+            yield None, B[j]
+            j += 1
+        else:
+            yield A[i], B[j]
+            i += 1
+            j += 1
+
+def _collect(src, items, ignore):
+    """Return dict of (kind, key) -> attributes(without count/weight and ignored ones) of the elements of src given as (kind, summary)."""
+    if isinstance(src, str):
+        offsets = sorted([item[3] for kind, item in items])
+        attrs = dict(zip(offsets, [val for key, val in readRecords(src, offsets)]))
+        return dict([((kind, item[0]), _strip(attrs[item[3]], _scalars[kind], ignore)) for kind, item in items])
+    G = getattr(src, 'G', src)
+    return dict([((kind, item[0]), _strip((G.nodes if kind == 'node' else G.edges)[item[0]], _scalars[kind], ignore)) for kind, item in items])
+
+def iterDiff(a, b, ignore=()):
+    """
+    Iterate through the differences from snapshot a to snapshot b(parsers, networkx graphs or checkpoint filenames).
+    Yields (kind, change, key, delta, attrs) where kind is 'node' or 'edge', change is 'added', 'removed' or 'changed',
+    delta is the difference of count(nodes) or weight(edges) and attrs is the sorted list of added, removed or changed attribute names.
+    Attributes in ignore are not compared.
+    """
+    A = _summaries(a, ignore)
+    B = _summaries(b, ignore)
+    found = list()
+    for kind in ['node', 'edge']:
+        for x, y in _join(A[kind], B[kind]):
+            if x is None or y is None or x[1] != y[1] or x[2] != y[2]:
+                found.append((kind, x, y))
+    del A, B
+    attrsA = _collect(a, [(kind, x) for kind, x, y in found if x is not None], ignore)
+    attrsB = _collect(b, [(kind, y) for kind, x, y in found if y is not None], ignore)
+    for kind, x, y in found:
+        if y is None:
+            yield kind, 'removed', x[0], -x[1], sorted(attrsA[(kind, x[0])])
+        elif x is None:
+            yield kind, 'added', y[0], y[1], sorted(attrsB[(kind, y[0])])
+        else:
+            old = attrsA[(kind, x[0])]
+            new = attrsB[(kind, y[0])]
+            attrs = sorted([attr for attr in set(old).union(new) if attr not in old or attr not in new or old[attr] != new[attr]])
+            # Summaries may also differ only by the order of attributes.
+            if x[1] != y[1] or attrs:
+                yield kind, 'changed', x[0], y[1] - x[1], attrs
+
+
+class GraphDiff(object):
+    """
+    Differences from snapshot a to snapshot b(parsers, networkx graphs or checkpoint filenames). See iterDiff.
+    """
+    def __init__(self, a, b, ignore=()):
+        """Compare snapshots a and b, ignoring attributes in ignore."""
+        self.nodes = dict(added=list(), removed=list(), changed=list())
+        """
+        Dict of change('added', 'removed' or 'changed') -> list of (key, count delta, attribute names) of nodes.
+        """
+
+        self.edges = dict(added=list(), removed=list(), changed=list())
+        """
+        Dict of change('added', 'removed' or 'changed') -> list of (key, weight delta, attribute names) of edges.
+        """
+
+        for kind, change, key, delta, attrs in iterDiff(a, b, ignore):
+            getattr(self, kind + 's')[change].append((key, delta, attrs))
+
+    def __len__(self):
+        return sum([len(val) for val in self.nodes.values()]) + sum([len(val) for val in self.edges.values()])
+
+    def summary(self):
+        """Return the numbers of added/removed/changed nodes and edges, the total count/weight deltas and the numbers of changes by attribute."""
+        ret = dict()
+        for kind, changes in [('nodes', self.nodes), ('edges', self.edges)]:
+            attrs = dict()
+            for key, delta, names in changes['changed']:
+                for name in names:
+                    attrs[name] = attrs.get(name, 0) + 1
+            ret[kind] = dict(
+                added = len(changes['added']),
+                removed = len(changes['removed']),
+                changed = len(changes['changed']),
+                delta = sum([item[1] for val in changes.values() for item in val]),
+                attrs = attrs
+            )
+        return ret
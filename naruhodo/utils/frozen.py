@@ -0,0 +1,289 @@
+"""
+This module contains FrozenGraph, an immutable compressed-sparse-row(CSR) snapshot of a generated graph for analytics.
+Requires numpy.
+"""
+import numpy as np
+import networkx as nx
+
+
+_missing = object()
+
+class _Columns(object):
+    """
+    Attribute dicts of a sequence of elements, stored by attribute instead of one dict per element.
+    Integers, floats and lists of integers are stored in numpy arrays(lists are flattened with offsets),
+    other values in plain lists referring to the values of the source(strings are immutable).
+    """
+    def __init__(self, attrs):
+        """Store the list of attribute dicts attrs."""
+        n = len(attrs)
+        names = dict()
+        for val in attrs:
+            for key in val:
+                names[key] = True
+        self.columns = dict()
+        """
+        Dict of attribute name -> (values, offsets of lists or None, boolean array of elements having the attribute or None if all have it).
+        """
+        for name in names:
+            values = [val.get(name, _missing) for val in attrs]
+            present = np.array([item is not _missing for item in values], dtype=bool)
+            if present.all():
+                present = None
+            if all([isinstance(item, list) for item in values if item is not _missing]):
+                offsets = np.zeros(n + 1, dtype=np.int64)
+                np.cumsum([len(item) if item is not _missing else 0 for item in values], out=offsets[1:])
+                offsets.setflags(write=False)
+                self.columns[name] = (self._array([x for item in values if item is not _missing for x in item]), offsets, present)
+            else:
+                self.columns[name] = (self._array(values), None, present)
+
+    @staticmethod
+    def _array(values):
+        """Return values as a read-only numpy array if they are all integers or all floats(missing values aside), as a list otherwise."""
+        items = [item for item in values if item is not _missing]
+        for t, dtype in [(int, np.int64), (float, np.float64)]:
+            if items and all([type(item) is t for item in items]):
+                try:
+                    ret = np.array([item if item is not _missing else 0 for item in values], dtype=dtype)
+                except OverflowError:
+                    break
+                ret.setflags(write=False)
+                return ret
+        return list(values)
+
+    def get(self, i):
+        """Return a new attribute dict of element i."""
+        ret = dict()
+        for name, (values, offsets, present) in self.columns.items():
+            if present is not None and not present[i]:
+                continue
+            if offsets is not None:
+                item = values[offsets[i]:offsets[i + 1]]
+                ret[name] = item.tolist() if isinstance(item, np.ndarray) else item
+            else:
+                item = values[i]
+                ret[name] = item.item() if isinstance(item, np.generic) else item
+        return ret
+
+
+class FrozenGraph(object):
+    """
+    Immutable CSR snapshot of a networkx DiGraph.
+
+    Nodes are numbered 0..n-1 in the order of keys. Outgoing edges of node i are edges indptr[i]..indptr[i+1]-1,
+    whose targets, weights and type codes are stored in indices, weight and etype.
+    Edge types are coded by their index in etypes.
+    """
+    def __init__(self, G):
+        """Build a snapshot of graph G."""
+        self.keys = list(G.nodes)
+        """
+        List of node keys. Node i of the snapshot is keys[i].
+        """
+
+        self.index = dict([(key, i) for i, key in enumerate(self.keys)])
+        """
+        Dict of node key -> node number.
+        """
+
+        n = len(self.keys)
+        self.count = np.array([G.nodes[key].get('count', 1) for key in self.keys], dtype=np.int64)
+        """
+        Array of node counts.
+        """
+
+        self.ntype = np.array([G.nodes[key].get('type', -1) for key in self.keys], dtype=np.int8)
+        """
+        Array of node types.
+        """
+
+        self.etypes = sorted(set([val.get('type', '') for val in G.edges.values()]))
+        """
+        List of edge types. Edge type codes in etype are indices of this list.
+        """
+
+        codes = dict([(val, i) for i, val in enumerate(self.etypes)])
+        m = G.number_of_edges()
+        src = np.empty(m, dtype=np.int64)
+        dst = np.empty(m, dtype=np.int64)
+        weight = np.empty(m, dtype=np.float64)
+        etype = np.empty(m, dtype=np.int16)
+        attrs = list()
+        for i, (key, val) in enumerate(G.edges.items()):
+            src[i] = self.index[key[0]]
+            dst[i] = self.index[key[1]]
+            weight[i] = val.get('weight', 1)
+            etype[i] = codes[val.get('type', '')]
+            attrs.append(val)
+        # Sort edges by source(stable, so edges keep their order per node).
+        order = np.argsort(src, kind='stable')
+        self.src = src[order]
+        """
+        Array of edge sources.
+        """
+
+        self.indices = dst[order]
+        """
+        Array of edge targets.
+        """
+
+        self.weight = weight[order]
+        """
+        Array of edge weights.
+        """
+
+        self.etype = etype[order]
+        """
+        Array of edge type codes.
+        """
+
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        """
+        Array of offsets of outgoing edges of each node.
+        """
+        np.cumsum(np.bincount(self.src, minlength=n), out=self.indptr[1:])
+        # Reverse(CSC) order for predecessor lookups.
+        self._rorder = np.argsort(self.indices, kind='stable')
+        self._rindptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=n), out=self._rindptr[1:])
+        # Attributes are stored as columns, so the snapshot does not change with the source graph.
+        self._nodeAttrs = _Columns([G.nodes[key] for key in self.keys])
+        self._edgeAttrs = _Columns([attrs[i] for i in order])
+        for arr in [self.count, self.ntype, self.src, self.indices, self.weight, self.etype, self.indptr, self._rorder, self._rindptr]:
+            arr.setflags(write=False)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def numberOfEdges(self):
+        """Return the number of edges."""
+        return len(self.indices)
+
+    def _codes(self, etypes):
+        """Return the array of codes of given edge types(unknown types are ignored)."""
+        if isinstance(etypes, str):
+            etypes = [etypes]
+        return np.array([self.etypes.index(val) for val in etypes if val in self.etypes], dtype=np.int16)
+
+    def _edgeMask(self, etypes=None):
+        """Return a boolean mask of edges of given types(None for all edges)."""
+        if etypes is None:
+            return np.ones(len(self.indices), dtype=bool)
+        return np.isin(self.etype, self._codes(etypes))
+
+    def successors(self, key):
+        """Return the list of successors of node key."""
+        i = self.index[key]
+        return [self.keys[j] for j in self.indices[self.indptr[i]:self.indptr[i + 1]]]
+
+    def predecessors(self, key):
+        """Return the list of predecessors of node key."""
+        i = self.index[key]
+        return [self.keys[j] for j in self.src[self._rorder[self._rindptr[i]:self._rindptr[i + 1]]]]
+
+    def degreeByType(self, etypes=None, direction="out", weighted=False):
+        """
+        Return the array of node degrees counting only edges of given types(None for all types).
+        direction is 'out', 'in' or 'all'. If weighted, edge weights are summed instead of counting edges.
+        """
+        mask = self._edgeMask(etypes)
+        w = self.weight[mask] if weighted else None
+        n = len(self.keys)
+        ret = np.zeros(n, dtype=np.float64 if weighted else np.int64)
+        if direction in ["out", "all"]:
+            ret = ret + np.bincount(self.src[mask], weights=w, minlength=n)
+        if direction in ["in", "all"]:
+            ret = ret + np.bincount(self.indices[mask], weights=w, minlength=n)
+        if direction not in ["out", "in", "all"]:
+            raise ValueError("Unknown direction: {0}".format(direction))
+        return ret
+
+    def pagerank(self, alpha=0.85, weighted=True, etypes=None, tol=1.0e-6, maxIter=100):
+        """
+        Return the array of PageRank scores(same definition as networkx.pagerank with uniform personalization).
+        Only edges of given types are used if etypes is given.
+        """
+        n = len(self.keys)
+        if n == 0:
+            return np.zeros(0)
+        mask = self._edgeMask(etypes)
+        src = self.src[mask]
+        dst = self.indices[mask]
+        w = self.weight[mask] if weighted else np.ones(len(src))
+        outw = np.bincount(src, weights=w, minlength=n)
+        dangling = outw == 0
+        # Transition probability of each edge.
+        p = w / np.where(outw[src] > 0, outw[src], 1.)
+        x = np.full(n, 1. / n)
+        for i in range(maxIter):
+            last = x
+            x = alpha * np.bincount(dst, weights=last[src] * p, minlength=n) + (alpha * last[dangling].sum() + 1. - alpha) / n
+            if np.abs(x - last).sum() < n * tol:
+                return x
+        raise nx.PowerIterationFailedConvergence(maxIter)
+
+    @staticmethod
+    def _gather(indptr, nodes):
+        """Return the positions(in CSR order) of all edges of given nodes."""
+        starts = indptr[nodes]
+        lens = indptr[nodes + 1] - starts
+        total = lens.sum()
+        if total == 0:
+            return np.zeros(0, dtype=np.int64)
+        offsets = np.cumsum(lens) - lens
+        return np.repeat(starts - offsets, lens) + np.arange(total)
+
+    def bfs(self, sources, maxDepth=None, direction="out", etypes=None):
+        """
+        Breadth first search from node keys in sources.
+        Return the array of hop distances of all nodes(-1 for unreachable nodes).
+        Frontiers are expanded level by level with array operations.
+        """
+        n = len(self.keys)
+        dist = np.full(n, -1, dtype=np.int64)
+        frontier = np.unique(np.array([self.index[key] for key in sources], dtype=np.int64))
+        dist[frontier] = 0
+        mask = self._edgeMask(etypes)
+        depth = 0
+        while len(frontier) > 0 and (maxDepth is None or depth < maxDepth):
+            found = list()
+            if direction in ["out", "all"]:
+                edges = self._gather(self.indptr, frontier)
+                found.append(self.indices[edges[mask[edges]]])
+            if direction in ["in", "all"]:
+                edges = self._rorder[self._gather(self._rindptr, frontier)]
+                found.append(self.src[edges[mask[edges]]])
+            if direction not in ["out", "in", "all"]:
+                raise ValueError("Unknown direction: {0}".format(direction))
+            nodes = np.unique(np.concatenate(found))
+            frontier = nodes[dist[nodes] < 0]
+            depth += 1
+            dist[frontier] = depth
+        return dist
+
+    def reachable(self, sources, maxDepth=None, direction="out", etypes=None):
+        """Return the list of node keys reachable from node keys in sources(including the sources)."""
+        dist = self.bfs(sources, maxDepth, direction, etypes)
+        return [self.keys[i] for i in np.nonzero(dist >= 0)[0]]
+
+    def top(self, scores, n=10):
+        """Return the list of (key, score) of n nodes with highest scores."""
+        order = np.argsort(-scores, kind='stable')[:n]
+        return [(self.keys[i], scores[i].item()) for i in order]
+
+    def toNetworkx(self, nodes=None):
+        """
+        Convert the snapshot(or the subgraph induced by node keys in nodes) back to a networkx DiGraph.
+        """
+        G = nx.DiGraph()
+        if nodes is None:
+            selected = np.ones(len(self.keys), dtype=bool)
+        else:
+            selected = np.zeros(len(self.keys), dtype=bool)
+            selected[[self.index[key] for key in nodes]] = True
+        for i in np.nonzero(selected)[0]:
+            G.add_node(self.keys[i], **self._nodeAttrs.get(i))
+        for e in np.nonzero(selected[self.src] & selected[self.indices])[0]:
+            G.add_edge(self.keys[self.src[e]], self.keys[self.indices[e]], **self._edgeAttrs.get(e))
+        return G
@@ -1,12 +1,13 @@
 """
 Module for miscellaneous utility functions.
+Visualization(nxpd) and numerical(numpy) dependencies are imported on first use to keep importing naruhodo cheap.
 """
 import re
 import json
+import heapq
 from math import sqrt
-import numpy as np
+from functools import lru_cache
 import networkx as nx
-from nxpd import draw
 from naruhodo.utils.dicts import NodeType2StyleDict, NodeType2ColorDict, NodeType2FontColorDict, EdgeType2StyleDict, EdgeType2ColorDict
 
 
@@ -22,15 +23,39 @@ _re4 = re.compile(r'\<.*?\>')
 Precompiled regular expressions for getting rid of parenthesis.
 """
 
-def preprocessText(text):
-    """Get rid of weird parts from the text that interferes analysis."""
-    text = text.replace("\n", "").replace("|", "、").replace(" ", "").strip()
-    text = _re1.sub("", text)
-    text = _re2.sub("", text)
-    text = _re3.sub("", text)
-    text = _re4.sub("", text)
+_preprocessTable = str.maketrans({"\n": "", "|": "、", " ": ""})
+"""
+Translation table for characters replaced by preprocessText.
+"""
+
+PreprocessCacheSize = 65536
+"""
+Maximum number of strings memoized by preprocessText.
+"""
+
+def _preprocessText(text):
+    """Uncached version of preprocessText, used for strings that are unlikely to repeat(e.g. whole sentences)."""
+    text = text.translate(_preprocessTable).strip()
+    # Parenthesis are removed in the same order as before, but only searched for when present.
+    if "（" in text:
+        text = _re1.sub("", text)
+    if "[" in text:
+        text = _re2.sub("", text)
+    if "(" in text:
+        text = _re3.sub("", text)
+    if "<" in text:
+        text = _re4.sub("", text)
     return text
 
+@lru_cache(maxsize=PreprocessCacheSize)
+def preprocessText(text):
+    """Get rid of weird parts from the text that interferes analysis. Results are memoized."""
+    return _preprocessText(text)
+
+def preprocessTexts(texts):
+    """Apply preprocessText to a list of strings."""
+    return [preprocessText(text) for text in texts]
+
 def parseToSents(context):
         """Parse given context into list of individual sentences."""
         return [sent.strip().replace('*', "-") for sent in _re_sent.split(context) if sent.strip() != ""]
@@ -57,7 +82,7 @@ def getNodeProperties(info, depth=False):
     ret['width'] = info['count']*0.75
     ret['count'] = info['count']
     if depth:
-        d = np.average(info['depth']) # Average depth of the node
+        d = sum(info['depth']) / float(len(info['depth'])) # Average depth of the node
         d = min(d, 5.) # Normalize d to a range of [0, 6]
         cs = [255, 80, 0] # Base reference color at start
         ct = [255, 255, 255] # Base reference color at end
@@ -96,6 +121,7 @@ def inclusive(A, B):
 
 def cosSimilarity(A, B):
     """Compute the cosine similarity between vectors A and B."""
+    import numpy as np
     return np.dot(A, B) / sqrt(np.dot(A, A) * np.dot(B, B))
 
 def harmonicSim(AG, B):
@@ -116,21 +142,70 @@ def decorate(G, depth, rankdir):
         ret.add_edge(*key, **getEdgeProperties(val))
     return ret
 
-def show(G, depth=False, rankdir='TB'):
-    """Decorate and draw given graph using nxpd in notebook."""
+def lodView(G, minCount=0, minWeight=0, kcore=0, topN=0, etypes=None):
+    """
+    Return a level-of-detail view of G for drawing large graphs.
+    The view is a read-only networkx subgraph view sharing node/edge data with G(nothing is copied).
+    ===============================================================================================
+    minCount: hide nodes whose count is smaller than minCount.
+    minWeight: hide edges whose weight is smaller than minWeight.
+    kcore: only show nodes in the k-core(computed on the visible edges, ignoring self loops).
+    topN: only show the topN nodes with the largest degree(computed on the visible edges).
+    etypes: only show edges whose type is in etypes.
+    """
+    nodes = G.nodes
+    edges = G.edges
+    view = G
+    if minCount > 0:
+        view = nx.subgraph_view(view, filter_node=lambda n: nodes[n]['count'] >= minCount)
+    if minWeight > 0 or etypes is not None:
+        etypes = set(etypes) if etypes is not None else None
+        def _showEdge(u, v):
+            info = edges[u, v]
+            return info['weight'] >= minWeight and (etypes is None or info['type'] in etypes)
+        view = nx.subgraph_view(view, filter_edge=_showEdge)
+    if kcore > 0:
+        cores = nx.core_number(nx.subgraph_view(view, filter_edge=lambda u, v: u != v))
+        visible = set([n for n, k in cores.items() if k >= kcore])
+        view = nx.subgraph_view(view, filter_node=nx.filters.show_nodes(visible))
+    if topN > 0:
+        visible = set([n for n, d in heapq.nlargest(topN, view.degree, key=lambda x: x[1])])
+        view = nx.subgraph_view(view, filter_node=nx.filters.show_nodes(visible))
+    return view
+
+def show(G, depth=False, rankdir='TB', **lod):
+    """
+    Decorate and draw given graph using nxpd in notebook.
+    Level-of-detail options(see lodView) are applied before decoration if given.
+    """
+    from nxpd import draw
+    if lod:
+        G = lodView(G, **lod)
     return draw(decorate(G, depth, rankdir), show='ipynb')
 
-def plotToFile(G, filename, depth=False, rankdir='TB'):
-    """Output given graph to a png file using nxpd."""
+def plotToFile(G, filename, depth=False, rankdir='TB', **lod):
+    """
+    Output given graph to a png file using nxpd.
+    Level-of-detail options(see lodView) are applied before decoration if given.
+    """
+    from nxpd import draw
+    if lod:
+        G = lodView(G, **lod)
     return draw(decorate(G, depth, rankdir), filename=filename, show=False)
 
-def _mergeGraph(A, B):
-    """Return the merged graph of A and B."""
+def _mergeGraph(A, B, events=None):
+    """
+    Return the merged graph of A and B.
+    If events is a list, change events describing the merge are appended to it.
+    """
     for key, val in B.nodes.items():
         if A.has_node(key):
             A.nodes[key]['count'] += val['count']
+            added = list()
+            # Sentences already merged are skipped, but each occurrence of a new sentence is kept(one per count).
+            merged = set(A.nodes[key]['pos'])
             for i in range(len(val['pos'])):
-                if val['pos'][i] not in A.nodes[key]['pos']:
+                if val['pos'][i] not in merged:
                     A.nodes[key]['pos'].append(val['pos'][i])
                     A.nodes[key]['lpos'].append(val['lpos'][i])
                     A.nodes[key]['func'].append(val['func'][i])
@@ -138,15 +213,213 @@ def _mergeGraph(A, B):
                     A.nodes[key]['yomi'].append(val['yomi'][i])
                     if 'depth' in A.nodes[key]:
                         A.nodes[key]['depth'].append(val['depth'][i])
+                    added.append(val['pos'][i])
+            if events is not None:
+                events.append(dict(type="node_occurrence", node=key, pos=added, count=val['count']))
         else:
             A.add_node(key, **val)
+            if events is not None:
+                events.append(dict(type="node_added", node=key, pos=list(val['pos']), count=val['count']))
     for key, val in B.edges.items():
         if A.has_edge(*key):
             A.edges[key[0], key[1]]['weight'] += val['weight']
+            if 'pos' in val:
+                A.edges[key[0], key[1]].setdefault('pos', list()).extend(val['pos'])
+            if events is not None:
+                events.append(dict(type="edge_weight", edge=key, etype=val['type'], weight=val['weight']))
         else:
             A.add_edge(*key, **val)
+            if events is not None:
+                events.append(dict(type="edge_added", edge=key, etype=val['type'], weight=val['weight']))
     return A
 
+def _intern(val, table):
+    """Return the string equal to val from table(adding val if absent). Lists are interned item by item, other values are returned as is."""
+    if isinstance(val, str):
+        return table.setdefault(val, val)
+    if isinstance(val, list):
+        return [table.setdefault(item, item) if isinstance(item, str) else item for item in val]
+    return val
+
+def _internGraph(G, table):
+    """Return a copy of graph G whose node names and string attributes are taken from the string table."""
+    ret = nx.DiGraph()
+    for key, val in G.nodes.items():
+        ret.add_node(_intern(key, table), **dict([(attr, _intern(item, table)) for attr, item in val.items()]))
+    for key, val in G.edges.items():
+        ret.add_edge(_intern(key[0], table), _intern(key[1], table), **dict([(attr, _intern(item, table)) for attr, item in val.items()]))
+    return ret
+
+def _internEntityList(entityList, table):
+    """Return a copy of entityList whose entity names are taken from the string table."""
+    return [dict([(_intern(key, table), val) for key, val in item.items()]) for item in entityList]
+
+def _internProList(proList, table):
+    """Return a copy of proList whose names are taken from the string table."""
+    return [dict([(key, _intern(val, table)) for key, val in item.items()]) for item in proList]
+
+def _collectStrings(G, entityList, proList, table):
+    """Add the node names and string attributes of G, entity names and pronoun names to the string table in place."""
+    for key, val in G.nodes.items():
+        _intern(key, table)
+        for item in val.values():
+            _intern(item, table)
+    for val in G.edges.values():
+        for item in val.values():
+            _intern(item, table)
+    for item in entityList:
+        for key in item:
+            _intern(key, table)
+    for item in proList:
+        for val in item.values():
+            _intern(val, table)
+
+def _indexGraph(G, nodeIndex, edgeIndex):
+    """Add the nodes and edges of G to the given sentence position indexes."""
+    for key, val in G.nodes.items():
+        for pos in val['pos']:
+            try:
+                nodeIndex[pos].add(key)
+            except KeyError:
+                nodeIndex[pos] = set([key])
+    for key, val in G.edges.items():
+        for pos in val.get('pos', []):
+            try:
+                edgeIndex[pos].add(key)
+            except KeyError:
+                edgeIndex[pos] = set([key])
+
+def _indexEntities(entityList, nodeIndex):
+    """Add the entities of entityList to the given sentence position index(for entity-only parsing)."""
+    for item in entityList:
+        for key, val in item.items():
+            for pos in val:
+                try:
+                    nodeIndex[pos].add(key)
+                except KeyError:
+                    nodeIndex[pos] = set([key])
+
+def _unindex(index, positions, key):
+    """Remove key from the given sentence position index at positions."""
+    for pos in positions:
+        keys = index.get(pos)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del index[pos]
+
+def _countCoref(G, edge, n, events=None):
+    """Add n to the count of the antecedent of coreference edge(the antecedent is counted once per resolved pronoun)."""
+    info = G.nodes[edge[0]]
+    info['count'] = max(info['count'] + n, 1)
+    if events is not None:
+        events.append(dict(type="node_count", node=edge[0], count=n))
+
+def _removePositions(G, positions, nodeIndex, edgeIndex, events=None):
+    """
+    Remove the occurrences at given sentence positions from G.
+    Node counts and edge weights are decremented, and nodes and edges with no occurrence left are dropped.
+    Antecedents of removed coreference edges are counted once less for each of them.
+    Only nodes and edges registered in the position indexes are visited, and dropped nodes and edges are removed from the indexes.
+    Return the set of visited nodes and the set of dropped nodes.
+    """
+    nodes = set()
+    edges = set()
+    for pos in positions:
+        nodes.update(nodeIndex.pop(pos, ()))
+        edges.update(edgeIndex.pop(pos, ()))
+    for key in edges:
+        if not G.has_edge(*key):
+            continue
+        info = G.edges[key]
+        kept = [pos for pos in info['pos'] if pos not in positions]
+        removed = len(info['pos']) - len(kept)
+        info['pos'] = kept
+        info['weight'] -= removed
+        if info['type'] == "coref":
+            _countCoref(G, key, -removed, events)
+        if info['weight'] <= 0 or not kept:
+            _unindex(edgeIndex, kept, key)
+            G.remove_edge(*key)
+            if events is not None:
+                events.append(dict(type="edge_removed", edge=key, etype=info['type']))
+        elif events is not None:
+            events.append(dict(type="edge_trimmed", edge=key, etype=info['type'], weight=-removed))
+    dropped = set()
+    for key in nodes:
+        if not G.has_node(key):
+            continue
+        info = G.nodes[key]
+        keep = [i for i in range(len(info['pos'])) if info['pos'][i] not in positions]
+        removed = len(info['pos']) - len(keep)
+        if not keep:
+            for edge in list(G.in_edges(key)) + list(G.out_edges(key)):
+                # Edges removed with the node(e.g. coreference edges of other sentences).
+                _unindex(edgeIndex, G.edges[edge].get('pos', []), edge)
+                if G.edges[edge]['type'] == "coref" and edge[0] != key:
+                    _countCoref(G, edge, -len(G.edges[edge]['pos']), events)
+                if events is not None:
+                    events.append(dict(type="edge_removed", edge=edge, etype=G.edges[edge]['type']))
+            if events is not None:
+                events.append(dict(type="node_removed", node=key))
+            _unindex(nodeIndex, info['pos'], key)
+            G.remove_node(key)
+            dropped.add(key)
+            continue
+        for attr in ['pos', 'lpos', 'func', 'surface', 'yomi', 'depth']:
+            if isinstance(info.get(attr), list):
+                info[attr] = [info[attr][i] for i in keep]
+        info['count'] = max(info['count'] - removed, 1)
+        if events is not None:
+            events.append(dict(type="node_trimmed", node=key, pos=list(info['pos']), count=-removed))
+    return nodes, dropped
+
+def _replayPosition(G, orig, pos, nodeIndex, edgeIndex, events=None):
+    """
+    Count every occurrence at sentence position orig once more at position pos(e.g. for a duplicate sentence).
+    Node counts and edge weights are incremented and the position indexes are updated.
+    Return the set of affected nodes.
+    """
+    nodes = nodeIndex.get(orig, set())
+    for key in nodes:
+        if not G.has_node(key):
+            # Entities indexed without a node in entity-only parsing.
+            continue
+        info = G.nodes[key]
+        idx = [i for i in range(len(info['pos'])) if info['pos'][i] == orig]
+        for attr in ['lpos', 'func', 'surface', 'yomi', 'depth']:
+            if isinstance(info.get(attr), list) and len(info[attr]) == len(info['pos']):
+                info[attr].extend([info[attr][i] for i in idx])
+        info['pos'].extend([pos] * len(idx))
+        info['count'] += len(idx)
+        if events is not None:
+            events.append(dict(type="node_occurrence", node=key, pos=[pos], count=len(idx)))
+    edges = set([key for key in edgeIndex.get(orig, ()) if G.has_edge(*key)])
+    for key in edges:
+        info = G.edges[key]
+        n = info['pos'].count(orig)
+        info['pos'].extend([pos] * n)
+        info['weight'] += n
+        if events is not None:
+            events.append(dict(type="edge_weight", edge=key, etype=info['type'], weight=n))
+        if info['type'] == "coref":
+            _countCoref(G, key, n, events)
+    if nodes:
+        nodeIndex[pos] = set(nodes)
+    if edges:
+        edgeIndex[pos] = set(edges)
+    return nodes
+
+def _removeEntityPositions(entityList, keys, positions):
+    """Remove given sentence positions of entities in keys from entityList."""
+    for i in range(len(entityList)):
+        for key in keys:
+            if key in entityList[i]:
+                entityList[i][key] = [pos for pos in entityList[i][key] if pos not in positions]
+                if not entityList[i][key]:
+                    del entityList[i][key]
+    return entityList
+
 def _mergeEntityList(A, B):
     """Return merged entityList os A and B."""
     for i in range(len(B)):
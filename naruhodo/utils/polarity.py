@@ -1,36 +1,249 @@
 """
 This module contains polarity related functionalities.
+
+Polarity lexicons are stored in a compact binary file that is memory-mapped on loading,
+so a large lexicon is neither unpickled nor copied into each worker process:
+
+    header   : magic(8 bytes), number of entries n(uint32), size of lemma blob(uint32)
+    offsets  : n + 1 uint32 offsets of lemmas in the blob
+    scores   : n float32 scores
+    blob     : utf-8 encoded lemmas sorted by their bytes
+
+Lookups are binary searches over the sorted lemmas.
+"""
+import os
+import mmap
+import struct
+from naruhodo.utils.misc import preprocessText
+
+
+LexiconMagic = b"NRHDPOL1"
+"""
+Magic bytes at the beginning of a compiled polarity lexicon.
+"""
+
+_header = struct.Struct("<8sII")
+"""
+Header structure of a compiled polarity lexicon.
+"""
+
+LabelScores = {"p": 1., "n": -1., "e": 0., "pos": 1., "neg": -1., "neu": 0.}
+"""
+Scores of polarity labels accepted in text lexicons.
 """
-import pickle
-import sys
 
 class polarity(object):
     """
     Class for word and phrase polarity.
+    Scores are looked up first in the in-memory dict pdict, then in the loaded(memory-mapped) lexicon.
     """
     def __init__(self, lang='ja', pdict=''):
         """
-        Constructor. If no pdict given, will initialize with an empty pdict.
+        Constructor. pdict is a dict of lemma -> score, or the filename of a compiled lexicon to load.
+        If no pdict given, will initialize with an empty pdict.
         """
         self.lang = lang
-        if pdict:
-            pass
-        else:
-            self.pdict = dict()
+        self.pdict = dict()
+        """
+        Dict of lemma -> score, used for building lexicons and for overriding the loaded lexicon.
+        """
+
+        self.fname = ""
+        """
+        Filename of the loaded lexicon.
+        """
+
+        self._file = None
+        self._mm = None
+        self._n = 0
+        self._blob = 0
+        if isinstance(pdict, dict):
+            self.pdict = dict(pdict)
+        elif pdict:
+            self.load(pdict)
+
+    def __len__(self):
+        """Return the number of entries in the loaded lexicon plus pdict."""
+        return self._n + len(self.pdict)
+
+    def __contains__(self, lemma):
+        return lemma in self.pdict or self._find(lemma) >= 0
+
+    def __getstate__(self):
+        """Pickle only the filename of the loaded lexicon, so worker processes map the same file instead of copying it."""
+        return dict(lang=self.lang, pdict=self.pdict, fname=self.fname)
+
+    def __setstate__(self, state):
+        self.__init__(state['lang'], state['pdict'])
+        if state['fname']:
+            self.load(state['fname'])
+
+    def close(self):
+        """Unmap the loaded lexicon."""
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+        self._file = None
+        self._mm = None
+        self._n = 0
+        self._blob = 0
+        self.fname = ""
 
     def load(self, fname):
         """
-        Load saved polarity dict from file.
+        Load a compiled polarity lexicon from file(memory-mapped).
         """
+        self.close()
+        f = open(fname, 'rb')
         try:
-            with open(fname, 'r') as f: 
-                self.pdict = pickle.load(f)
+            size = os.fstat(f.fileno()).st_size
+            if size < _header.size:
+                raise ValueError("Not a polarity lexicon file: {0}".format(fname))
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
         except:
-            sys.exit('Failed loading pdict file: {0}. Please check the file path.'.format(fname))
+            f.close()
+            raise
+        magic, n, blob = _header.unpack_from(mm, 0)
+        if magic != LexiconMagic or size != _header.size + 8 * n + 4 + blob:
+            mm.close()
+            f.close()
+            raise ValueError("Not a polarity lexicon file: {0}".format(fname))
+        self._file = f
+        self._mm = mm
+        self._n = n
+        self._blob = _header.size + 8 * n + 4
+        self.fname = fname
+
+    def loadText(self, fname):
+        """
+        Add entries of a tab separated text lexicon(lemma, score or p/n/e label per line) to pdict.
+        Lines that can not be parsed are skipped.
+        """
+        with open(fname, 'r', encoding='utf-8') as f:
+            for line in f:
+                items = line.rstrip("\n").split("\t")
+                if len(items) < 2 or not items[0]:
+                    continue
+                label = items[1].strip()
+                try:
+                    score = LabelScores[label] if label in LabelScores else float(label)
+                except ValueError:
+                    continue
+                self.pdict[items[0]] = score
 
     def save(self, fname):
         """
-        Save polarity dict to file.
+        Save the polarity dict(merged with the loaded lexicon) to file as a compiled lexicon.
+        """
+        entries = dict(self.items())
+        self.build(fname, entries)
+
+    @staticmethod
+    def build(fname, entries):
+        """
+        Compile a dict(or iterable of (lemma, score) pairs) into a lexicon file.
+        """
+        if isinstance(entries, dict):
+            entries = entries.items()
+        items = sorted([(key.encode('utf-8'), float(val)) for key, val in entries])
+        offsets = [0]
+        for key, val in items:
+            offsets.append(offsets[-1] + len(key))
+        n = len(items)
+        tmp = "{0}.tmp".format(fname)
+        with open(tmp, 'wb') as f:
+            f.write(_header.pack(LexiconMagic, n, offsets[-1]))
+            f.write(struct.pack("<{0}I".format(n + 1), *offsets))
+            f.write(struct.pack("<{0}f".format(n), *[val for key, val in items]))
+            for key, val in items:
+                f.write(key)
+        os.replace(tmp, fname)
+
+    def _key(self, i):
+        """Return the i-th lemma(bytes) of the loaded lexicon."""
+        start, end = struct.unpack_from("<II", self._mm, _header.size + 4 * i)
+        return self._mm[self._blob + start:self._blob + end]
+
+    def _score(self, i):
+        """Return the i-th score of the loaded lexicon."""
+        return struct.unpack_from("<f", self._mm, _header.size + 4 * (self._n + 1) + 4 * i)[0]
+
+    def _search(self, key, lo=0):
+        """Return the leftmost index in the loaded lexicon whose lemma is not less than key(bytes)."""
+        hi = self._n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _find(self, lemma):
+        """Return the index of lemma in the loaded lexicon, or -1."""
+        if not self._n:
+            return -1
+        key = lemma.encode('utf-8')
+        i = self._search(key)
+        if i < self._n and self._key(i) == key:
+            return i
+        return -1
+
+    def items(self):
+        """Iterate through (lemma, score) pairs of the loaded lexicon and pdict(pdict overrides the lexicon)."""
+        for i in range(self._n):
+            key = self._key(i).decode('utf-8')
+            if key not in self.pdict:
+                yield key, self._score(i)
+        for key, val in self.pdict.items():
+            yield key, val
+
+    def score(self, lemma, default=None):
+        """Return the polarity score of lemma, or default if it is not in the lexicon."""
+        if lemma in self.pdict:
+            return self.pdict[lemma]
+        i = self._find(lemma)
+        if i < 0:
+            return default
+        return self._score(i)
+
+    def scores(self, lemmas, default=None):
+        """
+        Return the list of polarity scores of lemmas.
+        Distinct lemmas are looked up once in sorted order, narrowing the search range as it proceeds.
+        """
+        found = dict()
+        keys = sorted(set([lemma.encode('utf-8') for lemma in lemmas if lemma not in self.pdict]))
+        lo = 0
+        for key in keys:
+            lo = self._search(key, lo)
+            if lo >= self._n:
+                break
+            if self._key(lo) == key:
+                found[key.decode('utf-8')] = self._score(lo)
+        ret = list()
+        for lemma in lemmas:
+            if lemma in self.pdict:
+                ret.append(self.pdict[lemma])
+            else:
+                ret.append(found.get(lemma, default))
+        return ret
+
+    def scoreGraph(self, G, attr='polarity'):
+        """
+        Annotate every node of graph G with its polarity score in node attribute attr.
+        Nodes are looked up by their normalized label. Scores of negated nodes(negative == 1) are flipped.
+        Nodes not in the lexicon get score 0. Return the number of nodes found in the lexicon.
         """
-        with open(fname, 'r') as f:
-            pickle.dump(self.pdict, f)
+        nodes = list(G.nodes.items())
+        lemmas = [preprocessText(val.get('label', key)) for key, val in nodes]
+        found = 0
+        for (key, val), score in zip(nodes, self.scores(lemmas)):
+            if score is None:
+                score = 0.
+            else:
+                found += 1
+                if val.get('negative') == 1 and score:
+                    score = -score
+            val[attr] = score
+        return found
@@ -2,22 +2,428 @@
 This module contains basic scraping functions.
 """
 
-from bs4 import BeautifulSoup as bs
-import urllib.request
+import os
+import re
+import json
+import codecs
+import hashlib
+import threading
+import http.client
+import urllib.parse
+from html.parser import HTMLParser
+from concurrent.futures import ThreadPoolExecutor
+
+
+ChunkSize = 16384
+"""
+Number of bytes read from a response at once.
+"""
+
+_re_charset = re.compile(br'''<meta[^>]+charset\s*=\s*["']?([a-zA-Z0-9_\-]+)''', re.IGNORECASE)
+"""
+Precompiled regular expression for charset declarations in meta tags.
+"""
+
+class ScraperError(Exception):
+    """Raised when the content of an url can not be retrieved."""
+    def __init__(self, url, reason):
+        super(ScraperError, self).__init__("{0}: {1}".format(url, reason))
+        self.url = url
+        """
+        Url that failed.
+        """
+
+        self.reason = reason
+        """
+        Description of the failure.
+        """
+
+class _ParagraphExtractor(HTMLParser):
+    """
+    Incremental HTML parser collecting the text of <p> elements.
+    Text inside <script>/<style> is skipped. Each paragraph is passed to callback as soon as it is closed.
+    """
+    SkipTags = set(['script', 'style', 'noscript', 'template'])
+    """
+    Tags whose content is not text.
+    """
+
+    ClosingTags = set(['p', 'div', 'ul', 'ol', 'dl', 'table', 'section', 'article', 'header', 'footer', 'blockquote', 'pre', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'body', 'html'])
+    """
+    Tags implicitly closing an open paragraph.
+    """
+
+    def __init__(self, callback):
+        """Initialize the parser."""
+        super(_ParagraphExtractor, self).__init__(convert_charrefs=True)
+        self.callback = callback
+        self._skip = 0
+        self._text = None
+
+    def _end(self):
+        """Emit the current paragraph."""
+        if self._text is not None:
+            text = "".join(self._text)
+            self._text = None
+            if text.strip():
+                self.callback(text)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SkipTags:
+            self._skip += 1
+        elif tag == 'p':
+            self._end()
+            self._text = list()
+        elif tag in self.ClosingTags:
+            self._end()
+
+    def handle_startendtag(self, tag, attrs):
+        if tag == 'p':
+            self._end()
+
+    def handle_endtag(self, tag):
+        if tag in self.SkipTags:
+            self._skip = max(self._skip - 1, 0)
+        elif tag == 'p' or tag in self.ClosingTags:
+            self._end()
+
+    def handle_data(self, data):
+        if self._text is not None and not self._skip:
+            self._text.append(data)
+
+    def close(self):
+        super(_ParagraphExtractor, self).close()
+        self._end()
+
+def _charset(resp, head):
+    """Determine the charset of a response from its header, or from meta tags in the first bytes of the body."""
+    charset = resp.headers.get_content_charset()
+    if not charset:
+        m = _re_charset.search(head)
+        charset = m.group(1).decode('ascii') if m else 'utf-8'
+    try:
+        codecs.lookup(charset)
+    except LookupError:
+        charset = 'utf-8'
+    return charset
+
+def extractParagraphs(resp, callback):
+    """
+    Stream the body of a HTTP response through an incremental HTML parser.
+    callback is called with the text of each <p> element as soon as it is complete.
+    """
+    head = resp.read(ChunkSize)
+    decoder = codecs.getincrementaldecoder(_charset(resp, head))(errors='replace')
+    parser = _ParagraphExtractor(callback)
+    chunk = head
+    while chunk:
+        parser.feed(decoder.decode(chunk))
+        chunk = resp.read(ChunkSize)
+    parser.feed(decoder.decode(b'', final=True))
+    parser.close()
+
+
+class _ConnectionPool(object):
+    """
+    Pool of keep-alive HTTP(S) connections.
+    At most perHost requests to the same host run at the same time, and idle connections are reused for later requests.
+    """
+    def __init__(self, perHost=2, timeout=10.):
+        """Initialize an empty pool."""
+        self.perHost = perHost
+        self.timeout = timeout
+        self._idle = dict()
+        self._slots = dict()
+        self._lock = threading.Lock()
+
+    def _slot(self, key):
+        """Return the semaphore limiting concurrent requests to host key."""
+        with self._lock:
+            if key not in self._slots:
+                self._slots[key] = threading.BoundedSemaphore(self.perHost)
+            return self._slots[key]
+
+    def _new(self, key):
+        """Open a new connection to host key."""
+        scheme, netloc = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+    def _get(self, key):
+        """Return an idle connection to host key, or a new one. Return also whether the connection is reused."""
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        return self._new(key), False
+
+    def _put(self, key, conn):
+        """Return a connection to the pool."""
+        with self._lock:
+            self._idle.setdefault(key, list()).append(conn)
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle = self._idle
+            self._idle = dict()
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+    def request(self, url, headers, handler, redirects=5):
+        """
+        Send a GET request to url and return handler(response).
+        The handler is called while the connection is held, so it can read the response body incrementally.
+        Redirects are followed up to given times.
+        """
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ["http", "https"]:
+            raise ValueError("Unsupported url: {0}".format(url))
+        key = (parts.scheme, parts.netloc)
+        path = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+        with self._slot(key):
+            conn, reused = self._get(key)
+            try:
+                conn.request("GET", path, headers=headers)
+                resp = conn.getresponse()
+            except (http.client.HTTPException, ConnectionError):
+                conn.close()
+                if not reused:
+                    raise
+                # Stale keep-alive connection, retry once with a new connection.
+                conn = self._new(key)
+                conn.request("GET", path, headers=headers)
+                resp = conn.getresponse()
+            try:
+                if resp.status in [301, 302, 303, 307, 308] and resp.getheader("Location") and redirects > 0:
+                    resp.read()
+                    location = urllib.parse.urljoin(url, resp.getheader("Location"))
+                else:
+                    location = None
+                    ret = handler(resp)
+                    # Drain the rest of the body so the connection can be reused.
+                    resp.read()
+            except Exception:
+                conn.close()
+                raise
+            if resp.will_close:
+                conn.close()
+            else:
+                self._put(key, conn)
+        if location:
+            return self.request(location, headers, handler, redirects - 1)
+        return ret
+
+class PageCache(object):
+    """
+    On-disk cache of paragraphs extracted from urls.
+    Each url is stored in its own JSON file together with the ETag/Last-Modified validators of the response,
+    so NScraper can revalidate cached pages with conditional requests.
+    When the files exceed maxBytes in total, least recently used entries are removed.
+    """
+    def __init__(self, directory, maxBytes=64 * 1024 * 1024):
+        """Open(or create) a cache in directory."""
+        self.directory = directory
+        """
+        Directory holding the cache files.
+        """
+
+        self.maxBytes = maxBytes
+        """
+        Maximum total size(bytes) of the cache files.
+        """
+
+        self.hits = 0
+        """
+        Number of pages served from the cache(not modified).
+        """
+
+        self.misses = 0
+        """
+        Number of pages downloaded and extracted.
+        """
+
+        self._lock = threading.Lock()
+        self._size = dict()
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith(".json"):
+                self._size[name] = os.path.getsize(os.path.join(directory, name))
+
+    def _name(self, url):
+        """Return the file name of url."""
+        return "{0}.json".format(hashlib.sha1(url.encode('utf-8')).hexdigest())
+
+    def size(self):
+        """Return the total size(bytes) of the cache files."""
+        with self._lock:
+            return sum(self._size.values())
+
+    def get(self, url):
+        """Return the cached entry(dict of url, etag, modified, paragraphs) of url, or None."""
+        path = os.path.join(self.directory, self._name(url))
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            # Mark as recently used.
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        if entry.get('url') != url:
+            return None
+        return entry
+
+    def record(self, hit):
+        """Count a cache hit or miss."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def put(self, url, paragraphs, etag=None, modified=None):
+        """Store the paragraphs of url with its validators and evict old entries if needed."""
+        name = self._name(url)
+        path = os.path.join(self.directory, name)
+        tmp = "{0}.{1}.tmp".format(path, threading.get_ident())
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(dict(url=url, etag=etag, modified=modified, paragraphs=paragraphs), f, ensure_ascii=False)
+        os.replace(tmp, path)
+        with self._lock:
+            self._size[name] = os.path.getsize(path)
+        self._evict(keep=name)
+
+    def remove(self, url):
+        """Remove the entry of url."""
+        name = self._name(url)
+        with self._lock:
+            self._size.pop(name, None)
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            names = list(self._size)
+            self._size = dict()
+        for name in names:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def _evict(self, keep=None):
+        """Remove least recently used entries until the cache fits in maxBytes."""
+        with self._lock:
+            total = sum(self._size.values())
+            if total <= self.maxBytes:
+                return
+            used = list()
+            for name in self._size:
+                if name == keep:
+                    continue
+                try:
+                    used.append((os.path.getmtime(os.path.join(self.directory, name)), name))
+                except OSError:
+                    used.append((0., name))
+            used.sort()
+            for mtime, name in used:
+                if total <= self.maxBytes:
+                    break
+                total -= self._size.pop(name)
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
 
 class NScraper(object):
     '''Class for retrieving web contents.'''
-    def __init__(self):
+    def __init__(self, maxWorkers=8, perHost=2, timeout=10., cache=None):
+        """
+        Initialize a scraper.
+        Up to maxWorkers urls are fetched in parallel by getUrlContents, with at most perHost concurrent connections to the same host.
+        Connections are kept alive and reused. timeout is the socket timeout(seconds) of each connection.
+        cache is an optional PageCache(or a directory for one). Cached pages are revalidated with conditional requests,
+        and pages that are not modified are neither downloaded nor extracted again.
+        """
         self.headers = {
             "User-Agent": "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:47.0) Gecko/20100101 Firefox/47.0",
+            "Connection": "keep-alive",
             }
-    
-    def getUrlContent(self, url):
-        '''Get string from url.'''
-        req = urllib.request.Request(url=url, headers=self.headers)
+        self.maxWorkers = maxWorkers
+        self.pool = _ConnectionPool(perHost=perHost, timeout=timeout)
+        self.cache = PageCache(cache) if isinstance(cache, str) else cache
+
+    def close(self):
+        '''Close connections kept alive by the scraper.'''
+        self.pool.close()
+
+    def getUrlContent(self, url, callback=None):
+        '''
+        Get the list of paragraphs from url.
+        If callback is given, it is also called with each paragraph as soon as it is extracted, while the page is still downloading.
+        Raise ScraperError if the content can not be retrieved.
+        '''
+        ret = list()
+        def emit(text):
+            ret.append(text)
+            if callback is not None:
+                callback(text)
+        headers = self.headers
+        entry = None
+        if self.cache is not None:
+            entry = self.cache.get(url)
+            if entry is not None:
+                headers = dict(headers)
+                if entry.get('etag'):
+                    headers["If-None-Match"] = entry['etag']
+                if entry.get('modified'):
+                    headers["If-Modified-Since"] = entry['modified']
+        def handler(resp):
+            if resp.status == 304 and entry is not None:
+                return False
+            if resp.status != 200:
+                raise ScraperError(url, "HTTP status {0} {1}".format(resp.status, resp.reason))
+            extractParagraphs(resp, emit)
+            return (resp.getheader("ETag"), resp.getheader("Last-Modified"))
         try:
-            soup = bs(urllib.request.urlopen(req), "lxml")
-            return ["".join([content.text for content in soup.find_all(['p', ])])]
-            #return [content.text for content in soup.find_all(['p', ])]
-        except:
-            return ['503: service unavailable, try again later.']
+            validators = self.pool.request(url, headers, handler)
+        except ScraperError:
+            raise
+        except (OSError, ValueError, http.client.HTTPException) as e:
+            raise ScraperError(url, str(e) or e.__class__.__name__)
+        if self.cache is not None:
+            self.cache.record(validators is False)
+            if validators is False:
+                for text in entry['paragraphs']:
+                    emit(text)
+            elif validators[0] or validators[1]:
+                self.cache.put(url, ret, *validators)
+            elif entry is not None:
+                # Pages without validators can not be revalidated, so they are not cached.
+                self.cache.remove(url)
+        return ret
+
+    def getUrlContents(self, urls, callback=None, onError=None):
+        '''
+        Get lists of paragraphs from a list of urls concurrently. Results are returned in the order of urls.
+        If callback is given, it is called as callback(index, paragraph) for each paragraph as soon as it is extracted.
+        If onError is given, it is called with the ScraperError of each failed url and the result of the url is an empty list.
+        Otherwise the first error is raised.
+        '''
+        def fetch(i):
+            try:
+                return self.getUrlContent(urls[i], None if callback is None else lambda text: callback(i, text))
+            except ScraperError as e:
+                if onError is None:
+                    raise
+                onError(e)
+                return list()
+        if len(urls) <= 1:
+            return [fetch(i) for i in range(len(urls))]
+        with ThreadPoolExecutor(max_workers=min(self.maxWorkers, len(urls))) as executor:
+            return list(executor.map(fetch, range(len(urls))))
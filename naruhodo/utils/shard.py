@@ -0,0 +1,65 @@
+"""
+This module contains functions for sharded(map-reduce) ingestion using several parser instances.
+
+Each shard parses its part of the corpus with its own parser and writes its partial state to a shared directory with writeShard.
+A reducer then merges all shards in the order of their shard ids with reduceShards,
+shifting sentence positions so that they stay globally unique, and runs synonym/coreference resolution over the combined result.
+"""
+import os
+import time
+from naruhodo.utils.checkpoint import readHeader
+
+
+def shardPath(directory, shardId):
+    """Return the path of the shard file for shardId in directory."""
+    return os.path.join(directory, "shard-{0}.ckpt".format(shardId))
+
+def writeShard(p, directory, shardId):
+    """Write the partial state of parser p to directory as shard shardId. Return the path of the shard file."""
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    path = shardPath(directory, shardId)
+    p.saveCheckpoint(path, shard=shardId)
+    return path
+
+def listShards(directory):
+    """Return the list of (shardId, path) of finished shards in directory, sorted by shardId."""
+    ret = list()
+    for fname in os.listdir(directory):
+        if fname.startswith("shard-") and fname.endswith(".ckpt"):
+            path = os.path.join(directory, fname)
+            ret.append((readHeader(path)['shard'], path))
+    return sorted(ret, key=lambda x: x[0])
+
+def waitShards(directory, nshards, timeout=None, interval=0.5):
+    """
+    Wait until nshards shards are finished in directory and return the list of them.
+    Raise TimeoutError if timeout(seconds) is given and exceeded.
+    """
+    start = time.time()
+    while True:
+        shards = listShards(directory) if os.path.isdir(directory) else list()
+        if len(shards) >= nshards:
+            return shards
+        if timeout is not None and time.time() - start > timeout:
+            raise TimeoutError("Only {0} of {1} shards finished in {2}.".format(len(shards), nshards, directory))
+        time.sleep(interval)
+
+def reduceShards(p, directory, nshards=None, timeout=None, synonym=True, coref=True):
+    """
+    Merge all shards in directory into parser p and return p.
+    If nshards is given, wait until that many shards are finished first.
+    Synonym and coreference resolution are run over the combined result if synonym/coref is True.
+    """
+    if nshards is not None:
+        shards = waitShards(directory, nshards, timeout=timeout)
+    else:
+        shards = listShards(directory)
+    for shardId, path in shards:
+        p.loadCheckpoint(path, merge=True)
+    flatEntityList = None
+    if synonym:
+        flatEntityList = p.resolveSynonym()
+    if coref:
+        p.resolveCoref(flatEntityList)
+    return p
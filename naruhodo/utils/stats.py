@@ -0,0 +1,154 @@
+"""
+This module contains instrumentation utilities: per-stage timers, latency histograms, counters and rate-limited logging.
+"""
+import sys
+import time
+import logging
+import threading
+
+
+logger = logging.getLogger("naruhodo")
+"""
+Logger of naruhodo. Warnings from hot loops are emitted through it with rate limits(see warnRateLimited).
+"""
+
+_lastWarned = dict()
+
+def warnRateLimited(key, message, interval=60.):
+    """Log a warning message unless a warning with the same key was logged within the last interval seconds."""
+    now = time.time()
+    if now - _lastWarned.get(key, -interval) >= interval:
+        _lastWarned[key] = now
+        logger.warning(message)
+        return True
+    return False
+
+NBuckets = 26
+"""
+Number of buckets in latency histograms. Bucket i counts latencies below 2^i microseconds(the last bucket counts the rest).
+"""
+
+class Stats(object):
+    """
+    Class for collecting per-stage timers, latency histograms and counters.
+    Stages are identified by names such as 'backend', 'chunk', 'parse', 'merge', 'synonym' and 'coref'.
+    Records may come from several threads(e.g. analyzers of concurrent ingestion).
+    """
+    def __init__(self, hook=None):
+        """Initialize empty statistics. If hook is given, it is called as hook(kind, name, value) for each record."""
+        self.timers = dict()
+        """
+        Dict of stage name -> [number of records, total seconds, max seconds].
+        """
+
+        self.histograms = dict()
+        """
+        Dict of stage name -> list of bucket counts of latencies.
+        """
+
+        self.counters = dict()
+        """
+        Dict of counter name -> value.
+        """
+
+        self.hook = hook
+        """
+        Metrics hook called as hook(kind, name, value), where kind is 'timer' or 'counter'.
+        """
+
+        self.start = time.time()
+        """
+        Time when the statistics were started or reset.
+        """
+
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Reset all statistics."""
+        with self._lock:
+            self.timers = dict()
+            self.histograms = dict()
+            self.counters = dict()
+            self.start = time.time()
+
+    def record(self, name, seconds):
+        """Record a latency of stage name."""
+        with self._lock:
+            try:
+                timer = self.timers[name]
+                timer[0] += 1
+                timer[1] += seconds
+                if seconds > timer[2]:
+                    timer[2] = seconds
+            except KeyError:
+                self.timers[name] = [1, seconds, seconds]
+                self.histograms[name] = [0] * NBuckets
+            self.histograms[name][min(int(seconds * 1e6).bit_length(), NBuckets - 1)] += 1
+        if self.hook is not None:
+            self.hook("timer", name, seconds)
+
+    def count(self, name, n=1):
+        """Increment counter name by n."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+        if self.hook is not None:
+            self.hook("counter", name, n)
+
+    @staticmethod
+    def _percentile(hist, q):
+        """Estimate the q-th percentile(seconds) from a histogram using bucket upper bounds."""
+        target = q * sum(hist)
+        acc = 0
+        for i in range(len(hist)):
+            acc += hist[i]
+            if acc >= target and acc > 0:
+                return (1 << i) * 1e-6
+        return 0.
+
+    def snapshot(self):
+        """Return the statistics as a dict of plain python objects."""
+        timers = dict()
+        with self._lock:
+            items = [(name, list(val), list(self.histograms[name])) for name, val in self.timers.items()]
+            counters = dict(self.counters)
+        for name, val, hist in items:
+            timers[name] = dict(
+                count = val[0],
+                total = val[1],
+                mean = val[1] / val[0],
+                max = val[2],
+                p50 = self._percentile(hist, 0.5),
+                p95 = self._percentile(hist, 0.95),
+                p99 = self._percentile(hist, 0.99),
+                histogram = list(hist)
+            )
+        return dict(elapsed=time.time() - self.start, timers=timers, counters=counters)
+
+def sizeOfGraph(G):
+    """Estimate the memory(bytes) used by nodes, edges and their attributes of graph G."""
+    size = 0
+    for key, val in G.nodes.items():
+        size += sys.getsizeof(key) + _sizeOfAttrs(val)
+    for key, val in G.edges.items():
+        size += sys.getsizeof(key) + _sizeOfAttrs(val)
+    return size
+
+def sizeOfEntityList(entityList):
+    """Estimate the memory(bytes) used by an entity list."""
+    size = sys.getsizeof(entityList)
+    for item in entityList:
+        size += sys.getsizeof(item)
+        for key, val in item.items():
+            size += sys.getsizeof(key) + sys.getsizeof(val)
+    return size
+
+def _sizeOfAttrs(attrs):
+    """Estimate the memory(bytes) used by an attribute dict(one level into lists)."""
+    size = sys.getsizeof(attrs)
+    for val in attrs.values():
+        size += sys.getsizeof(val)
+        if isinstance(val, list):
+            for item in val:
+                if isinstance(item, str):
+                    size += sys.getsizeof(item)
+    return size
@@ -0,0 +1,127 @@
+"""
+This module contains the subject-predicate-object triple index over semantic graphs.
+"""
+
+
+class TripleIndex(object):
+    """
+    Index of (source, edge type, target) triples of a graph.
+    Triples are stored in SPO, POS and OSP permutations of nested dicts,
+    so every query pattern is answered with constant time lookups instead of scanning the graph.
+    """
+    def __init__(self, G=None):
+        """Initialize an empty index, or an index built from graph G if given."""
+        self.spo = dict()
+        """
+        Nested dict of subject -> predicate(edge type) -> set of objects.
+        """
+
+        self.pos = dict()
+        """
+        Nested dict of predicate(edge type) -> object -> set of subjects.
+        """
+
+        self.osp = dict()
+        """
+        Nested dict of object -> subject -> set of predicates(edge types).
+        """
+
+        self.size = 0
+        """
+        Number of triples in the index.
+        """
+
+        if G is not None:
+            self.build(G)
+
+    def __len__(self):
+        """Return the number of triples in the index."""
+        return self.size
+
+    def __contains__(self, triple):
+        """Check if the (subject, predicate, object) triple is in the index."""
+        s, p, o = triple
+        return o in self.spo.get(s, {}).get(p, ())
+
+    def clear(self):
+        """Remove all triples from the index."""
+        self.spo = dict()
+        self.pos = dict()
+        self.osp = dict()
+        self.size = 0
+
+    def build(self, G):
+        """Rebuild the index from all edges of graph G."""
+        self.clear()
+        for key, val in G.edges.items():
+            self.add(key[0], val['type'], key[1])
+        return self
+
+    def attach(self, parser):
+        """Build the index from the graph of parser and keep it updated through the change feed of parser."""
+        self.build(parser.G)
+        parser.subscribe(self.update)
+        return self
+
+    def detach(self, parser):
+        """Stop following the change feed of parser."""
+        parser.unsubscribe(self.update)
+
+    def update(self, events):
+        """Apply a batch of change events from parser's change feed."""
+        for event in events:
+            if event['type'] in ["edge_added", "coref_edge", "synonym_edge"]:
+                self.add(event['edge'][0], event['etype'], event['edge'][1])
+            elif event['type'] == "edge_removed":
+                self.remove(event['edge'][0], event['etype'], event['edge'][1])
+            elif event['type'] == "reset":
+                self.clear()
+
+    def add(self, s, p, o):
+        """Add a triple to the index."""
+        objs = self.spo.setdefault(s, dict()).setdefault(p, set())
+        if o in objs:
+            return
+        objs.add(o)
+        self.pos.setdefault(p, dict()).setdefault(o, set()).add(s)
+        self.osp.setdefault(o, dict()).setdefault(s, set()).add(p)
+        self.size += 1
+
+    def remove(self, s, p, o):
+        """Remove a triple from the index if it exists."""
+        if (s, p, o) not in self:
+            return
+        self._discard(self.spo, s, p, o)
+        self._discard(self.pos, p, o, s)
+        self._discard(self.osp, o, s, p)
+        self.size -= 1
+
+    @staticmethod
+    def _discard(index, a, b, c):
+        """Remove c from index[a][b] and clean up empty containers."""
+        index[a][b].discard(c)
+        if not index[a][b]:
+            del index[a][b]
+            if not index[a]:
+                del index[a]
+
+    def query(self, s=None, p=None, o=None):
+        """
+        Return the list of (subject, predicate, object) triples matching the pattern.
+        None works as a wildcard. For example, query(s="田中一郎", p="sub") returns predicates whose subject is "田中一郎".
+        """
+        if s is not None:
+            if p is not None:
+                if o is not None:
+                    return [(s, p, o)] if (s, p, o) in self else []
+                return [(s, p, x) for x in self.spo.get(s, {}).get(p, ())]
+            if o is not None:
+                return [(s, x, o) for x in self.osp.get(o, {}).get(s, ())]
+            return [(s, x, y) for x, objs in self.spo.get(s, {}).items() for y in objs]
+        if p is not None:
+            if o is not None:
+                return [(x, p, o) for x in self.pos.get(p, {}).get(o, ())]
+            return [(y, p, x) for x, subs in self.pos.get(p, {}).items() for y in subs]
+        if o is not None:
+            return [(x, y, o) for x, preds in self.osp.get(o, {}).items() for y in preds]
+        return [(x, y, z) for x, preds in self.spo.items() for y, objs in preds.items() for z in objs]
@@ -18,9 +18,10 @@ setup(
     license = "MIT",
     install_requires = [
         'networkx',
-        'beautifulsoup4',
-        'nxpd',
-        'lxml'
+        'nxpd'
     ],
     python_requires='>=3.4',
+    entry_points = {
+        'console_scripts': ['naruhodo=naruhodo.cli:main', 'naruhodo-serve=naruhodo.server:main'],
+    },
 )
@@ -0,0 +1,3 @@
+"""
+Test module for core.
+"""
@@ -0,0 +1,352 @@
+import re
+import time
+import unittest
+import threading
+from naruhodo.core.parser import parser
+from test.fakebackend import setUpFakeBackend, tearDownFakeBackend, makeSents
+
+def setUpModule():
+    setUpFakeBackend()
+
+def tearDownModule():
+    tearDownFakeBackend()
+
+def counts(p):
+    """Return dict of node key -> count of parser p, without the sentence positions in pronoun keys."""
+    return dict([(re.sub(r"\[\d+@\d+\]", "", key), val['count']) for key, val in p.G.nodes.items()])
+
+def shifted(p, offset):
+    """Return the nodes, edges and entity list of parser p with sentence positions shifted by -offset."""
+    def shift(val):
+        val = dict(val)
+        if isinstance(val.get('pos'), list):
+            val['pos'] = [pos - offset for pos in val['pos']]
+        return val
+    nodes = dict([(key, shift(val)) for key, val in p.G.nodes.items()])
+    edges = dict([(key, shift(val)) for key, val in p.G.edges.items()])
+    entityList = [dict([(key, [pos - offset for pos in val]) for key, val in entities.items()]) for entities in p.entityList]
+    return nodes, edges, entityList
+
+def checkIndexes(test, p):
+    """Check that the position indexes of parser p only refer to nodes and edges of its graph."""
+    for pos, keys in p._nodeIndex.items():
+        test.assertTrue(all([p.G.has_node(key) for key in keys]))
+    for pos, keys in p._edgeIndex.items():
+        test.assertTrue(all([p.G.has_edge(*key) for key in keys]))
+
+
+class TestEvict(unittest.TestCase):
+    """Unit test for parser.evict and window/horizon eviction."""
+    def setUp(self):
+        # Pronoun nodes are named after their sentence positions, so they are left out.
+        self.sents = [sent for sent in makeSents(40, seed=3) if "彼" not in sent]
+
+    def test_window(self):
+        for n in [1, 5, 12]:
+            p = parser(window=n)
+            p.addAll(self.sents)
+            self.assertEqual(p.oldest, len(self.sents) - n)
+            clean = parser()
+            clean.addAll(self.sents[-n:])
+            self.assertEqual(shifted(p, p.oldest), shifted(clean, 0))
+
+    def test_evict(self):
+        p = parser()
+        p.addAll(self.sents)
+        self.assertEqual(p.evict(before=10), 10)
+        self.assertEqual(p.evict(before=5), 0)
+        clean = parser()
+        clean.addAll(self.sents[10:])
+        self.assertEqual(shifted(p, 10), shifted(clean, 0))
+        p.evict(before=p.pos)
+        self.assertEqual((len(p.G), p._nodeIndex, p._edgeIndex), (0, dict(), dict()))
+
+    def test_horizon(self):
+        p = parser(horizon=0.2)
+        p.addAll(self.sents[:3])
+        time.sleep(0.3)
+        p.add(self.sents[3])
+        self.assertEqual(p.oldest, 3)
+        clean = parser()
+        clean.add(self.sents[3])
+        self.assertEqual(shifted(p, 3), shifted(clean, 0))
+        p = parser(horizon=60)
+        p.addAll(self.sents[:3])
+        self.assertEqual(p.evict(horizon=60), 0)
+        time.sleep(0.1)
+        self.assertEqual(p.evict(horizon=0.05), 3)
+        self.assertEqual(len(p.G), 0)
+
+    def test_dedup_coref(self):
+        p = parser(gtype='k', coref=True, dedup='count')
+        p.add("山田太郎は東京で本を読む。")
+        p.add("彼は新聞を読んだ。")
+        p.evict(before=1)
+        p.add("彼は新聞を読んだ。")
+        self.assertFalse(p.G.has_node("山田太郎"))
+        checkIndexes(self, p)
+        self.assertEqual(p.G.nodes["新聞"]['count'], 2)
+
+
+class TestFeed(unittest.TestCase):
+    """Unit test for the change feed of parser."""
+    def replay(self, batches):
+        """Apply batches of events to empty node and edge sets, checking that each event is consistent with the previous ones."""
+        nodes = set()
+        edges = set()
+        for events in batches:
+            for event in events:
+                if event['type'] == "node_added":
+                    self.assertNotIn(event['node'], nodes)
+                    nodes.add(event['node'])
+                elif event['type'] == "node_removed":
+                    self.assertFalse([edge for edge in edges if event['node'] in edge])
+                    nodes.remove(event['node'])
+                elif event['type'] in ["edge_added", "coref_edge", "synonym_edge"]:
+                    self.assertTrue(event['edge'][0] in nodes and event['edge'][1] in nodes)
+                    self.assertNotIn(event['edge'], edges)
+                    edges.add(event['edge'])
+                elif event['type'] == "edge_removed":
+                    edges.remove(event['edge'])
+                elif event['type'] == "reset":
+                    nodes.clear()
+                    edges.clear()
+                else:
+                    self.assertIn(event.get('node', event.get('edge')), nodes | edges)
+        return nodes, edges
+
+    def test_subscribe(self):
+        sents = makeSents(10, seed=2)
+        p = parser()
+        batches = list()
+        p.add(sents[0])
+        self.assertIsNone(p._events)
+        self.assertEqual(p.subscribe(batches.append), batches.append)
+        p.subscribe(batches.append)
+        self.assertEqual(len(p.subscribers), 1)
+        p.reset()
+        p.add(sents[0])
+        self.assertEqual(len(batches), 2)
+        # Events of a whole addAll call are delivered at once.
+        p.addAll(sents[1:])
+        self.assertEqual(len(batches), 3)
+        self.assertEqual(self.replay(batches), (set(p.G.nodes), set(p.G.edges)))
+        p.unsubscribe(batches.append)
+        p.add(sents[0])
+        self.assertEqual((len(batches), p._events), (3, None))
+
+    def test_resolution(self):
+        p = parser(coref=True, synonym=True)
+        batches = list()
+        p.subscribe(batches.append)
+        p.addAll(["田中一郎は東京で本を読む。", "一郎は新聞を読んだ。", "彼は大阪で本を読む。"])
+        self.assertEqual(len(batches), 1)
+        types = [event['type'] for event in batches[0]]
+        self.assertEqual(types.count("synonym_edge"), 1)
+        self.assertEqual(types.count("coref_edge"), 1)
+        # Resolution follows the sentences it refers to.
+        added = dict([(event['node'], i) for i, event in enumerate(batches[0]) if event['type'] == "node_added"])
+        self.assertTrue(added["一郎"] < types.index("synonym_edge") < added["彼[2@0]"] < types.index("coref_edge"))
+        self.assertEqual(types[types.index("coref_edge") - 1], "node_count")
+        self.assertEqual(batches[0][types.index("coref_edge")]['edge'], ("一郎", "彼[2@0]"))
+        self.assertEqual(self.replay(batches), (set(p.G.nodes), set(p.G.edges)))
+
+    def test_evict(self):
+        sents = makeSents(12, seed=4)
+        p = parser(coref=True, synonym=True, window=3)
+        batches = list()
+        p.subscribe(batches.append)
+        p.addAll(sents[:6])
+        p.addAll(sents[6:])
+        self.assertEqual(len(batches), 2)
+        self.assertIn("node_removed", [event['type'] for event in batches[1]])
+        self.assertEqual(self.replay(batches), (set(p.G.nodes), set(p.G.edges)))
+        p.evict(before=p.pos)
+        self.assertEqual(len(batches), 3)
+        self.assertEqual(self.replay(batches), (set(), set()))
+
+
+class TestSubgraphs(unittest.TestCase):
+    """Unit test for pathGraphs and egoGraphs."""
+    def setUp(self):
+        self.p = parser(gtype='k')
+        self.p.addAll(["山田太郎は東京で本を読む。", "鈴木花子は大阪で働く。"])
+
+    def test_pathGraphs(self):
+        first, second = self.p.pathGraphs([["山田太郎", "<山田太郎>読む"], ["鈴木花子"]])
+        self.assertEqual(set(first.nodes), set(["山田太郎", "<山田太郎>読む", "本", "東京"]))
+        self.assertIn(("山田太郎", "<山田太郎>読む"), first.edges)
+        self.assertTrue(all([self.p.G.has_edge(*key) for key in first.edges]))
+        self.assertNotIn("鈴木花子", first)
+        self.assertEqual(list(second.nodes), ["鈴木花子"])
+        self.assertIs(first.nodes["山田太郎"], self.p.G.nodes["山田太郎"])
+        with self.assertLogs("naruhodo", level="WARNING") as logs:
+            self.p.pathGraphs([["名古屋"]])
+        self.assertEqual(logs.output, ["WARNING:naruhodo:'名古屋' is not in generated graph!"])
+        # An empty path stands for the entire graph, an empty view for nothing.
+        self.assertEqual(self.p.toText([]), self.p.toText())
+        self.assertEqual(self.p.toText(self.p.G.subgraph([])), [])
+
+    def test_egoGraphs(self):
+        with self.assertLogs("naruhodo", level="WARNING"):
+            ego, missing = self.p.egoGraphs(["東京", "名古屋"], radius=2)
+        self.assertEqual(set(ego.nodes), set(["東京", "<山田太郎>読む", "山田太郎", "本"]))
+        self.assertEqual(len(missing), 0)
+        self.assertEqual(len(self.p.egoGraphs("東京", radius=0)[0]), 1)
+
+
+class TestMultiview(unittest.TestCase):
+    """Unit test for multi-view mode."""
+    def test_views(self):
+        sents = makeSents(20, seed=2)
+        for gtype, other in [('d', 'k'), ('k', 'd')]:
+            p = parser(gtype=gtype, multiview=True)
+            p.addAll(sents)
+            main = parser(gtype=gtype)
+            main.addAll(sents)
+            view = parser(gtype=other)
+            view.addAll(sents)
+            self.assertEqual(dict(p.G.nodes.items()), dict(main.G.nodes.items()))
+            self.assertEqual(dict(p.G.edges.items()), dict(main.G.edges.items()))
+            self.assertEqual(dict(p.views[other].nodes.items()), dict(view.G.nodes.items()))
+            self.assertEqual(dict(p.views[other].edges.items()), dict(view.G.edges.items()))
+
+
+class TestEntities(unittest.TestCase):
+    """Unit test for entity-only mode."""
+    def test_entities(self):
+        sents = makeSents(20, seed=2)
+        p = parser(gtype='e')
+        p.addAll(sents)
+        k = parser(gtype='k')
+        k.addAll(sents)
+        self.assertEqual(len(p.G), 0)
+        self.assertEqual(p.entityList, k.entityList)
+        self.assertTrue(all([k.G.has_node(key) for entities in p.entityList for key in entities]))
+        self.assertEqual(sorted([pro['name'] for pro in p.proList]), sorted([pro['name'] for pro in k.proList]))
+        p.evict(before=10)
+        k.evict(before=10)
+        self.assertEqual(p.entityList, k.entityList)
+
+
+class TestRetract(unittest.TestCase):
+    """Unit test for parser.retract."""
+    def setUp(self):
+        self.a = ["鈴木花子は東京で本を読む。", "彼女は新聞を読んだ。"]
+        self.b = ["鈴木花子は大阪で働く。", "山田太郎は走る。", "彼は毎日走る。"]
+
+    def test_retract(self):
+        p = parser(gtype='k', coref=True)
+        p.addAll(self.a, doc='a')
+        p.addAll(self.b, doc='b')
+        self.assertEqual(p.retract('a'), 2)
+        self.assertEqual(p.retract('a'), 0)
+        clean = parser(gtype='k', coref=True)
+        clean.addAll(self.b)
+        self.assertEqual(counts(p), counts(clean))
+        self.assertEqual(p.corefDict, clean.corefDict)
+        self.assertEqual(p.coref_3rdPersonF, set())
+        self.assertEqual(list(p.docs), ['b'])
+
+    def test_evict(self):
+        p = parser(gtype='k', coref=True)
+        p.addAll(self.a, doc='a')
+        p.addAll(self.b, doc='b')
+        p.retract('a')
+        self.assertEqual(p._retracted, set([0, 1]))
+        p.evict(before=2)
+        self.assertEqual(p._retracted, set())
+
+
+class TestConcurrent(unittest.TestCase):
+    """Unit test for concurrent ingestion."""
+    def test_addAll(self):
+        sents = makeSents(30, seed=1) + ["", "彼は新聞を読んだ。"]
+        p = parser()
+        self.assertEqual(p.addAllConcurrent(sents, nthreads=4, doc='a'), list(range(len(sents) - 1)))
+        q = parser()
+        q.addAll(sents, doc='a')
+        self.assertEqual(dict(p.G.nodes.items()), dict(q.G.nodes.items()))
+        self.assertEqual(dict(p.G.edges.items()), dict(q.G.edges.items()))
+        self.assertEqual(p.docs, q.docs)
+        self.assertEqual(p._inflight, set())
+        # Coreferences are resolved once per batch(as in 'mp' mode) instead of once per sentence.
+        p = parser(coref=True)
+        p.addAllConcurrent(sents, nthreads=4)
+        q = parser(coref=True)
+        q.addAll(sents)
+        self.assertEqual(counts(p), counts(q))
+        self.assertEqual(set(p.G.edges), set(q.G.edges))
+
+    def test_retract_evict(self):
+        p = parser(coref=True, dedup='count')
+        def work(i):
+            for sent in makeSents(15, seed=i):
+                p.addConcurrent(sent, doc=i)
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        while any([thread.is_alive() for thread in threads]):
+            p.retract(0)
+            p.evict(before=p.pos // 2)
+            with p._lock:
+                checkIndexes(self, p)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(p._inflight, set())
+        checkIndexes(self, p)
+        p.evict(before=p.pos)
+        self.assertEqual((len(p.G), p._nodeIndex, p._edgeIndex, p.docs), (0, dict(), dict(), dict()))
+
+
+class TestStats(unittest.TestCase):
+    """Unit test for instrumentation of parser."""
+    def setUp(self):
+        self.sents = makeSents(12, seed=6)
+
+    def check(self, p, records):
+        stats = p.stats()
+        for stage in ['backend', 'chunk', 'parse']:
+            self.assertEqual(stats['timers'][stage]['count'], len(self.sents))
+            self.assertEqual(len([record for record in records if record[:2] == ("timer", stage)]), len(self.sents))
+        self.assertEqual(stats['counters']['sents'], len(self.sents))
+        self.assertEqual(sum([record[2] for record in records if record[:2] == ("counter", "sents")]), len(self.sents))
+        self.assertEqual(stats['gauges']['sents'], len(self.sents))
+
+    def test_sequential(self):
+        p = parser()
+        self.assertIsNone(p.stats())
+        records = list()
+        p.setMetricsHook(lambda kind, name, value: records.append((kind, name, value)))
+        p.addAll(self.sents)
+        self.check(p, records)
+
+    def test_concurrent(self):
+        p = parser(stats=True)
+        records = list()
+        p.setMetricsHook(lambda kind, name, value: records.append((kind, name, value)))
+        p.addAllConcurrent(self.sents, nthreads=4)
+        self.check(p, records)
+        # Analyzers created before instrumentation was enabled record to it as well.
+        p = parser()
+        p.addAllConcurrent(self.sents, nthreads=4)
+        records = list()
+        p.setMetricsHook(lambda kind, name, value: records.append((kind, name, value)))
+        p.resetStats()
+        p.reset()
+        p.addAllConcurrent(self.sents, nthreads=4)
+        self.check(p, records)
+
+
+class TestUrls(unittest.TestCase):
+    """Unit test for parser.addUrls(with a fake scraper)."""
+    def test_skip(self):
+        class scraper(object):
+            def getUrlContents(self, urls, callback, onError):
+                callback(0, "山田太郎は東京で本を読む。彼は新聞を読んだ。")
+                onError("http://example.invalid/")
+        p = parser()
+        with self.assertLogs("naruhodo", level="WARNING") as logs:
+            p.addUrls(["http://example.com/", "http://example.invalid/"], scraper())
+        self.assertEqual(logs.output, ["WARNING:naruhodo:Skipped http://example.invalid/"])
+        self.assertEqual(p.pos, 2)
@@ -0,0 +1,102 @@
+import shutil
+import tempfile
+import unittest
+import threading
+from naruhodo.core.parser import parser
+from naruhodo.core.workspace import workspace
+from test.fakebackend import setUpFakeBackend, tearDownFakeBackend
+
+def setUpModule():
+    setUpFakeBackend()
+
+def tearDownModule():
+    tearDownFakeBackend()
+
+def counts(p):
+    """Return dict of node key -> count of parser p."""
+    return dict([(key, val['count']) for key, val in p.G.nodes.items()])
+
+
+class TestWorkspace(unittest.TestCase):
+    """Unit test for workspace class."""
+    def setUp(self):
+        self.texts = dict(
+            a = ["山田太郎は東京で本を読む。", "彼は新聞を読んだ。"],
+            b = ["鈴木花子は大阪で働く。", "彼女は毎日走る。"],
+            c = ["田中一郎は京都で寝る。"]
+        )
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def expected(self, name):
+        p = parser(coref=True)
+        p.addAll(self.texts[name])
+        return counts(p)
+
+    def test_cold(self):
+        ws = workspace(maxHot=1, coref=True)
+        pa = ws.get('a')
+        events = list()
+        pa.subscribe(events.append)
+        ws.addAll('a', self.texts['a'], doc='x')
+        ws.addAll('b', self.texts['b'])
+        self.assertEqual(ws.info()['hot'], 1)
+        self.assertEqual(ws.info()['cold'], 1)
+        self.assertEqual(len(pa.G), 0)
+        self.assertIs(ws.get('a'), pa)
+        self.assertEqual(counts(pa), self.expected('a'))
+        self.assertEqual(pa.docs, dict(x=set([0, 1])))
+        # Handles receive writes while the document is cold, and subscribers see no restoration events.
+        ws.compress('a')
+        del events[:]
+        pa.add("田中一郎は京都で寝る。")
+        self.assertEqual(pa.pos, 3)
+        self.assertTrue(pa.G.has_node("山田太郎"))
+        self.assertNotIn("reset", [event['type'] for batch in events for event in batch])
+        self.assertEqual(pa.retract('x'), 2)
+        self.assertFalse(pa.G.has_node("山田太郎"))
+        self.assertIs(ws.get('b').core, pa.core)
+        ws.close()
+
+    def test_spill(self):
+        ws = workspace(maxHot=1, maxColdBytes=0, spill=self.tmp, coref=True)
+        for name in ['a', 'b', 'c']:
+            ws.addAll(name, self.texts[name])
+        self.assertEqual(ws.info()['spilled'], 2)
+        self.assertEqual(sorted(ws.names()), ['a', 'b', 'c'])
+        for name in ['a', 'b', 'c']:
+            self.assertEqual(counts(ws.get(name)), self.expected(name))
+        ws.remove('a')
+        self.assertNotIn('a', ws)
+        self.assertRaises(KeyError, ws.get, 'a', False)
+        ws.close()
+        self.assertEqual(ws.info()['spilled'], 0)
+
+    def test_strings(self):
+        ws = workspace(maxHot=1, coref=True)
+        ws.addAll('a', self.texts['a'])
+        self.assertIn("山田太郎", ws.strings)
+        # Strings of cold and removed documents are dropped.
+        ws.addAll('b', self.texts['b'])
+        self.assertNotIn("山田太郎", ws.strings)
+        self.assertIn("鈴木花子", ws.strings)
+        ws.remove('b')
+        ws.pruneStrings()
+        self.assertEqual(ws.info()['strings'], 0)
+        # Restored documents share strings again.
+        pa = ws.get('a')
+        self.assertIs([key for key in pa.G.nodes if key == "山田太郎"][0], ws.strings["山田太郎"])
+        ws.close()
+
+    def test_threads(self):
+        ws = workspace(maxHot=1, coref=True)
+        threads = [threading.Thread(target=ws.addAll, args=(name, texts)) for name, texts in self.texts.items()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for name in self.texts:
+            self.assertEqual(counts(ws.get(name)), self.expected(name))
+        ws.close()
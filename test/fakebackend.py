@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Fake CaboCha backend for tests and benchmarks.
+
+Run as a script, it behaves like `cabocha -f1`: reads one sentence per line from stdin and writes a lattice terminated by EOS for each.
+By default the lattice is synthesized from the sentence with a tiny rule-based chunker(nouns followed by particles, ending with a verb).
+With --replay FILE, lattices recorded from a real `cabocha -f1` run are written back in order(cycling) instead.
+
+Imported, it provides setupFakeBackend to put a `cabocha` wrapper around this script in front of PATH, and makeSents to generate sentences.
+"""
+import os
+import re
+import sys
+import random
+import shutil
+import argparse
+import tempfile
+
+
+_re_part = re.compile(r'(は|を|が|に|の|と|で|も|へ)')
+
+ProNouns = set(["彼", "彼女", "私", "それ", "ここ", "あれ"])
+
+Subjects = ["田中一郎", "花子", "彼", "彼女", "鈴木さん", "山田太郎", "経済省", "東西社"]
+Places = ["東京", "大阪", "埼玉県", "会議室", "公園"]
+Objects = ["りんご", "本", "新聞", "報告書", "計画", "コーヒー"]
+Verbs = ["食べる", "読む", "発表した", "作る", "飲んだ", "見た"]
+"""
+Vocabulary for synthetic sentences.
+"""
+
+def _noun(word):
+    """Return the token line of a noun."""
+    if word in ProNouns:
+        return "{0}\t名詞,代名詞,一般,*,*,*,{0},カレ,カレ".format(word)
+    if word.endswith("郎") or word.endswith("子") or word.endswith("さん"):
+        return "{0}\t名詞,固有名詞,人名,名,*,*,{0},ヒト,ヒト".format(word)
+    if word.endswith("京") or word.endswith("阪") or word.endswith("県"):
+        return "{0}\t名詞,固有名詞,地域,一般,*,*,{0},チイキ,チイキ".format(word)
+    if word.endswith("社") or word.endswith("省"):
+        return "{0}\t名詞,固有名詞,組織,*,*,*,{0},ソシキ,ソシキ".format(word)
+    return "{0}\t名詞,一般,*,*,*,*,{0},メイシ,メイシ".format(word)
+
+def synthesize(sent):
+    """Synthesize a lattice in `cabocha -f1` format for sent."""
+    parts = _re_part.split(sent.strip().rstrip("。"))
+    chunks = list()
+    for i in range(0, len(parts) - 1, 2):
+        if parts[i]:
+            chunks.append([_noun(parts[i]), "{0}\t助詞,格助詞,一般,*,*,*,{0},ジョシ,ジョシ".format(parts[i + 1])])
+    chunks.append(["{0}\t動詞,自立,*,*,五段,基本形,{0},ドウシ,ドウシ".format(parts[-1] or "する"), "。\t記号,句点,*,*,*,*,。,。,。"])
+    ret = list()
+    for i in range(len(chunks)):
+        ret.append("* {0} {1}D 0/1 1.000000".format(i, -1 if i == len(chunks) - 1 else len(chunks) - 1))
+        ret.extend(chunks[i])
+    ret.append("EOS")
+    return "\n".join(ret) + "\n"
+
+def loadReplay(fname):
+    """Load lattices recorded from `cabocha -f1` output."""
+    ret = list()
+    block = list()
+    with open(fname, 'r', encoding='utf-8') as f:
+        for line in f:
+            block.append(line)
+            if line.startswith("EOS"):
+                ret.append("".join(block))
+                block = list()
+    return ret
+
+def makeSents(n, seed=0):
+    """Generate n synthetic sentences."""
+    rnd = random.Random(seed)
+    ret = list()
+    for i in range(n):
+        sent = "{0}は".format(rnd.choice(Subjects))
+        if rnd.random() < 0.5:
+            sent += "{0}で".format(rnd.choice(Places))
+        if rnd.random() < 0.3:
+            sent += "{0}と".format(rnd.choice(Subjects))
+        sent += "{0}を{1}。".format(rnd.choice(Objects), rnd.choice(Verbs))
+        ret.append(sent)
+    return ret
+
+def setupFakeBackend(replay=""):
+    """Put a `cabocha` wrapper around this script in front of PATH. Return the temporary directory."""
+    tmp = tempfile.mkdtemp(prefix="naruhodo-fake-")
+    args = " --replay '{0}'".format(os.path.abspath(replay)) if replay else ""
+    path = os.path.join(tmp, "cabocha")
+    with open(path, 'w') as f:
+        f.write("#!/bin/sh\nexec '{0}' '{1}'{2} \"$@\"\n".format(sys.executable, os.path.abspath(__file__), args))
+    os.chmod(path, 0o755)
+    os.environ['PATH'] = tmp + os.pathsep + os.environ.get('PATH', '')
+    return tmp
+
+_saved = list()
+
+def setUpFakeBackend():
+    """Put the fake backend in front of PATH(for setUpModule of test modules)."""
+    _saved.append((os.environ.get('PATH', ''), setupFakeBackend()))
+
+def tearDownFakeBackend():
+    """Restore PATH and remove the fake backend(for tearDownModule of test modules)."""
+    path, tmp = _saved.pop()
+    os.environ['PATH'] = path
+    shutil.rmtree(tmp, ignore_errors=True)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("-f", default="1", help="Output format(only 1 is supported).")
+    ap.add_argument("--replay", default="", help="Replay lattices recorded from `cabocha -f1`.")
+    args = ap.parse_args(argv)
+    replay = loadReplay(args.replay) if args.replay else None
+    n = 0
+    for line in sys.stdin:
+        if replay:
+            sys.stdout.write(replay[n % len(replay)])
+        else:
+            sys.stdout.write(synthesize(line))
+        sys.stdout.flush()
+        n += 1
+
+if __name__ == "__main__":
+    main()
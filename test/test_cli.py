@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+import subprocess
+from naruhodo.core.parser import parser
+from test.fakebackend import setUpFakeBackend, tearDownFakeBackend
+
+def setUpModule():
+    setUpFakeBackend()
+
+def tearDownModule():
+    tearDownFakeBackend()
+
+
+class TestCli(unittest.TestCase):
+    """Unit test for the command line entry point."""
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.input = os.path.join(self.tmp, "input.txt")
+        with open(self.input, 'w', encoding='utf-8') as f:
+            f.write("山田太郎は東京で本を読む。彼は新聞を読んだ。\n鈴木花子は大阪で働く。\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def run_cli(self, *args):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return subprocess.run([sys.executable, "-m", "naruhodo"] + list(args), cwd=root, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=60)
+
+    def test_main(self):
+        output = os.path.join(self.tmp, "graph.json")
+        stats = os.path.join(self.tmp, "stats.json")
+        cache = os.path.join(self.tmp, "cache.nrh")
+        ret = self.run_cli(self.input, "-q", "--coref", "-b", "2", "-o", output, "--stats", stats, "--cache", cache)
+        self.assertEqual(ret.returncode, 0, ret.stderr)
+        self.assertIn(b"3 sents", ret.stderr)
+        self.assertIn(b"| backend ", ret.stderr)
+        with open(output, 'r', encoding='utf-8') as f:
+            nodes = set([node['id'] for node in json.load(f)['nodes']])
+        self.assertTrue(set(["山田太郎", "新聞", "鈴木花子", "大阪"]).issubset(nodes))
+        with open(stats, 'r') as f:
+            self.assertEqual(json.load(f)['counters']['sents'], 3)
+        # The cache is loaded and updated by the next run.
+        ret = self.run_cli(self.input, "-q", "--cache", cache)
+        self.assertEqual(ret.returncode, 0, ret.stderr)
+        p = parser()
+        p.loadCheckpoint(cache)
+        self.assertEqual((p.pos, p.G.nodes["鈴木花子"]['count']), (6, 2))
+
+    def test_mp(self):
+        ret = self.run_cli(self.input, "-q", "-m", "mp", "-n", "2")
+        self.assertEqual(ret.returncode, 0, ret.stderr)
+        self.assertIn(b"3 sents", ret.stderr)
+        # Only batch wall time is measured in 'mp' mode.
+        self.assertIn(b"| parse wall ", ret.stderr)
+        self.assertNotIn(b"| backend ", ret.stderr)
+
+    def test_error(self):
+        self.assertNotEqual(self.run_cli(self.input, "-g", "x").returncode, 0)
@@ -0,0 +1,32 @@
+import re
+import sys
+import unittest
+import subprocess
+
+LazyModules = ["nxpd", "numpy", "bs4", "lxml", "urllib.request", "multiprocessing", "gensim"]
+"""
+Modules that must not be imported by `import naruhodo`(visualization, numerical, scraping, multiprocessing and word vector dependencies).
+"""
+
+ImportBudget = 0.5
+"""
+Budget(seconds) of import time spent by naruhodo itself, excluding networkx.
+"""
+
+class TestImport(unittest.TestCase):
+    """Unit test for import cost of naruhodo."""
+    def test_lazyModules(self):
+        code = "import sys, naruhodo; print(' '.join(sorted(sys.modules)))"
+        loaded = set(subprocess.check_output([sys.executable, "-c", code]).decode('utf-8').split())
+        for name in LazyModules:
+            self.assertNotIn(name, loaded)
+
+    @unittest.skipIf(sys.version_info < (3, 7), "-X importtime requires python 3.7+")
+    def test_importBudget(self):
+        out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import naruhodo"], stderr=subprocess.PIPE).stderr.decode('utf-8')
+        cumulative = dict()
+        for line in out.splitlines():
+            m = re.match(r'import time:\s*\d+\s*\|\s*(\d+)\s*\|\s*(\S+)', line)
+            if m:
+                cumulative[m.group(2)] = int(m.group(1)) * 1e-6
+        self.assertLess(cumulative['naruhodo'] - cumulative.get('networkx', 0.), ImportBudget)
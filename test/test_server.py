@@ -0,0 +1,171 @@
+import json
+import asyncio
+import unittest
+import threading
+import http.client
+from urllib.parse import urlencode
+from naruhodo.core.parser import parser
+from naruhodo.server import Service, MicroBatcher
+from test.fakebackend import setUpFakeBackend, tearDownFakeBackend, makeSents
+
+def setUpModule():
+    setUpFakeBackend()
+
+def tearDownModule():
+    tearDownFakeBackend()
+
+
+class TestMicroBatcher(unittest.TestCase):
+    """Unit test for MicroBatcher class."""
+    def test_batches(self):
+        seen = list()
+        def func(items):
+            seen.append(list(items))
+            return [item * 2 for item in items]
+        async def run():
+            batcher = MicroBatcher(func, maxBatch=4, maxDelay=0.05)
+            batcher.start()
+            try:
+                return await asyncio.gather(*[batcher.submit(i) for i in range(10)])
+            finally:
+                batcher.stop()
+        loop = asyncio.new_event_loop()
+        try:
+            results = loop.run_until_complete(run())
+        finally:
+            loop.close()
+        self.assertEqual(results, [i * 2 for i in range(10)])
+        self.assertEqual([len(batch) for batch in seen], [4, 4, 2])
+
+    def test_errors(self):
+        def func(items):
+            return [ValueError(item) if item % 2 else item for item in items]
+        async def run():
+            batcher = MicroBatcher(func, maxBatch=4, maxDelay=0.05)
+            batcher.start()
+            try:
+                return await asyncio.gather(*[batcher.submit(i) for i in range(4)], return_exceptions=True)
+            finally:
+                batcher.stop()
+        loop = asyncio.new_event_loop()
+        try:
+            results = loop.run_until_complete(run())
+        finally:
+            loop.close()
+        self.assertEqual([results[0], results[2]], [0, 2])
+        self.assertIsInstance(results[1], ValueError)
+        self.assertIsInstance(results[3], ValueError)
+
+
+class TestService(unittest.TestCase):
+    """Unit test for Service class(without backend parsing)."""
+    def setUp(self):
+        self.p = parser()
+        self.service = Service(self.p)
+        self.host, self.port = self.service.start()
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=10)
+
+    def tearDown(self):
+        self.conn.close()
+        self.service.stop()
+
+    def request(self, method, path, body=None):
+        self.conn.request(method, path, body)
+        resp = self.conn.getresponse()
+        return resp.status, json.loads(resp.read().decode('utf-8'))
+
+    def test_query(self):
+        with self.p._lock:
+            self.p.G.add_edge("田中", "食べる", weight=1, type="sub", pos=[0])
+            self.p._emit(type="edge_added", edge=("田中", "食べる"), etype="sub", weight=1)
+            self.p._flushEvents()
+        status, ret = self.request("GET", "/query?s=%E7%94%B0%E4%B8%AD&p=")
+        self.assertEqual(status, 200)
+        self.assertEqual(ret, dict(count=1, triples=[["田中", "sub", "食べる"]]))
+        status, ret = self.request("GET", "/stats")
+        self.assertEqual((ret['edges'], ret['triples']), (1, 1))
+        status, ret = self.request("GET", "/export")
+        self.assertEqual(len(ret['nodes']), 2)
+
+    def test_errors(self):
+        self.assertEqual(self.request("GET", "/nothing")[0], 404)
+        self.assertEqual(self.request("GET", "/add")[0], 405)
+        self.assertEqual(self.request("POST", "/add", b"{")[0], 400)
+        self.assertEqual(self.request("POST", "/add", b"{}")[0], 400)
+
+
+class TestServiceAdd(unittest.TestCase):
+    """Unit test for /add of Service class."""
+    def setUp(self):
+        self.p = parser()
+
+    def tearDown(self):
+        self.service.stop()
+
+    def start(self, **kwargs):
+        self.service = Service(self.p, maxDelay=0.2, **kwargs)
+        self.host, self.port = self.service.start()
+
+    def request(self, method, path, body=None):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        try:
+            conn.request(method, path, body)
+            resp = conn.getresponse()
+            return resp.status, json.loads(resp.read().decode('utf-8'))
+        finally:
+            conn.close()
+
+    def post(self, reqs):
+        """POST each request object to /add from its own thread and return the (status, result) of each."""
+        results = [None] * len(reqs)
+        def run(i):
+            results[i] = self.request("POST", "/add", json.dumps(reqs[i], ensure_ascii=False).encode('utf-8'))
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(len(reqs))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def check(self, nthreads):
+        self.start(nthreads=nthreads)
+        sents = makeSents(12, seed=nthreads)
+        reqs = [dict(sents=sents[i:i + 3], doc=i // 3) for i in range(0, len(sents), 3)]
+        results = self.post(reqs)
+        self.assertEqual([status for status, ret in results], [200] * len(reqs))
+        self.assertEqual([ret['sents'] for status, ret in results], [3] * len(reqs))
+        self.assertTrue(max([ret['batch'] for status, ret in results]) > 1)
+        self.assertEqual(self.p.pos, len(sents))
+        self.assertEqual(self.service.batcher.items, len(reqs))
+        subject = [sent.split("は")[0] for sent in sents if not sent.startswith("彼")][0]
+        status, ret = self.request("GET", "/query?" + urlencode(dict(s=subject, p="")))
+        self.assertEqual(status, 200)
+        self.assertTrue(ret['count'] > 0)
+        self.assertTrue(all([triple[0] == subject for triple in ret['triples']]))
+
+    def test_add(self):
+        self.check(1)
+
+    def test_add_threads(self):
+        self.check(2)
+
+    def test_bad_doc(self):
+        self.start()
+        sents = makeSents(2, seed=3)
+        results = self.post([dict(sents=sents[:1]), dict(sents=sents[1:], doc=[1])])
+        self.assertEqual([status for status, ret in results], [200, 400])
+        self.assertEqual(results[0][1]['sents'], 1)
+        self.assertEqual(self.p.pos, 1)
+
+    def test_failed_group(self):
+        self.start()
+        addAll = self.p.addAll
+        def failing(sents, doc=None):
+            if doc == "bad":
+                raise RuntimeError("Failed.")
+            return addAll(sents, doc=doc)
+        self.p.addAll = failing
+        sents = makeSents(2, seed=4)
+        results = self.post([dict(sents=sents[:1], doc="good"), dict(sents=sents[1:], doc="bad")])
+        self.assertEqual([status for status, ret in results], [200, 500])
+        self.assertEqual(self.p.pos, 1)
@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+import unittest
+import networkx as nx
+from naruhodo.utils.checkpoint import writeCheckpoint, readCheckpoint, iterCheckpoint, readRecords, offsetState, remapKey
+
+class TestCheckpoint(unittest.TestCase):
+    """Unit test for checkpoint functions."""
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.G = nx.DiGraph()
+        self.G.add_node("彼[1@0]", count=1, pos=[1], sub="")
+        self.G.add_node("<彼[1@0]>帰る", count=1, pos=[1], sub="彼[1@0]")
+        self.G.add_edge("彼[1@0]", "<彼[1@0]>帰る", weight=1, type="sub", pos=[1])
+        self.state = dict(
+            entityList=[{"東京": [0]}],
+            proList=[dict(id=0, name="彼[1@0]", rep="彼", type=4, pos=1)],
+            corefDict=set(["田中一郎"]),
+            coref_1stPerson=set(),
+            coref_3rdPersonM=set(),
+            coref_3rdPersonF=set(),
+            synonymDict=set(),
+            docs=dict(a=[0, 1])
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_roundtrip(self):
+        fname = os.path.join(self.tmp, "test.ckpt")
+        writeCheckpoint(fname, self.G, self.state, gtype="k", pos=2)
+        header, G, state = readCheckpoint(fname)
+        self.assertEqual(header['pos'], 2)
+        self.assertEqual(header['nodes'], 2)
+        self.assertEqual(dict(G.nodes.items()), dict(self.G.nodes.items()))
+        self.assertEqual(G.edges["彼[1@0]", "<彼[1@0]>帰る"]['pos'], [1])
+        self.assertEqual(state['proList'], self.state['proList'])
+        self.assertFalse(os.path.exists(fname + ".tmp"))
+        records = [record for record in iterCheckpoint(fname, offsets=True) if record[0] in ["node", "edge"]]
+        self.assertEqual(readRecords(fname, [record[3] for record in records[::-1]]), [tuple(record[1:3]) for record in records[::-1]])
+
+    def test_offsetState(self):
+        self.assertEqual(remapKey("<彼[1@0]>帰る", 10), "<彼[11@0]>帰る")
+        self.assertEqual(remapKey("東京", 10), "東京")
+        G, state = offsetState(self.G, self.state, 10)
+        self.assertEqual(sorted(G.nodes), ["<彼[11@0]>帰る", "彼[11@0]"])
+        self.assertEqual(G.nodes["<彼[11@0]>帰る"]['sub'], "彼[11@0]")
+        self.assertEqual(G.edges["彼[11@0]", "<彼[11@0]>帰る"]['pos'], [11])
+        self.assertEqual(state['entityList'], [{"東京": [10]}])
+        self.assertEqual(state['proList'][0]['name'], "彼[11@0]")
+        self.assertEqual(state['proList'][0]['pos'], 11)
+        self.assertEqual(state['docs'], dict(a=[10, 11]))
+        # The original state is left untouched.
+        self.assertEqual(self.G.nodes["彼[1@0]"]['pos'], [1])
+        self.assertEqual(self.state['proList'][0]['pos'], 1)
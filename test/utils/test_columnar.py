@@ -0,0 +1,50 @@
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import networkx as nx
+from naruhodo.utils.columnar import exportColumns, ColumnStore
+
+
+class TestColumnar(unittest.TestCase):
+    """Unit test for columnar export functions."""
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.G = nx.DiGraph()
+        self.G.add_node("東京", count=2, type=0, label="東京", pos=[0, 1], surface=["東京", "東京都"], lpos=[0, 3])
+        self.G.add_node("行く", count=1, type=1, label="行く", negative=1, pos=[0], surface=["行か"], lpos=[2])
+        self.G.add_node("未知の主体", count=1, type=0, label="未知の主体", pos=[1], surface="未知の主体")
+        self.G.add_edge("東京", "行く", weight=1, type="obj", label="を", pos=[0])
+        self.G.add_edge("未知の主体", "東京", weight=1, type="coref", label="共参照候補")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_roundtrip(self):
+        exportColumns(self.G, self.tmp)
+        store = ColumnStore(self.tmp)
+        self.assertEqual(sorted(store.tables()), ["edge_occurrences", "edges", "node_occurrences", "nodes"])
+        keys = store.strings("nodes", "key")
+        self.assertEqual(keys.decode(store.column("nodes", "key")), list(self.G.nodes))
+        self.assertEqual(store.column("nodes", "count").tolist(), [2, 1, 1])
+        self.assertEqual(store.column("nodes", "count").dtype, np.int8)
+        # Missing integers become NaN.
+        self.assertTrue(np.isnan(store.column("nodes", "negative")[0]))
+        nodes = store.load("node_occurrences", ["node", "pos", "surface"], decode=True)
+        self.assertEqual(nodes['node'].tolist(), [0, 0, 1, 2])
+        self.assertEqual(nodes['pos'].tolist(), [0, 1, 0, 1])
+        self.assertEqual(nodes['surface'], ["東京", "東京都", "行か", "未知の主体"])
+        self.assertTrue(np.isnan(store.column("node_occurrences", "lpos")[3]))
+        edges = store.load("edges", decode=True)
+        self.assertEqual([(keys[s], keys[d]) for s, d in zip(edges['src'], edges['dst'])], list(self.G.edges))
+        self.assertEqual(edges['type'], ["obj", "coref"])
+        self.assertEqual(store.load("edge_occurrences")['edge'].tolist(), [0])
+        types = store.strings("edges", "type")
+        self.assertEqual((store.column("edges", "type") == types.code("coref")).tolist(), [False, True])
+        self.assertIsInstance(store.column("nodes", "count"), np.memmap)
+
+    def test_empty(self):
+        exportColumns(nx.DiGraph(), self.tmp)
+        store = ColumnStore(self.tmp)
+        self.assertEqual(store.rows("nodes"), 0)
+        self.assertEqual(store.columns("edges"), [])
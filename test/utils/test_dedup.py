@@ -0,0 +1,33 @@
+import unittest
+from naruhodo.utils.dedup import Deduplicator
+
+
+class TestDeduplicator(unittest.TestCase):
+    """Unit test for Deduplicator class."""
+    def test_exact(self):
+        d = Deduplicator(threshold=1.)
+        self.assertIsNone(d.find("東京は日本の首都である。"))
+        d.add("東京は日本の首都である。", 0)
+        self.assertEqual(d.find("東京は日本の首都である。"), 0)
+        self.assertIsNone(d.find("大阪は日本の都市である。"))
+
+    def test_near(self):
+        d = Deduplicator()
+        base = "共同通信の記者によると、経済産業省は来年度の予算案を今月中に発表する方針を固めた。"
+        d.add(base, 3)
+        self.assertEqual(d.find(base.replace("今月中", "今月末")), 3)
+        self.assertIsNone(d.find("田中一郎は公園でりんごを食べた。"))
+        self.assertEqual((d.exact, d.near), (0, 1))
+
+    def test_capacity(self):
+        d = Deduplicator(capacity=10)
+        for i in range(30):
+            d.add("文番号{0}の内容です。".format(i) * 3, i)
+        self.assertEqual(len(d), 10)
+        self.assertIsNone(d.find("文番号0の内容です。" * 3))
+        self.assertEqual(d.find("文番号29の内容です。" * 3), 29)
+        self.assertLessEqual(sum([len(bucket) for bucket in d._buckets]), 10 * d.bands)
+
+    def test_mode(self):
+        with self.assertRaises(ValueError):
+            Deduplicator(mode="drop")
@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+import unittest
+import networkx as nx
+from naruhodo.utils.checkpoint import writeCheckpoint
+from naruhodo.utils.diff import GraphDiff, iterDiff
+
+
+class TestGraphDiff(unittest.TestCase):
+    """Unit test for graph diff functions."""
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.A = nx.DiGraph()
+        self.A.add_node("東京", count=2, pos=[0, 1], label="東京")
+        self.A.add_node("行く", count=1, pos=[0], label="行く")
+        self.A.add_node("帰る", count=1, pos=[1], label="帰る")
+        self.A.add_edge("東京", "行く", weight=1, type="obj", pos=[0])
+        self.A.add_edge("東京", "帰る", weight=1, type="obj", pos=[1])
+        self.B = self.A.copy()
+        self.B.nodes["東京"]['count'] = 3
+        self.B.nodes["東京"]['pos'] = [0, 1, 2]
+        self.B.nodes["行く"]['label'] = "行った"
+        self.B.remove_node("帰る")
+        self.B.add_node("大阪", count=1, pos=[2], label="大阪")
+        self.B.add_edge("大阪", "行く", weight=2, type="sub", pos=[2, 2])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_diff(self):
+        D = GraphDiff(self.A, self.B)
+        self.assertEqual(D.nodes['added'], [("大阪", 1, ["label", "pos"])])
+        self.assertEqual(D.nodes['removed'], [("帰る", -1, ["label", "pos"])])
+        self.assertEqual(sorted(D.nodes['changed']), [("東京", 1, ["pos"]), ("行く", 0, ["label"])])
+        self.assertEqual(D.edges['added'], [(("大阪", "行く"), 2, ["pos", "type"])])
+        self.assertEqual(D.edges['removed'], [(("東京", "帰る"), -1, ["pos", "type"])])
+        self.assertEqual(D.edges['changed'], [])
+        self.assertEqual(len(D), 6)
+        summary = D.summary()
+        self.assertEqual(summary['nodes']['delta'], 1)
+        self.assertEqual(summary['nodes']['attrs'], dict(pos=1, label=1))
+        self.assertEqual(len(GraphDiff(self.A, self.A.copy())), 0)
+        ignored = GraphDiff(self.A, self.B, ignore=("pos", "label"))
+        self.assertEqual(ignored.nodes['changed'], [("東京", 1, [])])
+
+    def test_checkpoint(self):
+        fa = os.path.join(self.tmp, "a.ckpt")
+        fb = os.path.join(self.tmp, "b.ckpt")
+        writeCheckpoint(fa, self.A, dict())
+        writeCheckpoint(fb, self.B, dict())
+        self.assertEqual(list(iterDiff(fa, fb)), list(iterDiff(self.A, self.B)))
+        self.assertEqual(list(iterDiff(fa, self.A)), [])
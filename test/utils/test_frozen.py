@@ -0,0 +1,78 @@
+import random
+import unittest
+import numpy as np
+import networkx as nx
+from naruhodo.utils.frozen import FrozenGraph
+
+
+class TestFrozenGraph(unittest.TestCase):
+    """Unit test for FrozenGraph class."""
+    def setUp(self):
+        rnd = random.Random(0)
+        self.G = nx.DiGraph()
+        for i in range(60):
+            self.G.add_node("n{0}".format(i), count=rnd.randint(1, 5), type=rnd.randint(0, 3), pos=[i], label="n{0}".format(i), surface=["n"] * rnd.randint(0, 2))
+            if i % 7 == 0:
+                self.G.nodes["n{0}".format(i)]['synonym'] = "n0"
+        for i in range(200):
+            a, b = rnd.randrange(60), rnd.randrange(60)
+            self.G.add_edge("n{0}".format(a), "n{0}".format(b), weight=rnd.randint(1, 3), label="e", type=rnd.choice(["sub", "obj", "para"]), pos=[a])
+        self.F = FrozenGraph(self.G)
+
+    def test_structure(self):
+        F = self.F
+        self.assertEqual(len(F), self.G.number_of_nodes())
+        self.assertEqual(F.numberOfEdges(), self.G.number_of_edges())
+        for key in self.G.nodes:
+            self.assertEqual(sorted(F.successors(key)), sorted(self.G.successors(key)))
+            self.assertEqual(sorted(F.predecessors(key)), sorted(self.G.predecessors(key)))
+        H = F.toNetworkx()
+        self.assertEqual(dict(H.nodes.items()), dict(self.G.nodes.items()))
+        self.assertEqual(dict(H.edges.items()), dict(self.G.edges.items()))
+        sub = F.toNetworkx(["n0", "n1", "n2", "n3"])
+        self.assertEqual(set(sub.edges), set(self.G.subgraph(["n0", "n1", "n2", "n3"]).edges))
+        # The snapshot does not follow the source graph.
+        self.G.nodes["n0"]['pos'].append(100)
+        self.assertEqual(F.toNetworkx().nodes["n0"]['pos'], [0])
+        # Attributes are stored as columns(numeric ones in arrays).
+        self.assertEqual(type(F.toNetworkx().nodes["n0"]['pos'][0]), int)
+        for name in ['count', 'pos']:
+            self.assertIsInstance(F._nodeAttrs.columns[name][0], np.ndarray)
+        self.assertIsInstance(F._edgeAttrs.columns['weight'][0], np.ndarray)
+        self.assertNotIn('synonym', H.nodes["n1"])
+
+    def test_degreeByType(self):
+        deg = self.F.degreeByType("sub", direction="all", weighted=True)
+        for i, key in enumerate(self.F.keys):
+            expected = sum([val['weight'] for val in self.G.succ[key].values() if val['type'] == "sub"])
+            expected += sum([val['weight'] for val in self.G.pred[key].values() if val['type'] == "sub"])
+            self.assertEqual(deg[i], expected)
+
+    @staticmethod
+    def _pagerank(G, alpha=0.85):
+        """Reference PageRank by plain power iteration."""
+        n = G.number_of_nodes()
+        out = dict([(key, sum([val['weight'] for val in G.succ[key].values()])) for key in G.nodes])
+        x = dict([(key, 1. / n) for key in G.nodes])
+        for i in range(1000):
+            dangling = sum([x[key] for key in G.nodes if out[key] == 0])
+            new = dict([(key, (alpha * dangling + 1. - alpha) / n) for key in G.nodes])
+            for (a, b), val in G.edges.items():
+                new[b] += alpha * x[a] * val['weight'] / out[a]
+            x = new
+        return x
+
+    def test_pagerank(self):
+        pr = self.F.pagerank(tol=1.0e-12, maxIter=1000)
+        expected = self._pagerank(self.G)
+        for i, key in enumerate(self.F.keys):
+            self.assertAlmostEqual(pr[i], expected[key], places=5)
+
+    def test_bfs(self):
+        dist = self.F.bfs(["n0"], direction="all", etypes=["obj", "para"])
+        H = nx.Graph([key for key, val in self.G.edges.items() if val['type'] in ["obj", "para"]])
+        H.add_node("n0")
+        expected = nx.single_source_shortest_path_length(H, "n0")
+        for i, key in enumerate(self.F.keys):
+            self.assertEqual(dist[i], expected.get(key, -1))
+        self.assertEqual(sorted(self.F.reachable(["n0"], maxDepth=1)), sorted(set(self.G.successors("n0")) | {"n0"}))
@@ -0,0 +1,91 @@
+import random
+import unittest
+import networkx as nx
+from naruhodo.utils.misc import lodView, _mergeGraph, _indexGraph, _removePositions, _re1, _re2, _re3, _re4, preprocessText, preprocessTexts
+
+def _node(pos, lpos=0):
+    return dict(count=1, pos=[pos], lpos=[lpos], func=["は"], surface=["東京は"], yomi=["トウキョウハ"], type=0, label="東京")
+
+class TestMergeGraph(unittest.TestCase):
+    """Unit test for graph merging functions."""
+    def test_mergeGraphEvents(self):
+        A = nx.DiGraph()
+        A.add_node("東京", **_node(0))
+        B = nx.DiGraph()
+        B.add_node("東京", **_node(1))
+        B.add_node("大阪", **_node(1, 1))
+        B.add_edge("東京", "大阪", weight=1, label="と", type="para")
+        events = list()
+        _mergeGraph(A, B, events)
+        self.assertEqual(A.nodes["東京"]['pos'], [0, 1])
+        self.assertEqual(A.nodes["東京"]['count'], 2)
+        self.assertEqual([e['type'] for e in events], ["node_occurrence", "node_added", "edge_added"])
+        self.assertEqual(events[0]['pos'], [1])
+        B.remove_node("大阪")
+        B.add_node("大阪", **_node(2, 1))
+        B.add_edge("東京", "大阪", weight=1, label="と", type="para")
+        events = list()
+        _mergeGraph(A, B, events)
+        self.assertEqual(events[-1], dict(type="edge_weight", edge=("東京", "大阪"), etype="para", weight=1))
+        self.assertEqual(A.edges["東京", "大阪"]['weight'], 2)
+
+    def test_removePositions(self):
+        G = nx.DiGraph()
+        B = nx.DiGraph()
+        B.add_node("東京", **_node(0))
+        B.add_node("大阪", **_node(0, 1))
+        B.add_edge("東京", "大阪", weight=1, label="と", type="para", pos=[0])
+        nodeIndex, edgeIndex = dict(), dict()
+        _indexGraph(B, nodeIndex, edgeIndex)
+        _mergeGraph(G, B)
+        B = nx.DiGraph()
+        B.add_node("東京", **_node(1))
+        B.add_edge("東京", "東京", weight=1, label="は", type="none", pos=[1])
+        _indexGraph(B, nodeIndex, edgeIndex)
+        _mergeGraph(G, B)
+        events = list()
+        nodes, dropped = _removePositions(G, set([0]), nodeIndex, edgeIndex, events)
+        self.assertEqual(nodes, set(["東京", "大阪"]))
+        self.assertEqual(dropped, set(["大阪"]))
+        self.assertEqual(G.nodes["東京"]['pos'], [1])
+        self.assertEqual(G.nodes["東京"]['count'], 1)
+        self.assertFalse(G.has_edge("東京", "大阪"))
+        self.assertEqual(sorted(nodeIndex.keys()), [1])
+        self.assertIn(dict(type="node_removed", node="大阪"), events)
+
+    def test_lodView(self):
+        G = nx.DiGraph()
+        for i, key in enumerate(["A", "B", "C", "D"]):
+            G.add_node(key, count=i + 1)
+        G.add_edge("A", "B", weight=1, type="sub")
+        G.add_edge("B", "C", weight=3, type="obj")
+        G.add_edge("C", "D", weight=2, type="obj")
+        G.add_edge("D", "B", weight=2, type="aux")
+        self.assertEqual(sorted(lodView(G, minCount=3).nodes), ["C", "D"])
+        self.assertEqual(sorted(lodView(G, minWeight=2).edges), [("B", "C"), ("C", "D"), ("D", "B")])
+        self.assertEqual(sorted(lodView(G, etypes=["obj"]).edges), [("B", "C"), ("C", "D")])
+        self.assertEqual(sorted(lodView(G, kcore=2).nodes), ["B", "C", "D"])
+        self.assertEqual(list(lodView(G, topN=1).nodes), ["B"])
+        # Views share data with the original graph.
+        lodView(G, minCount=2).nodes["B"]['count'] = 10
+        self.assertEqual(G.nodes["B"]['count'], 10)
+
+class TestPreprocessText(unittest.TestCase):
+    """Unit test for text normalization."""
+    @staticmethod
+    def _reference(text):
+        text = text.replace("\n", "").replace("|", "、").replace(" ", "").strip()
+        text = _re1.sub("", text)
+        text = _re2.sub("", text)
+        text = _re3.sub("", text)
+        text = _re4.sub("", text)
+        return text
+
+    def test_preprocessText(self):
+        rnd = random.Random(0)
+        chars = "東京|\n 　（）[]()<>ab\t\r"
+        texts = ["".join([rnd.choice(chars) for i in range(rnd.randint(0, 12))]) for j in range(5000)]
+        texts += ["[（]）", "（a[）]", "東京(とうきょう)は<b>首都</b>", " 東京 | 大阪 "]
+        for text in texts:
+            self.assertEqual(preprocessText(text), self._reference(text), repr(text))
+        self.assertEqual(preprocessTexts(texts), [self._reference(text) for text in texts])
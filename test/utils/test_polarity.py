@@ -0,0 +1,65 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+import networkx as nx
+from naruhodo.utils.polarity import polarity
+
+
+class TestPolarity(unittest.TestCase):
+    """Unit test for polarity class."""
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.fname = os.path.join(self.tmp, "lexicon.bin")
+        self.entries = dict([("語{0}".format(i), (i % 7 - 3) / 4.) for i in range(1000)])
+        self.entries.update({"良い": 1., "悪い": -1., "食べる": 0.5})
+        polarity.build(self.fname, self.entries)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_lookup(self):
+        pol = polarity(pdict=self.fname)
+        self.assertEqual(len(pol), len(self.entries))
+        for key, val in self.entries.items():
+            self.assertEqual(pol.score(key), val)
+        self.assertIsNone(pol.score("無い語"))
+        self.assertNotIn("無い語", pol)
+        lemmas = ["悪い", "無い語", "良い", "語5", "悪い"]
+        self.assertEqual(pol.scores(lemmas, 0.), [pol.score(item, 0.) for item in lemmas])
+        # In-memory entries override the lexicon and are saved together with it.
+        pol.pdict["良い"] = 0.75
+        pol.save(self.fname + "2")
+        pol2 = polarity(pdict=self.fname + "2")
+        self.assertEqual(pol2.score("良い"), 0.75)
+        self.assertEqual(len(pol2), len(self.entries))
+        # Only the filename is pickled.
+        pol3 = pickle.loads(pickle.dumps(pol))
+        self.assertEqual(pol3.fname, self.fname)
+        self.assertEqual(pol3.score("良い"), 0.75)
+        pol.close()
+        pol2.close()
+        pol3.close()
+
+    def test_loadText(self):
+        fname = os.path.join(self.tmp, "lexicon.tsv")
+        with open(fname, 'w', encoding='utf-8') as f:
+            f.write("嬉しい\tp\n悲しい\tn\n普通\te\n微妙\t-0.25\n壊れた行\n")
+        pol = polarity()
+        pol.loadText(fname)
+        self.assertEqual(pol.pdict, {"嬉しい": 1., "悲しい": -1., "普通": 0., "微妙": -0.25})
+
+    def test_scoreGraph(self):
+        G = nx.DiGraph()
+        G.add_node("良い", label="良い", negative=0)
+        G.add_node("<良い>良い\n(否定)", label="良い\n(否定)", negative=1)
+        G.add_node("<悪い>悪い\n(二重否定)", label="悪い\n(二重否定)", negative=-1)
+        G.add_node("東京", label="東京", negative=0)
+        pol = polarity(pdict=self.fname)
+        self.assertEqual(pol.scoreGraph(G), 3)
+        self.assertEqual(G.nodes["良い"]['polarity'], 1.)
+        self.assertEqual(G.nodes["<良い>良い\n(否定)"]['polarity'], -1.)
+        self.assertEqual(G.nodes["<悪い>悪い\n(二重否定)"]['polarity'], -1.)
+        self.assertEqual(G.nodes["東京"]['polarity'], 0.)
+        pol.close()
@@ -1,9 +1,151 @@
+import io
+import shutil
+import tempfile
 import unittest
-from naruhodo.utils.scraper import NScraper
+import http.client
+import threading
+import http.server
+import socketserver
+from naruhodo.utils.scraper import NScraper, PageCache, ScraperError, extractParagraphs
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """Handler serving small pages over keep-alive connections."""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.clients.add(self.client_address)
+        if self.path.startswith("/etag/"):
+            etag = '"{0}"'.format(self.server.version)
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.server.downloads += 1
+            body = "<p>版{0}</p>".format(self.server.version).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if self.path == "/redirect":
+            self.send_response(302)
+            self.send_header("Location", "/page/0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if not self.path.startswith("/page/") and self.path != "/sjis":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/sjis":
+            body = '<html><head><meta charset="Shift_JIS"></head><body><p>日本語</p></body></html>'.encode("shift_jis")
+        else:
+            body = "<html><body><p>ページ{0}です。</p><script>x</script></body></html>".format(self.path[6:]).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html" if self.path == "/sjis" else "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class _Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
 
 class TestScraper(unittest.TestCase):
     """Unit test for NScraper class."""
+    def setUp(self):
+        self.server = _Server(("127.0.0.1", 0), _Handler)
+        self.server.clients = set()
+        self.server.version = 1
+        self.server.downloads = 0
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.base = "http://127.0.0.1:{0}".format(self.server.server_address[1])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
     def test_getUrlContent(self):
         scpr = NScraper()
-        text = scpr.getUrlContent('https://stackoverflow.com/')
-        self.assertEqual("Each", "Each")
+        paragraphs = list()
+        self.assertEqual(scpr.getUrlContent(self.base + "/page/3", callback=paragraphs.append), ["ページ3です。"])
+        self.assertEqual(paragraphs, ["ページ3です。"])
+        scpr.close()
+
+    def test_getUrlContents(self):
+        scpr = NScraper(maxWorkers=4, perHost=2)
+        urls = ["{0}/page/{1}".format(self.base, i) for i in range(20)]
+        texts = scpr.getUrlContents(urls)
+        scpr.close()
+        self.assertEqual(texts, [["ページ{0}です。".format(i)] for i in range(20)])
+        # Connections are kept alive and limited per host.
+        self.assertLessEqual(len(self.server.clients), 2)
+
+    def test_redirectAndError(self):
+        scpr = NScraper()
+        self.assertEqual(scpr.getUrlContent(self.base + "/redirect"), ["ページ0です。"])
+        self.assertEqual(scpr.getUrlContent(self.base + "/sjis"), ["日本語"])
+        with self.assertRaises(ScraperError):
+            scpr.getUrlContent(self.base + "/missing")
+        errors = list()
+        texts = scpr.getUrlContents([self.base + "/page/1", self.base + "/missing"], onError=errors.append)
+        self.assertEqual(texts, [["ページ1です。"], []])
+        self.assertEqual([err.url for err in errors], [self.base + "/missing"])
+        scpr.close()
+
+    def test_extractParagraphs(self):
+        class Response(object):
+            """Response delivering the body in small chunks."""
+            def __init__(self, body):
+                self.body = body
+                self.headers = http.client.parse_headers(io.BytesIO(b"Content-Type: text/html; charset=utf-8\r\n\r\n"))
+            def read(self, n=-1):
+                ret, self.body = self.body[:3], self.body[3:]
+                return ret
+        body = "<p>一つ目<b>の</b>段落</p><style>p{}</style><p>二つ目<script>var a = '<p>';</script><div>外</div><p>三つ目".encode("utf-8")
+        blocks = list()
+        extractParagraphs(Response(body), blocks.append)
+        self.assertEqual(blocks, ["一つ目の段落", "二つ目", "三つ目"])
+
+    def test_cache(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            scpr = NScraper(cache=tmp)
+            url = self.base + "/etag/a"
+            self.assertEqual(scpr.getUrlContent(url), ["版1"])
+            # Not modified pages are served from the cache.
+            self.assertEqual(scpr.getUrlContent(url), ["版1"])
+            self.assertEqual(self.server.downloads, 1)
+            self.assertEqual((scpr.cache.hits, scpr.cache.misses), (1, 1))
+            # Modified pages are downloaded again.
+            self.server.version = 2
+            other = NScraper(cache=tmp)
+            self.assertEqual(other.getUrlContent(url), ["版2"])
+            self.assertEqual(self.server.downloads, 2)
+            other.close()
+            scpr.close()
+        finally:
+            shutil.rmtree(tmp)
+
+    def test_cacheEviction(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            cache = PageCache(tmp, maxBytes=1000)
+            for i in range(20):
+                cache.put("http://example.com/{0}".format(i), ["本文" * 20], etag=str(i))
+            self.assertLessEqual(cache.size(), 1000)
+            self.assertIsNotNone(cache.get("http://example.com/19"))
+            self.assertIsNone(cache.get("http://example.com/0"))
+            self.assertEqual(PageCache(tmp).size(), cache.size())
+        finally:
+            shutil.rmtree(tmp)
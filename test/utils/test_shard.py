@@ -0,0 +1,55 @@
+import shutil
+import tempfile
+import unittest
+import multiprocessing
+from naruhodo.core.parser import parser
+from naruhodo.utils.shard import writeShard, waitShards, reduceShards
+from test.fakebackend import setUpFakeBackend, tearDownFakeBackend, makeSents
+
+def setUpModule():
+    setUpFakeBackend()
+
+def tearDownModule():
+    tearDownFakeBackend()
+
+def parseShard(args):
+    """Parse sentences of a shard in a worker process and write the shard."""
+    directory, shardId, sents = args
+    p = parser()
+    p.addAll(sents)
+    return writeShard(p, directory, shardId)
+
+
+class TestShard(unittest.TestCase):
+    """Unit test for sharded ingestion."""
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_reduce(self):
+        sents = makeSents(40, seed=5)
+        full = parser(coref=True, synonym=True)
+        full.addAll(sents)
+        for nshards in [2, 4]:
+            directory = tempfile.mkdtemp(dir=self.tmp)
+            chunks = [sents[i * len(sents) // nshards:(i + 1) * len(sents) // nshards] for i in range(nshards)]
+            with multiprocessing.Pool(nshards) as pool:
+                pool.map(parseShard, [(directory, i, chunks[i]) for i in range(nshards)])
+            self.assertEqual([shardId for shardId, path in waitShards(directory, nshards, timeout=30)], list(range(nshards)))
+            p = reduceShards(parser(coref=True, synonym=True), directory, nshards=nshards, timeout=30)
+            self.assertEqual(p.pos, full.pos)
+            # Pronouns of later shards are renamed to their global positions(e.g. 彼[2@0] of the second shard to 彼[22@0]).
+            self.assertEqual(dict(p.G.nodes(data='pos')), dict(full.G.nodes(data='pos')))
+            self.assertEqual(dict(p.G.nodes(data='count')), dict(full.G.nodes(data='count')))
+            self.assertEqual(sorted(p.G.edges(data='type')), sorted(full.G.edges(data='type')))
+            self.assertEqual(sorted(p.G.edges(data='weight')), sorted(full.G.edges(data='weight')))
+        self.assertIn("coref", [etype for A, B, etype in full.G.edges(data='type')])
+
+    def test_timeout(self):
+        p = parser()
+        p.addAll(makeSents(2))
+        writeShard(p, self.tmp, 0)
+        with self.assertRaises(TimeoutError):
+            waitShards(self.tmp, 2, timeout=0, interval=0)
@@ -0,0 +1,29 @@
+import unittest
+from naruhodo.utils.stats import Stats, warnRateLimited
+
+class TestStats(unittest.TestCase):
+    """Unit test for instrumentation utilities."""
+    def test_record(self):
+        records = list()
+        stats = Stats(hook=lambda kind, name, value: records.append((kind, name, value)))
+        for i in range(99):
+            stats.record('merge', 0.0001)
+        stats.record('merge', 0.5)
+        stats.count('sents', 3)
+        snap = stats.snapshot()
+        self.assertEqual(snap['timers']['merge']['count'], 100)
+        self.assertAlmostEqual(snap['timers']['merge']['max'], 0.5)
+        self.assertLessEqual(snap['timers']['merge']['p50'], 0.001)
+        self.assertGreaterEqual(snap['timers']['merge']['p99'], 0.0001)
+        self.assertGreaterEqual(stats._percentile(stats.histograms['merge'], 1.), 0.5)
+        self.assertEqual(snap['counters'], {'sents': 3})
+        self.assertEqual(len(records), 101)
+        self.assertEqual(records[-1], ("counter", "sents", 3))
+        stats.reset()
+        self.assertEqual(stats.snapshot()['timers'], {})
+
+    def test_warnRateLimited(self):
+        with self.assertLogs("naruhodo", level="WARNING") as cm:
+            self.assertTrue(warnRateLimited("test-key", "message"))
+            self.assertFalse(warnRateLimited("test-key", "message"))
+        self.assertEqual(len(cm.output), 1)
@@ -0,0 +1,57 @@
+import unittest
+import networkx as nx
+from naruhodo.core.parser import parser
+from naruhodo.utils.triples import TripleIndex
+
+class TestTripleIndex(unittest.TestCase):
+    """Unit test for TripleIndex class."""
+    def setUp(self):
+        G = nx.DiGraph()
+        G.add_edge("田中一郎", "<田中一郎>あげる", type="sub")
+        G.add_edge("<田中一郎>あげる", "りんご", type="obj")
+        G.add_edge("花子", "<田中一郎>あげる", type="aux")
+        self.idx = TripleIndex(G)
+
+    def test_query(self):
+        self.assertEqual(len(self.idx), 3)
+        self.assertEqual(self.idx.query(s="田中一郎", p="sub"), [("田中一郎", "sub", "<田中一郎>あげる")])
+        self.assertEqual(self.idx.query(s="<田中一郎>あげる", p="obj"), [("<田中一郎>あげる", "obj", "りんご")])
+        self.assertEqual(self.idx.query(p="aux", o="<田中一郎>あげる"), [("花子", "aux", "<田中一郎>あげる")])
+        self.assertEqual(sorted(self.idx.query(o="<田中一郎>あげる")), sorted([("花子", "aux", "<田中一郎>あげる"), ("田中一郎", "sub", "<田中一郎>あげる")]))
+        self.assertEqual(self.idx.query(s="花子", o="<田中一郎>あげる"), [("花子", "aux", "<田中一郎>あげる")])
+        self.assertEqual(len(self.idx.query()), 3)
+        self.assertEqual(self.idx.query(s="花子", p="sub"), [])
+
+    def test_update(self):
+        self.idx.update([
+            dict(type="coref_edge", edge=("田中一郎", "彼[1@0]"), etype="coref", weight=1),
+            dict(type="edge_removed", edge=("花子", "<田中一郎>あげる"), etype="aux"),
+            dict(type="edge_weight", edge=("田中一郎", "<田中一郎>あげる"), etype="sub", weight=1)
+        ])
+        self.assertEqual(len(self.idx), 3)
+        self.assertIn(("田中一郎", "coref", "彼[1@0]"), self.idx)
+        self.assertEqual(self.idx.query(p="aux"), [])
+        self.assertNotIn("花子", self.idx.spo)
+        self.idx.update([dict(type="reset")])
+        self.assertEqual(len(self.idx), 0)
+
+    def test_attach(self):
+        p = parser()
+        idx = TripleIndex().attach(p)
+        p.G.add_node("田中一郎", count=1)
+        p.G.add_edge("田中一郎", "<田中一郎>あげる", weight=1, type="sub", pos=[0])
+        p._emit(type="edge_added", edge=("田中一郎", "<田中一郎>あげる"), etype="sub", weight=1)
+        # Synonym edges do not overwrite parsed relations.
+        p._addSynonymEdge("田中一郎", "<田中一郎>あげる")
+        p._addSynonymEdge("田中一郎", "田中")
+        p._flushEvents()
+        self.assertEqual(p.G.edges["田中一郎", "<田中一郎>あげる"]['type'], "sub")
+        self.assertEqual(sorted(idx.query(s="田中一郎")), [("田中一郎", "sub", "<田中一郎>あげる"), ("田中一郎", "synonym", "田中")])
+        # Coreference edges keep every position.
+        p._addCorefEdge("田中一郎", "彼[1@0]", 1)
+        p._addCorefEdge("田中一郎", "彼[1@0]", 2)
+        p._flushEvents()
+        self.assertEqual(p.G.edges["田中一郎", "彼[1@0]"]['pos'], [1, 2])
+        self.assertEqual(p.G.edges["田中一郎", "彼[1@0]"]['weight'], 2)
+        self.assertEqual((p._edgeIndex[1], p._edgeIndex[2]), (set([("田中一郎", "彼[1@0]")]), set([("田中一郎", "彼[1@0]")])))
+        self.assertEqual(idx.query(p="coref"), [("田中一郎", "coref", "彼[1@0]")])